@@ -0,0 +1,129 @@
+"""
+Benchmark: fresh connections vs the shared keep-alive client
+============================================================
+Starts a local stub API server (HTTPS with a throwaway self-signed cert when
+the openssl CLI is available, plain HTTP otherwise) and sends N small JSON
+POSTs the way main.py used to (a bare requests.post() per call) and the way it
+does now (espaluz_http.http_post through a pooled session). Reports p50/p99
+per request, so the difference is the connection + TLS setup we stopped paying.
+
+Usage:
+    python bench_http_keepalive.py 500
+    BENCH_STUB_DELAY_MS=20 python bench_http_keepalive.py 200   # add fake server time
+"""
+
+import os
+import sys
+import ssl
+import json
+import time
+import shutil
+import tempfile
+import threading
+import statistics
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import espaluz_http
+
+STUB_DELAY = float(os.getenv("BENCH_STUB_DELAY_MS", 0)) / 1000
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if STUB_DELAY:
+            time.sleep(STUB_DELAY)
+        body = json.dumps({"content": [{"type": "text", "text": "Hola"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_cert(directory):
+    """Self-signed cert for localhost, or None if openssl is not installed"""
+    if not shutil.which("openssl"):
+        return None
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, samples):
+    print(f"{label:>10}: n={len(samples)}  "
+          f"p50={percentile(samples, 50) * 1000:.2f}ms  "
+          f"p99={percentile(samples, 99) * 1000:.2f}ms  "
+          f"mean={statistics.mean(samples) * 1000:.2f}ms")
+
+
+def timed(send, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        res = send()
+        res.content
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    payload = {"model": "stub", "messages": [{"role": "user", "content": "hola"}]}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = ThreadingHTTPServer(("localhost", 0), StubHandler)
+        cert = make_cert(tmp)
+        scheme = "http"
+        verify = True
+        if cert:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(*cert)
+            server.socket = context.wrap_socket(server.socket, server_side=True)
+            scheme = "https"
+            verify = cert[0]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"{scheme}://localhost:{server.server_address[1]}/v1/messages"
+
+        espaluz_http.get_session("bench").verify = verify
+
+        # Warm up both paths once (imports, first TLS context load)
+        requests.post(url, json=payload, verify=verify, timeout=10)
+        espaluz_http.http_post("bench", url, json=payload)
+
+        fresh = timed(lambda: requests.post(url, json=payload, verify=verify, timeout=10), n)
+        pooled = timed(lambda: espaluz_http.http_post("bench", url, json=payload), n)
+
+        server.shutdown()
+        espaluz_http.close_all()
+
+    print(f"📊 {n} POSTs to a local {scheme.upper()} stub (server delay {STUB_DELAY * 1000:.0f}ms)")
+    report("fresh", fresh)
+    report("keep-alive", pooled)
+    saved = statistics.median(fresh) - statistics.median(pooled)
+    print(f"Saved per request (p50): {saved * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
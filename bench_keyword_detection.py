@@ -0,0 +1,215 @@
+"""
+Benchmark: keyword-based detection per message
+==============================================
+Runs all keyword detectors - detect_emotion, detect_language_specific_emotions,
+detect_country_from_text, detect_role_from_text (main.py),
+EnhancedEmotionDetector.detect_enhanced_emotion,
+EnhancedFamilyDetector.detect_member_type (espaluz_emotional_brain) and
+detect_country_from_context (espaluz_country_contexts) - over a set of
+messages, once with the previous nested `keyword in text_lower` loops and once
+through the shared keyword_engine, checks that every result is identical and
+reports the per-message cost of both.
+
+main.py cannot be imported without a bot token and its network side effects,
+so its keyword tables and detectors are loaded from the source with ast.
+
+Usage:
+    python bench_keyword_detection.py
+"""
+
+import ast
+import time
+
+from espaluz_keywords import KeywordGroups, keyword_engine
+from espaluz_emotional_brain import (
+    EMOTION_KEYWORDS, EMOTION_KEYWORD_GROUPS, FAMILY_MEMBER_KEYWORDS, FAMILY_MEMBER_GROUPS,
+    EnhancedEmotionDetector, EnhancedFamilyDetector
+)
+from espaluz_country_contexts import COUNTRY_DETECTION_KEYWORDS, detect_country_from_context
+
+MAIN_NAMES = {"COUNTRY_KEYWORDS", "ROLE_KEYWORDS", "EMOTION_CUES", "LANGUAGE_EMOTION_CUES",
+              "COUNTRY_GROUPS", "ROLE_GROUPS", "EMOTION_CUE_GROUPS", "LANGUAGE_EMOTION_GROUPS",
+              "detect_country_from_text", "detect_role_from_text", "detect_emotion",
+              "detect_language_specific_emotions"}
+
+MESSAGES = [
+    "Hola! Estoy muy feliz hoy, vivo en Panamá con mi familia",
+    "I don't understand the subjunctive, it's too hard and I want to give up",
+    "No entiendo nada, estoy confundido y frustrado con los verbos",
+    "Мне грустно, скучаю по дому. Не понимаю испанский",
+    "My son is starting at a bilingual school in Medellín next week, any tips?",
+    "We're visiting Lima for a few days on vacation, where is a good hotel?",
+    "¿Cómo se dice 'I miss my family' en español?",
+    "Trabajo remoto desde un coworking en Buenos Aires, necesito wifi rápido",
+    "Finally understood what the pharmacist said! Thank god, what a relief",
+    "Help now please, emergency at the hospital in San José, urgent!",
+    "Soy estudiante y me interesa la cultura de México",
+    "ok",
+    "Tengo una pregunta sobre la comida en Quito. ¿Qué es típico?",
+    "Отлично! Меня поняли в магазине, получилось!",
+    "My clients at my restaurant are mostly tourists and expats come every day",
+    "Estoy de vacaciones en Santiago de Chile con mis hijos, ¿qué me recomiendas?",
+] * 4
+
+
+def load_main_detectors():
+    with open("main.py", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    wanted = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name in MAIN_NAMES:
+            wanted.append(node)
+        elif isinstance(node, ast.Assign) and any(getattr(t, "id", None) in MAIN_NAMES for t in node.targets):
+            wanted.append(node)
+    namespace = {"keyword_engine": keyword_engine, "KeywordGroups": KeywordGroups}
+    exec(compile(ast.Module(body=wanted, type_ignores=[]), "main.py", "exec"), namespace)
+    return namespace
+
+
+# --- previous implementations: nested substring loops -----------------------
+
+def make_legacy(main):
+    def detect_emotion(text):
+        text_lower = text.lower()
+        detected = {"curious": 0.2}
+        for emotion, keywords in main["EMOTION_CUES"].items():
+            for keyword in keywords:
+                if keyword in text_lower:
+                    detected[emotion] = detected.get(emotion, 0) + 0.3
+        dominant = max(detected.items(), key=lambda x: x[1])
+        return dominant[0], detected
+
+    def detect_language_specific_emotions(text):
+        text_lower = text.lower()
+        language_emotions = {"neutral": 0.3}
+        for emotion, cues in main["LANGUAGE_EMOTION_CUES"]:
+            if any(cue in text_lower for cue in cues):
+                language_emotions[emotion] = 0.8
+        return language_emotions
+
+    def first_match(table):
+        def detect(text):
+            text_lower = text.lower()
+            for key, keywords in table.items():
+                for keyword in keywords:
+                    if keyword in text_lower:
+                        return key
+            return None
+        return detect
+
+    def enhanced_emotion(text):
+        text_lower = text.lower()
+        detected = {}
+        for emotion, keywords_dict in EMOTION_KEYWORDS.items():
+            score, matched = 0.0, []
+            for keywords in keywords_dict.values():
+                for keyword in keywords:
+                    if keyword in text_lower:
+                        score += 0.3
+                        matched.append(keyword)
+            if score > 0:
+                detected[emotion] = {"score": min(score, 1.0), "matched": matched}
+        return detected
+
+    def member_scores(text):
+        text_lower = text.lower()
+        return {member_type.value: sum(1 for w in words if w in text_lower) * weight
+                for member_type, (words, weight) in FAMILY_MEMBER_KEYWORDS.items()}
+
+    return [
+        detect_emotion,
+        detect_language_specific_emotions,
+        first_match(main["COUNTRY_KEYWORDS"]),
+        first_match(main["ROLE_KEYWORDS"]),
+        enhanced_emotion,
+        member_scores,
+        first_match(COUNTRY_DETECTION_KEYWORDS),
+    ]
+
+
+def make_current(main):
+    """The detectors themselves - used for the parity check"""
+    emotion_detector = EnhancedEmotionDetector()
+    family_detector = EnhancedFamilyDetector()
+    return [
+        main["detect_emotion"],
+        main["detect_language_specific_emotions"],
+        main["detect_country_from_text"],
+        main["detect_role_from_text"],
+        lambda text: emotion_detector.detect_enhanced_emotion(text, "bench")["all_detected"],
+        lambda text: family_detector.detect_member_type(text)["scores"],
+        detect_country_from_context,
+    ]
+
+
+def make_current_keyword_steps(main):
+    """
+    Only the keyword part of the two brain detectors (their history tracking and
+    strategy lookups are not what changed), so the timing compares like for like
+    """
+    def enhanced_emotion(text):
+        detected = {}
+        for emotion, matched in EMOTION_KEYWORD_GROUPS.matched(keyword_engine.scan(text.lower())):
+            score = 0.0
+            for _ in matched:
+                score += 0.3
+            detected[emotion] = {"score": min(score, 1.0), "matched": matched}
+        return detected
+
+    def member_scores(text):
+        return {member_type.value: count * FAMILY_MEMBER_KEYWORDS[member_type][1]
+                for member_type, count in FAMILY_MEMBER_GROUPS.counts(keyword_engine.scan(text.lower()))}
+
+    return [
+        main["detect_emotion"],
+        main["detect_language_specific_emotions"],
+        main["detect_country_from_text"],
+        main["detect_role_from_text"],
+        enhanced_emotion,
+        member_scores,
+        detect_country_from_context,
+    ]
+
+
+def run_all(detectors, text, clear_cache=False):
+    if clear_cache:
+        keyword_engine.clear_cache()
+    return [detect(text) for detect in detectors]
+
+
+def timed(detectors, clear_cache, rounds=200):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in MESSAGES:
+            run_all(detectors, text, clear_cache)
+    return (time.perf_counter() - start) / (rounds * len(MESSAGES))
+
+
+def main():
+    main_ns = load_main_detectors()
+    legacy = make_legacy(main_ns)
+    current = make_current(main_ns)
+    current_steps = make_current_keyword_steps(main_ns)
+
+    mismatches = 0
+    for text in MESSAGES:
+        before = run_all(legacy, text)
+        after = run_all(current, text, clear_cache=True)
+        steps = run_all(current_steps, text, clear_cache=True)
+        for i, (a, b, c) in enumerate(zip(before, after, steps)):
+            if not a == b == c:
+                mismatches += 1
+                print(f"❌ detector {i} differs on {text!r}: {a} != {b}")
+    print(f"✅ Parity: {len(MESSAGES) * len(legacy) - mismatches}/{len(MESSAGES) * len(legacy)} results identical")
+    print(f"🔑 {len(keyword_engine)} keywords in the shared engine\n")
+
+    old = timed(legacy, clear_cache=False)
+    # The cache is cleared per message so every message pays for its scan
+    new = timed(current_steps, clear_cache=True)
+    print(f"⏱️ Substring loops:      {old * 1e6:8.1f} µs per message (all 7 detectors)")
+    print(f"⏱️ Keyword engine:       {new * 1e6:8.1f} µs per message (one scan, shared)")
+    print(f"📈 Speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
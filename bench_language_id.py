@@ -0,0 +1,195 @@
+"""
+Benchmark: language identification
+==================================
+Runs a labeled, held-out set of phrases - the kind of text Whisper hands to
+conversation mode, many of them single words, unaccented or code-switched -
+through the two previous detect_language heuristics (main.py and
+espaluz_conversation_mode) and through identify_language, and reports
+accuracy, the misses and the cost per phrase of each.
+
+identify_language's trigram model is trained on espaluz_language_id.SAMPLES;
+main refuses to run if any phrase here is one of those sentences, and reports
+how many phrases are made only of words the samples contain.
+
+The previous detectors only knew es/en/ru, so Portuguese phrases count
+against them as well.
+
+Usage:
+    python bench_language_id.py
+"""
+
+import re
+import time
+
+from espaluz_language_id import SAMPLES, identify_language
+
+# Held out from the model: none of these sentences appear in SAMPLES (checked
+# in main), and the topics steer clear of the ones SAMPLES covers. Single
+# words, fillers and code-switched utterances are included on purpose - they
+# are what a learner actually says into a voice note.
+PHRASES = [
+    # Spanish - short, often unaccented transcriptions
+    ("es", "vale"),
+    ("es", "de nada"),
+    ("es", "por que"),
+    ("es", "claro"),
+    ("es", "pues nada"),
+    ("es", "oye, una pregunta"),
+    ("es", "se me olvido la llave"),
+    ("es", "el perro ladra toda la noche"),
+    ("es", "ayer llovio muchisimo"),
+    ("es", "me llamo Ana y soy de Rusia"),
+    ("es", "cual es tu color favorito"),
+    ("es", "la reunion fue un desastre"),
+    ("es", "tengo que lavar la ropa"),
+    ("es", "el vecino tiene un gato negro"),
+    ("es", "quiero aprender a bailar salsa"),
+    ("es", "mi jefe llega tarde siempre"),
+    ("es", "¿Dónde compraste esos zapatos?"),
+    ("es", "el tren sale a las ocho"),
+    ("es", "hoy juega la seleccion"),
+    ("es", "no me gusta el cilantro"),
+    ("es", "ok, entonces nos vemos el sabado"),
+    ("es", "mi laptop no prende"),
+    ("es", "hay mucho trafico en la autopista"),
+    ("es", "pizza"),
+    # English
+    ("en", "bye"),
+    ("en", "ok"),
+    ("en", "yeah sure"),
+    ("en", "cool, got it"),
+    ("en", "my dog barks all night"),
+    ("en", "it rained a lot yesterday"),
+    ("en", "what's your favorite color"),
+    ("en", "the meeting was a disaster"),
+    ("en", "I have to do the laundry"),
+    ("en", "the neighbor has a black cat"),
+    ("en", "my boss is always late"),
+    ("en", "the train leaves at eight"),
+    ("en", "I forgot my keys again"),
+    ("en", "how do you say 'vale' in English"),
+    ("en", "my laptop won't turn on"),
+    ("en", "there is a lot of traffic on the highway"),
+    ("en", "nice, see you on Saturday"),
+    ("en", "is it pronounced with a soft c"),
+    # Portuguese
+    ("pt", "valeu"),
+    ("pt", "tchau"),
+    ("pt", "não sei"),
+    ("pt", "meu cachorro late a noite toda"),
+    ("pt", "choveu muito ontem"),
+    ("pt", "qual é a sua cor favorita"),
+    ("pt", "a reunião foi um desastre"),
+    ("pt", "eu esqueci as chaves de novo"),
+    ("pt", "o trem sai às oito"),
+    ("pt", "você fala inglês?"),
+    # Russian, pure and code-switched
+    ("ru", "пока"),
+    ("ru", "ладно"),
+    ("ru", "моя собака лает всю ночь"),
+    ("ru", "вчера шёл сильный дождь"),
+    ("ru", "как будет 'vale' по-испански"),
+    ("ru", "я забыл ключи"),
+    ("ru", "поезд уходит в восемь"),
+    ("ru", "ok, спасибо"),
+]
+
+
+# --- previous implementations -----------------------------------------------
+
+def main_detect_language(text):
+    if any('Ѐ' <= char <= 'ӿ' for char in text):
+        return 'ru'
+    spanish_markers = ['¿', '¡', 'ñ', 'á', 'é', 'í', 'ó', 'ú']
+    spanish_words = ['el', 'la', 'los', 'las', 'un', 'una', 'que', 'de', 'en', 'es', 'por', 'para', 'como', 'pero', 'más', 'este', 'esto', 'esta', 'ese', 'eso', 'esa', 'yo', 'tú', 'él', 'ella', 'nosotros', 'ustedes', 'ellos', 'hola', 'gracias', 'buenos', 'buenas']
+    text_lower = text.lower()
+    spanish_score = sum(1 for marker in spanish_markers if marker in text)
+    spanish_score += sum(1 for word in spanish_words if f' {word} ' in f' {text_lower} ' or text_lower.startswith(f'{word} ') or text_lower.endswith(f' {word}'))
+    english_words = ['the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'shall', 'can', 'need', 'dare', 'ought', 'used', 'to', 'of', 'in', 'for', 'on', 'with', 'at', 'by', 'from', 'as', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'between', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 'just', 'hello', 'hi', 'thanks', 'thank', 'please', 'yes', 'no', 'okay', 'ok']
+    english_score = sum(1 for word in english_words if f' {word} ' in f' {text_lower} ' or text_lower.startswith(f'{word} ') or text_lower.endswith(f' {word}'))
+    if spanish_score > english_score:
+        return 'es'
+    elif english_score > spanish_score:
+        return 'en'
+    return 'en'
+
+
+def convo_detect_language(text):
+    russian_chars = set('абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ')
+    spanish_words = {
+        'hola', 'como', 'esta', 'estas', 'que', 'donde', 'cuando', 'por', 'para',
+        'con', 'el', 'la', 'los', 'las', 'un', 'una', 'es', 'son', 'soy', 'eres',
+        'tengo', 'tiene', 'quiero', 'necesito', 'puedo', 'puede', 'hay', 'aqui',
+        'alli', 'bien', 'bueno', 'buena', 'gracias', 'por favor', 'si', 'no',
+        'yo', 'tu', 'el', 'ella', 'nosotros', 'ellos', 'mi', 'tu', 'su',
+        'cuanto', 'cuantos', 'cual', 'quien', 'porque', 'pero', 'tambien',
+        'muy', 'mucho', 'poco', 'mas', 'menos', 'ahora', 'hoy', 'manana'
+    }
+    spanish_special = set('áéíóúüñ¿¡')
+    text_lower = text.lower()
+    if any(c in russian_chars for c in text):
+        return 'ru'
+    if any(c in spanish_special for c in text_lower):
+        return 'es'
+    words = text_lower.split()
+    spanish_count = sum(1 for w in words if w.strip('.,!?¿¡') in spanish_words)
+    if len(words) > 0:
+        spanish_ratio = spanish_count / len(words)
+        if spanish_ratio >= 0.3 or spanish_count >= 2:
+            return 'es'
+    return 'en'
+
+
+def identify(text):
+    return identify_language(text)[0]
+
+
+def accuracy(detect):
+    misses = [(label, text, detect(text)) for label, text in PHRASES if detect(text) != label]
+    return 1 - len(misses) / len(PHRASES), misses
+
+
+def timed(detect, rounds=300):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _, text in PHRASES:
+            detect(text)
+    return (time.perf_counter() - start) / (rounds * len(PHRASES))
+
+
+def sentences_of(text):
+    return {" ".join(part.split()) for part in re.split(r"[.?!¿¡]", text.lower())} - {""}
+
+
+def check_held_out():
+    sample_sentences = set().union(*(sentences_of(sample) for sample in SAMPLES.values()))
+    leaked = [text for _, text in PHRASES if sentences_of(text) & sample_sentences]
+    if leaked:
+        raise SystemExit(f"❌ phrases taken from SAMPLES: {leaked}")
+    sample_words = set(re.findall(r"\w+", " ".join(SAMPLES.values()).lower()))
+    covered = sum(1 for _, text in PHRASES if sample_words.issuperset(re.findall(r"\w+", text.lower())))
+    print(f"📋 {len(PHRASES)} held-out phrases, none taken from SAMPLES "
+          f"({covered} made only of words the samples contain)\n")
+
+
+def main():
+    check_held_out()
+    detectors = [
+        ("main.py heuristic", main_detect_language),
+        ("convo-mode heuristic", convo_detect_language),
+        ("identify_language", identify),
+    ]
+    for name, detect in detectors:
+        score, misses = accuracy(detect)
+        print(f"🎯 {name:22s} accuracy {score:6.1%}   {timed(detect) * 1e6:6.1f} µs per phrase")
+        for label, text, got in misses:
+            print(f"     ❌ {text!r}: expected {label}, got {got}")
+
+    print("\n🔎 Confidence on a few short phrases:")
+    for text in ("si", "no", "ok", "bye", "vale", "de nada", "pizza", "donde esta el bano"):
+        lang, confidence = identify_language(text)
+        print(f"     {text!r:24s} → {lang} ({confidence:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Benchmark: learning-content analysis per exchange
+=================================================
+Runs the learning tracker's analysis of a set of (user message, reply)
+exchanges, once the previous way - enhance_language_learning_detection on the
+reply, again inside adapt_learning_path, plus the success / struggle
+detectors each re-scanning the user's message - and once through one
+analyze_exchange object shared by all of them. Checks that learned items and
+indicators are identical and reports the per-exchange cost of both.
+
+main.py cannot be imported without a bot token and its network side effects,
+so its FAMILY_MEMBERS table and the tracker functions are loaded from the
+source with ast.
+
+Usage:
+    python bench_learning_analysis.py
+"""
+
+import ast
+import re
+import time
+
+import espaluz_learning_analysis
+from espaluz_learning_analysis import (
+    SPANISH_IDIOMS, VOCABULARY_TOPICS, INDICATOR_PHRASES, analyze_exchange, analyze_text
+)
+
+MAIN_NAMES = {"FAMILY_MEMBERS", "identify_language_learning_content", "enhance_language_learning_detection",
+              "detect_success_indicators", "detect_struggle_indicators"}
+
+EXCHANGES = [
+    ("¿Cómo se dice 'I miss my family'?",
+     "Se dice 'echo de menos a mi familia'. Ayer hablé con mi madre y mañana la llamaré. "
+     "Poco a poco vas a practicar más. ¡Practica ahora!"),
+    ("I don't understand the subjunctive, it's too hard",
+     "No te preocupes. Usamos el subjuntivo después de 'que': espero que tengas un buen día. "
+     "Si tuviera más tiempo, estudiaría contigo. Más o menos, así funciona."),
+    ("What does 'reunión' mean?",
+     "'Reunión' significa meeting. En el trabajo, la reunión con el jefe es a las diez. "
+     "Mi colega preparó el proyecto en la oficina."),
+    ("gracias, ahora entiendo por y para",
+     "¡Excelente! Recuerda: por vs para es difícil al principio. Vamos al restaurante para comer, "
+     "y pagamos por la comida. Tengo ganas de un buen plato."),
+    ("Мне трудно, помоги с глаголами",
+     "Claro. Los verbos en pasado: hablé, comiste, vivió, trabajamos, viajaron. "
+     "En futuro: hablaré, comerás, vivirá. Condicional: me gustaría, podrían."),
+    ("ok.",
+     "¡Perfecto! Nos vemos mañana. Desayuna bien y ducharse antes de salir es buena idea."),
+    ("How do I conjugate ser and estar? I always confuse them",
+     "Ser vs estar: soy de Rusia, estoy en Panamá. El médico está en el hospital; "
+     "la salud es importante. Hazlo por favor, con calma."),
+    ("quiero viajar a Colombia con mi familia el próximo mes, ¿qué me recomiendas?",
+     "¡Qué buena idea! Para el viaje, reserva el hotel con tiempo. El avión a Medellín es rápido "
+     "y el tren no existe allí. Mis hijos y mi hermana viajaron el año pasado."),
+] * 4
+
+REVIEW_WORDS = ["familia", "médico", "mañana", "viaje", "hablaré", "jefe", "tiempo"]
+
+
+def load_main_functions():
+    with open("main.py", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    wanted = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name in MAIN_NAMES:
+            wanted.append(node)
+        elif isinstance(node, ast.Assign) and any(getattr(t, "id", None) in MAIN_NAMES for t in node.targets):
+            wanted.append(node)
+    namespace = {"analyze_exchange": analyze_exchange, "analyze_text": analyze_text, "re": re}
+    exec(compile(ast.Module(body=wanted, type_ignores=[]), "main.py", "exec"), namespace)
+    return namespace
+
+
+def make_session():
+    return {"context": {"learning": {"progress": {"vocabulary": {"spanish": {"needs_review": list(REVIEW_WORDS)}}}}}}
+
+
+# --- previous implementation: uncompiled regexes and substring loops, run twice ---
+
+GRAMMAR_PATTERNS = {
+    "past_tense": [r'\b(ayer|pasado).+\b(é|aste|ó|amos|aron)\b', r'\b\w+(é|aste|ó|amos|aron)\b'],
+    "future_tense": [r'\b(mañana|futuro).+\b\w+(ré|rás|rá|remos|rán)\b', r'\b\w+(ré|rás|rá|remos|rán)\b'],
+    "subjunctive": [r'\bque \w+(e|es|a|an|emos)\b', r'\bsi \w+(era|ese|ara)\b'],
+    "commands": [r'\b\w+(a|e|ad|ed)(!| ahora| por favor)\b'],
+    "conditional": [r'\b\w+(ría|rías|ría|ríamos|rían)\b']
+}
+
+
+def make_legacy(main):
+    family_members = main["FAMILY_MEMBERS"]
+
+    def identify(text, family_member):
+        learned_items = {"spanish_words": [], "english_words": [], "needs_review": [], "grammar_points": []}
+        spanish_words = re.findall(r'\b[a-záéíóúñ]{3,}\b', text.lower())
+        re.findall(r'\b[a-z]{3,}\b', text.lower())
+        for word in spanish_words:
+            if any(marker in word for marker in ['ñ', 'á', 'é', 'í', 'ó', 'ú']):
+                learned_items["spanish_words"].append(word)
+        if "por vs para" in text.lower():
+            learned_items["grammar_points"].append("por_vs_para")
+        elif "ser vs estar" in text.lower():
+            learned_items["grammar_points"].append("ser_vs_estar")
+        member_info = family_members.get(family_member, family_members["elena"])
+        if member_info["learning_level"] == "beginner":
+            learned_items["spanish_words"] = learned_items["spanish_words"][:3]
+        return learned_items
+
+    def enhance(text, family_member, session):
+        items = identify(text, family_member)
+        for point, patterns in GRAMMAR_PATTERNS.items():
+            for pattern in patterns:
+                if re.search(pattern, text.lower()):
+                    items["grammar_points"].append(point)
+                    break
+        for idiom in SPANISH_IDIOMS:
+            if idiom in text.lower():
+                items.setdefault("expressions", []).append(idiom)
+        text_lower = text.lower()
+        topics = [topic for topic, keywords in VOCABULARY_TOPICS.items()
+                  if any(keyword in text_lower for keyword in keywords)]
+        if topics:
+            items["vocabulary_topics"] = topics
+        advanced = len(items.get("expressions", [])) + len(items.get("grammar_points", []))
+        size = len(items["spanish_words"])
+        items["detected_level"] = ("advanced" if advanced >= 3 or size > 10 else
+                                   "intermediate" if advanced >= 1 or size > 5 else "beginner")
+        used = [word for word in session["context"]["learning"]["progress"]["vocabulary"]["spanish"]["needs_review"]
+                if word in text_lower]
+        if used:
+            items["mastered_words"] = used
+        return items
+
+    def success(user_input):
+        result = {"overall": 0.5, "vocabulary": 0.5, "grammar": 0.5, "comprehension": 0.5}
+        if any(phrase in user_input.lower() for phrase in INDICATOR_PHRASES["success"]):
+            result["overall"] += 0.3
+            result["comprehension"] += 0.4
+        if len(re.findall(r'\b[a-záéíóúñ]{3,}\b', user_input.lower())) > 3:
+            result["vocabulary"] += 0.3
+        if "por" in user_input.lower() and "para" in user_input.lower():
+            result["grammar"] += 0.2
+        if "ser" in user_input.lower() or "estar" in user_input.lower():
+            result["grammar"] += 0.2
+        return {key: min(1.0, value) for key, value in result.items()}
+
+    def struggle(user_input):
+        result = {"overall": 0.2, "vocabulary": 0.2, "grammar": 0.2, "comprehension": 0.2}
+        if any(phrase in user_input.lower() for phrase in INDICATOR_PHRASES["struggle"]):
+            result["overall"] += 0.4
+            result["comprehension"] += 0.5
+        if "?" in user_input and any(char in "???" for char in user_input):
+            result["overall"] += 0.3
+        if len(user_input.split()) < 4 and any(char in "!." for char in user_input):
+            result["overall"] += 0.2
+        if any(phrase in user_input.lower() for phrase in INDICATOR_PHRASES["vocabulary_struggle"]):
+            result["vocabulary"] += 0.6
+        if any(phrase in user_input.lower() for phrase in INDICATOR_PHRASES["grammar_struggle"]):
+            result["grammar"] += 0.6
+        return {key: min(1.0, value) for key, value in result.items()}
+
+    def track(user_input, reply, session):
+        items = enhance(reply, "elena", session)
+        enhance(reply, "elena", session)  # adapt_learning_path's second pass
+        return items, success(user_input), struggle(user_input)
+
+    return track
+
+
+def make_current(main):
+    def track(user_input, reply, session):
+        analysis = analyze_exchange(user_input, reply)
+        items = main["enhance_language_learning_detection"](reply, "elena", session, analysis.reply)
+        return (items,
+                main["detect_success_indicators"](user_input, reply, analysis),
+                main["detect_struggle_indicators"](user_input, reply, analysis))
+
+    return track
+
+
+def clear_caches():
+    espaluz_learning_analysis.analyze_text.cache_clear()
+    espaluz_learning_analysis.keyword_engine.clear_cache()
+
+
+def timed(track, clear, rounds=200):
+    session = make_session()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for user_input, reply in EXCHANGES:
+            if clear:
+                clear_caches()
+            track(user_input, reply, session)
+    return (time.perf_counter() - start) / (rounds * len(EXCHANGES))
+
+
+def main():
+    main_ns = load_main_functions()
+    legacy = make_legacy(main_ns)
+    current = make_current(main_ns)
+
+    mismatches = 0
+    for user_input, reply in EXCHANGES:
+        before = legacy(user_input, reply, make_session())
+        clear_caches()
+        after = current(user_input, reply, make_session())
+        if before != after:
+            mismatches += 1
+            print(f"❌ differs on {user_input!r}:\n   {before}\n   {after}")
+    print(f"✅ Parity: {len(EXCHANGES) - mismatches}/{len(EXCHANGES)} exchanges identical\n")
+
+    old = timed(legacy, clear=False)
+    # Caches are cleared per exchange so every exchange pays for its analysis
+    new = timed(current, clear=True)
+    print(f"⏱️ Previous (2 passes):  {old * 1e6:8.1f} µs per exchange")
+    print(f"⏱️ Shared analysis:      {new * 1e6:8.1f} µs per exchange")
+    print(f"📈 Speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Benchmark: speech text normalization
+====================================
+Parity suite and throughput for clean_text_for_speech, strip_emojis and
+strip_markdown_formatting (espaluz_speech_text) against the previous
+per-call-compiled versions from main.py, copied below.
+
+Parity is checked on hand-written edge cases (nested markdown, apostrophes,
+numbered lists, keycap digits, brackets, mixed scripts), on a set of long
+tutor replies and on random strings built from the characters the passes
+react to. Throughput is measured on the long replies.
+
+Usage:
+    python bench_speech_text.py
+"""
+
+import random
+import re
+import time
+
+from espaluz_speech_text import clean_text_for_speech, strip_emojis, strip_markdown_formatting
+
+EDGE_CASES = [
+    "",
+    "plain ascii text",
+    "**Hola** *amigo* _bien_ `code` 😀",
+    "*a_b* c_d",
+    "'a \"b' c\"",
+    "I don't know, it's fine",
+    "1. uno\n2. dos\n3. tres",
+    "x\n1.2.3. y",
+    "1.\n\n2. x",
+    "(1. foo) [bar] {baz} <qux> #tag @user",
+    "a ( b ) c",
+    "1️⃣ Primero 2️⃣ Segundo",
+    "🗣️ Español: ¡Hola! 🇵🇦 English: Hello! ✅❌💡",
+    "Привет 你好 안녕 ⭐ ☕ 🎓 🏖️",
+    "***triple*** and **bold*** and *it**",
+    "word*inside*word and *start",
+    "  \t spaced \n\n out  ",
+    "Precio: 3.50 USD. Visita 2.5 horas.",
+]
+
+REPLY = """🌟 **¡Excelente pregunta!** 🌟
+
+Vamos a ver la diferencia entre *ser* y *estar*:
+
+1. **Ser** se usa para características permanentes: "Soy de Rusia."
+2. **Estar** se usa para estados temporales: 'Estoy cansado.'
+3. Recuerda: `estar` + gerundio = acción en progreso (estoy aprendiendo).
+
+[VIDEO SCRIPT START]
+Español: ¡Hola! Hoy practicamos ser y estar. 😊
+English: Hi! Today we practice ser and estar. 🎯
+[VIDEO SCRIPT END]
+
+💡 _Consejo_: practica con frases de tu día a día en Panamá 🇵🇦 — el súper, la farmacia, el taxi.
+📖 Vocabulario: #aprender @espaluz {nuevo} <importante>
+"""
+
+LONG_REPLIES = [REPLY * n for n in (1, 3, 6)] + [
+    REPLY.replace("**", "").replace("🌟", "") * 4,
+    "The subjunctive doesn't exist in English the same way, but it's there: 'if I were you'. " * 30,
+]
+
+FUZZ_ALPHABET = list("ab c\n\t*_`\"'.1234567890#@[](){}<>") + ["😀", "\ufe0f", "\u20e3", "é", "ñ", "✅", "Ж"]
+
+
+# --- previous implementations (main.py) --------------------------------------
+
+def legacy_clean_text_for_speech(text: str) -> str:
+    """Remove punctuation marks, formatting AND EMOJIS for natural speech"""
+    # FIRST: Remove ALL emojis (so they're not pronounced!)
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"  # emoticons
+        "\U0001F300-\U0001F5FF"  # symbols & pictographs
+        "\U0001F680-\U0001F6FF"  # transport & map symbols
+        "\U0001F700-\U0001F77F"  # alchemical symbols
+        "\U0001F780-\U0001F7FF"  # Geometric Shapes Extended
+        "\U0001F800-\U0001F8FF"  # Supplemental Arrows-C
+        "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
+        "\U0001FA00-\U0001FA6F"  # Chess Symbols
+        "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
+        "\U00002702-\U000027B0"  # Dingbats
+        "\U000024C2-\U0001F251"  # Enclosed characters
+        "\U0001F1E0-\U0001F1FF"  # Flags
+        "\U00002600-\U000026FF"  # Misc symbols (sun, stars, etc)
+        "\U00002700-\U000027BF"  # Dingbats
+        "\U0000FE00-\U0000FE0F"  # Variation Selectors
+        "\U0001F000-\U0001F02F"  # Mahjong
+        "\U0001F0A0-\U0001F0FF"  # Playing cards
+        "\U00002B50"              # Star
+        "\U00002705"              # Check mark
+        "\U0000274C"              # X mark
+        "\U0001F4A1"              # Lightbulb
+        "\U0001F5E3"              # Speaking head
+        "\U0001F4D6"              # Book
+        "\U0001F30E"              # Globe
+        "\U0001F3AF"              # Target
+        "]+"
+    , re.UNICODE)
+    text = emoji_pattern.sub('', text)
+    
+    # Remove markdown formatting
+    text = re.sub(r'\*+([^*]+)\*+', r'\1', text)  # Remove asterisks
+    text = re.sub(r'_+([^_]+)_+', r'\1', text)    # Remove underscores
+    text = re.sub(r'`+([^`]+)`+', r'\1', text)    # Remove backticks
+    
+    # Remove quotes but keep the content
+    text = re.sub(r'"([^"]+)"', r'\1', text)
+    text = re.sub(r"'([^']+)'", r'\1', text)
+    
+    # Remove numbers in lists (1. 2. etc)
+    text = re.sub(r'^\d+\.\s*', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\n\d+\.\s*', '\n', text)
+    
+    # Remove emoji numbers
+    text = re.sub(r'[0-9]️⃣', '', text)
+    
+    # Remove other common symbols but keep sentence flow
+    text = re.sub(r'[#@\[\](){}<>]', '', text)
+    
+    # Clean up extra whitespace
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def legacy_strip_emojis(text: str) -> str:
+    """Remove ALL emojis from text (for TTS so they're not pronounced)"""
+    import re
+    # Comprehensive emoji pattern covering all Unicode emoji ranges
+    emoji_pattern = re.compile(
+        "["
+        "😀-🙏"  # emoticons
+        "🌀-🗿"  # symbols & pictographs
+        "🚀-🛿"  # transport & map symbols
+        "🜀-🝿"  # alchemical symbols
+        "🞀-🟿"  # Geometric Shapes Extended
+        "🠀-🣿"  # Supplemental Arrows-C
+        "🤀-🧿"  # Supplemental Symbols and Pictographs
+        "🨀-🩯"  # Chess Symbols
+        "🩰-🫿"  # Symbols and Pictographs Extended-A
+        "✂-➰"  # Dingbats
+        "Ⓜ-🉑"  # Enclosed characters
+        "🇠-🇿"  # Flags
+        "☀-⛿"  # Misc symbols (sun, stars, etc)
+        "✀-➿"  # Dingbats
+        "︀-️"  # Variation Selectors
+        "🀀-🀯"  # Mahjong
+        "🂠-🃿"  # Playing cards
+        "✅❌💡🗣️📖🌎🎯☕🎓🏖️"  # Common ones we use
+        "]+"
+    , re.UNICODE)
+    return emoji_pattern.sub('', text).strip()
+
+
+def legacy_strip_markdown_formatting(text: str) -> str:
+    """Remove **bold** and *italic* markdown from text"""
+    import re
+    # Remove **bold** -> bold
+    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)
+    # Remove *italic* -> italic (but not inside words)
+    text = re.sub(r'(?<![\w])\*([^*]+)\*(?![\w])', r'\1', text)
+    # Remove any remaining double asterisks
+    text = text.replace('**', '')
+    return text
+
+
+PAIRS = [
+    ("clean_text_for_speech", legacy_clean_text_for_speech, clean_text_for_speech),
+    ("strip_emojis", legacy_strip_emojis, strip_emojis),
+    ("strip_markdown_formatting", legacy_strip_markdown_formatting, strip_markdown_formatting),
+]
+
+
+def fuzz_cases(count=20000, seed=7):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 40))) for _ in range(count)]
+
+
+def check_parity():
+    cases = EDGE_CASES + LONG_REPLIES + fuzz_cases()
+    failures = 0
+    for name, old, new in PAIRS:
+        for text in cases:
+            expected, got = old(text), new(text)
+            if expected != got:
+                failures += 1
+                if failures <= 10:
+                    print(f"❌ {name}({text!r}): {expected!r} != {got!r}")
+    total = len(cases) * len(PAIRS)
+    print(f"✅ Parity: {total - failures}/{total} outputs identical")
+    return failures == 0
+
+
+def timed(func, rounds=200):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in LONG_REPLIES:
+            func(text)
+    return (time.perf_counter() - start) / (rounds * len(LONG_REPLIES))
+
+
+def main():
+    check_parity()
+    chars = sum(map(len, LONG_REPLIES)) // len(LONG_REPLIES)
+    print(f"\n⏱️ Long replies (~{chars} chars on average):")
+    for name, old, new in PAIRS:
+        before, after = timed(old), timed(new)
+        print(f"   {name:26s} {before * 1e6:8.1f} µs → {after * 1e6:7.1f} µs  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
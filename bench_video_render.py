@@ -0,0 +1,93 @@
+"""
+Benchmark: avatar video rendering
+=================================
+Compares the old per-reply render (libx264 re-encode of the 30s looped avatar
+clip with -shortest, as bulletproof_video_generator used to do) against
+espaluz_video.render_reply_video, which muxes the audio onto a precomputed loop
+with the video stream copied. Reports wall time per reply for both, for the
+regular video and the video_note variant, plus the one-off library build cost.
+
+Usage:
+    python bench_video_render.py                  # synthetic 640x480 base clip
+    python bench_video_render.py my_avatar.mp4    # your own base clip
+
+Needs ffmpeg/ffprobe on PATH. Everything happens in a temporary directory.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+import espaluz_video
+
+# Typical spoken lengths of a [VIDEO SCRIPT] block, in seconds
+AUDIO_LENGTHS = (6, 12, 20)
+RUNS = 3
+
+
+def ffmpeg(*args):
+    subprocess.run(["ffmpeg", "-y", "-v", "error"] + list(args), check=True)
+
+
+def make_base_clip(path):
+    ffmpeg("-f", "lavfi", "-i", "testsrc=size=640x480:rate=25:duration=6",
+           "-c:v", "libx264", "-pix_fmt", "yuv420p", "-g", "50", path)
+
+
+def make_audio(path, seconds):
+    ffmpeg("-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+           "-c:a", "libmp3lame", "-b:a", "64k", path)
+
+
+def old_render(looped_30s, audio, output):
+    ffmpeg("-i", looped_30s, "-i", audio, "-map", "0:v:0", "-map", "1:a:0",
+           "-c:v", "libx264", "-c:a", "aac", "-shortest", output)
+
+
+def timed(fn, *args):
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        sys.exit("ffmpeg and ffprobe are required for this benchmark")
+
+    workdir = tempfile.mkdtemp(prefix="espaluz_bench_video_")
+    try:
+        base = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else os.path.join(workdir, "base.mp4")
+        if len(sys.argv) <= 1:
+            make_base_clip(base)
+
+        # The old path rendered from a pre-made 30s loop ("looped_video.mp4")
+        looped_30s = os.path.join(workdir, "looped_video.mp4")
+        ffmpeg("-stream_loop", "-1", "-i", base, "-t", "30", "-an", "-c:v", "copy", looped_30s)
+
+        library = espaluz_video.LoopLibrary(base, os.path.join(workdir, "library"))
+        start = time.perf_counter()
+        if not library.prepare():
+            sys.exit("Could not build the loop library")
+        print(f"📚 Loop library built once in {time.perf_counter() - start:.2f}s\n")
+
+        print(f"{'audio s':>7} {'re-encode s':>12} {'copy mux s':>11} {'note mux s':>11} {'speedup':>8}")
+        for seconds in AUDIO_LENGTHS:
+            audio = os.path.join(workdir, f"audio_{seconds}.mp3")
+            make_audio(audio, seconds)
+            out = os.path.join(workdir, "out.mp4")
+            old = timed(old_render, looped_30s, audio, out)
+            new = timed(espaluz_video.render_reply_video, audio, out, False, None, library)
+            note = timed(espaluz_video.render_reply_video, audio, out, True, None, library)
+            print(f"{seconds:7d} {old:12.2f} {new:11.3f} {note:11.3f} {old / new:7.0f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
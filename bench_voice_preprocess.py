@@ -0,0 +1,102 @@
+"""
+Benchmark: voice preprocessing before speech-to-text
+====================================================
+Runs espaluz_voice_input.preprocess_voice (16 kHz mono decode, VAD silence
+trimming, Opus re-encode) over sample clips and reports, per clip and in
+total, the seconds and bytes that no longer get uploaded to Whisper, plus the
+CPU time the preprocessing itself costs.
+
+Usage:
+    python bench_voice_preprocess.py voice1.ogg voice2.ogg ...
+    python bench_voice_preprocess.py            # synthetic clips with long pauses
+
+Needs ffmpeg on PATH. No API calls are made.
+"""
+
+import sys
+import math
+import time
+import random
+from array import array
+
+import espaluz_voice_input as voice_input
+
+SAMPLE_RATE = voice_input.STT_SAMPLE_RATE
+
+
+def synth_segment(seconds, speech):
+    """Noise floor, plus a wobbling voiced tone when speech=True"""
+    samples = []
+    for i in range(int(seconds * SAMPLE_RATE)):
+        value = random.gauss(0, 80)
+        if speech:
+            t = i / SAMPLE_RATE
+            envelope = 0.6 + 0.4 * math.sin(2 * math.pi * 3 * t)
+            value += 7000 * envelope * math.sin(2 * math.pi * (180 + 40 * math.sin(2 * math.pi * 5 * t)) * t)
+        samples.append(max(-32768, min(32767, int(value))))
+    return samples
+
+
+def synthetic_clips():
+    """Voice-note shapes seen in conversation mode: (name, [(seconds, is_speech), ...])"""
+    layouts = [
+        ("short phrase, late release", [(0.8, False), (2.0, True), (3.0, False)]),
+        ("pharmacy question w/ pauses", [(1.5, False), (2.5, True), (2.5, False), (2.0, True), (4.0, False)]),
+        ("doctor visit, long thinking", [(2.0, False), (3.0, True), (5.0, False), (3.0, True), (6.0, False), (2.0, True), (3.0, False)]),
+        ("continuous speech", [(0.3, False), (8.0, True), (0.3, False)]),
+    ]
+    clips = []
+    for name, layout in layouts:
+        samples = []
+        for seconds, speech in layout:
+            samples.extend(synth_segment(seconds, speech))
+        audio = voice_input.encode_pcm_to_opus(array("h", samples).tobytes())
+        if audio is None:
+            sys.exit("ffmpeg with libopus is required for this benchmark")
+        clips.append((name, audio))
+    return clips
+
+
+def file_clips(paths):
+    clips = []
+    for path in paths:
+        with open(path, "rb") as f:
+            clips.append((path, f.read()))
+    return clips
+
+
+def duration_seconds(audio):
+    pcm = voice_input.decode_to_pcm(audio)
+    return len(pcm) / (SAMPLE_RATE * 2) if pcm else 0.0
+
+
+def main():
+    clips = file_clips(sys.argv[1:]) if len(sys.argv) > 1 else synthetic_clips()
+
+    print(f"{'clip':<32} {'sec in':>7} {'sec out':>8} {'KB in':>7} {'KB out':>7} {'cpu ms':>7}")
+    totals = [0.0, 0.0, 0, 0, 0.0]
+    for name, audio in clips:
+        seconds_in = duration_seconds(audio)
+        start = time.perf_counter()
+        processed = voice_input.preprocess_voice(audio)
+        elapsed = time.perf_counter() - start
+        if processed is None:
+            print(f"{name:<32} preprocessing failed")
+            continue
+        seconds_out = duration_seconds(processed) if processed else 0.0
+        row = (seconds_in, seconds_out, len(audio), len(processed), elapsed)
+        totals = [a + b for a, b in zip(totals, row)]
+        print(f"{name[:32]:<32} {seconds_in:7.1f} {seconds_out:8.1f} "
+              f"{len(audio) / 1024:7.1f} {len(processed) / 1024:7.1f} {elapsed * 1000:7.1f}")
+
+    seconds_in, seconds_out, bytes_in, bytes_out, elapsed = totals
+    if seconds_in:
+        print(f"\n📊 Audio sent to Whisper: {seconds_in:.1f}s → {seconds_out:.1f}s "
+              f"(saved {seconds_in - seconds_out:.1f}s, {100 * (1 - seconds_out / seconds_in):.0f}%)")
+        print(f"📦 Upload size: {bytes_in / 1024:.1f}KB → {bytes_out / 1024:.1f}KB "
+              f"(saved {(bytes_in - bytes_out) / 1024:.1f}KB)")
+        print(f"⏱️ Preprocessing CPU time: {elapsed * 1000:.0f}ms total")
+
+
+if __name__ == "__main__":
+    main()
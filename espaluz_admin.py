@@ -16,6 +16,8 @@ try:
 except ImportError:
     paypal_system = None
 
+from espaluz_translation_cache import read_translation_cache_stats
+
 # HTML Templates
 ADMIN_TEMPLATE = '''
 <!DOCTYPE html>
@@ -552,12 +554,18 @@ def create_admin_app():
                 "stats": paypal_system.get_stats(),
                 "trials": paypal_system.get_all_trials(),
                 "subscribers": paypal_system.get_all_subscribers(),
+                "translation_cache": read_translation_cache_stats(),
                 "exported_at": datetime.now().isoformat()
             }
             return jsonify(data)
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
+    @admin_app.route('/admin/translation-cache')
+    def translation_cache_stats():
+        """Translation cache hit/miss counters (as last synced by the bot)"""
+        return jsonify(read_translation_cache_stats())
+    
     @admin_app.route('/health')
     def health_check():
         """Health check endpoint"""
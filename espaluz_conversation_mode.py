@@ -4,11 +4,13 @@ EspaLuz Conversation Mode
 Real-time voice translation like Google Translate.
 Voice -> Transcribe -> Translate -> Voice response
 
-Supports: Spanish ↔ English ↔ Russian
+Supports: Spanish ↔ English ↔ Russian (Portuguese is recognized as a source)
 """
 
 from datetime import datetime
 
+from espaluz_language_id import identify_language
+
 class ConversationMode:
     """Manages conversation mode state for users"""
     
@@ -59,48 +61,10 @@ conversation_mode = ConversationMode()
 
 def detect_language(text):
     """
-    Detect language of text using heuristics.
-    Returns: 'es' (Spanish), 'en' (English), or 'ru' (Russian)
+    Detect language of text.
+    Returns: 'es' (Spanish), 'en' (English), 'pt' (Portuguese) or 'ru' (Russian)
     """
-    # Russian characters
-    russian_chars = set('абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ')
-    
-    # Spanish common words
-    spanish_words = {
-        'hola', 'como', 'esta', 'estas', 'que', 'donde', 'cuando', 'por', 'para', 
-        'con', 'el', 'la', 'los', 'las', 'un', 'una', 'es', 'son', 'soy', 'eres',
-        'tengo', 'tiene', 'quiero', 'necesito', 'puedo', 'puede', 'hay', 'aqui',
-        'alli', 'bien', 'bueno', 'buena', 'gracias', 'por favor', 'si', 'no',
-        'yo', 'tu', 'el', 'ella', 'nosotros', 'ellos', 'mi', 'tu', 'su',
-        'cuanto', 'cuantos', 'cual', 'quien', 'porque', 'pero', 'tambien',
-        'muy', 'mucho', 'poco', 'mas', 'menos', 'ahora', 'hoy', 'manana'
-    }
-    
-    # Spanish special characters
-    spanish_special = set('áéíóúüñ¿¡')
-    
-    text_lower = text.lower()
-    
-    # Check for Russian characters first
-    if any(c in russian_chars for c in text):
-        return 'ru'
-    
-    # Check for Spanish special characters
-    if any(c in spanish_special for c in text_lower):
-        return 'es'
-    
-    # Check for Spanish words
-    words = text_lower.split()
-    spanish_count = sum(1 for w in words if w.strip('.,!?¿¡') in spanish_words)
-    
-    # If significant Spanish words found
-    if len(words) > 0:
-        spanish_ratio = spanish_count / len(words)
-        if spanish_ratio >= 0.3 or spanish_count >= 2:
-            return 'es'
-    
-    # Default to English
-    return 'en'
+    return identify_language(text)[0]
 
 
 def get_opposite_language(lang, target_lang=None):
@@ -127,7 +91,8 @@ def get_quick_translate_prompt(text, source_lang, target_lang):
     lang_names = {
         'en': 'English',
         'es': 'Spanish', 
-        'ru': 'Russian'
+        'ru': 'Russian',
+        'pt': 'Portuguese'
     }
     
     source_name = lang_names.get(source_lang, 'English')
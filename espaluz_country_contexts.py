@@ -15,6 +15,8 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
 
+from espaluz_keywords import KeywordGroups, keyword_engine
+
 
 # =============================================================================
 # ALL 21 SPANISH-SPEAKING COUNTRIES
@@ -1277,27 +1279,23 @@ def get_situation_phrases(situation: str, language: str = "both") -> Dict:
     return phrases
 
 
+COUNTRY_DETECTION_KEYWORDS = {
+    Country.PANAMA: ["panama", "panamá", "panama city", "casco viejo", "balboa"],
+    Country.MEXICO: ["mexico", "méxico", "cdmx", "ciudad de mexico"],
+    Country.COLOMBIA: ["colombia", "bogota", "bogotá", "medellin", "medellín"],
+    Country.ARGENTINA: ["argentina", "buenos aires", "argentina peso"],
+    Country.SPAIN: ["españa", "spain", "madrid", "barcelona"],
+    Country.COSTA_RICA: ["costa rica", "san jose", "san josé", "pura vida"],
+    Country.PERU: ["peru", "perú", "lima"],
+    Country.CHILE: ["chile", "santiago"],
+    Country.ECUADOR: ["ecuador", "quito", "guayaquil"]
+}
+COUNTRY_DETECTION_GROUPS = KeywordGroups(COUNTRY_DETECTION_KEYWORDS.items())
+
+
 def detect_country_from_context(text: str) -> Optional[Country]:
     """Detect which country user might be referring to."""
-    text_lower = text.lower()
-    
-    country_keywords = {
-        Country.PANAMA: ["panama", "panamá", "panama city", "casco viejo", "balboa"],
-        Country.MEXICO: ["mexico", "méxico", "cdmx", "ciudad de mexico"],
-        Country.COLOMBIA: ["colombia", "bogota", "bogotá", "medellin", "medellín"],
-        Country.ARGENTINA: ["argentina", "buenos aires", "argentina peso"],
-        Country.SPAIN: ["españa", "spain", "madrid", "barcelona"],
-        Country.COSTA_RICA: ["costa rica", "san jose", "san josé", "pura vida"],
-        Country.PERU: ["peru", "perú", "lima"],
-        Country.CHILE: ["chile", "santiago"],
-        Country.ECUADOR: ["ecuador", "quito", "guayaquil"]
-    }
-    
-    for country, keywords in country_keywords.items():
-        if any(kw in text_lower for kw in keywords):
-            return country
-    
-    return None
+    return COUNTRY_DETECTION_GROUPS.first(keyword_engine.scan(text.lower()))
 
 
 def get_urgent_phrases(situation: str, country: Country = None) -> Dict:
@@ -24,6 +24,8 @@ from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict, field
 from enum import Enum
 
+from espaluz_keywords import KeywordGroups, keyword_engine
+
 
 # =============================================================================
 # EMOTIONAL STATES - 50+ expat-specific emotions
@@ -257,6 +259,12 @@ EMOTION_KEYWORDS = {
     }
 }
 
+# Each emotion's keywords across all languages, in table order
+EMOTION_KEYWORD_GROUPS = KeywordGroups(
+    (emotion, [keyword for keywords in by_lang.values() for keyword in keywords])
+    for emotion, by_lang in EMOTION_KEYWORDS.items()
+)
+
 
 # =============================================================================
 # EMOTIONAL RESPONSE STRATEGIES
@@ -348,19 +356,15 @@ class EnhancedEmotionDetector:
         Returns:
             Dict with enhanced emotional analysis
         """
-        text_lower = text.lower()
+        # One scan of the shared keyword engine covers every language list
+        hits = keyword_engine.scan(text.lower())
         detected_emotions = {}
         
         # Check all emotion keywords
-        for emotion, keywords_dict in EMOTION_KEYWORDS.items():
+        for emotion, matched_keywords in EMOTION_KEYWORD_GROUPS.matched(hits):
             score = 0.0
-            matched_keywords = []
-            
-            for lang, keywords in keywords_dict.items():
-                for keyword in keywords:
-                    if keyword in text_lower:
-                        score += 0.3
-                        matched_keywords.append(keyword)
+            for _ in matched_keywords:
+                score += 0.3
             
             if score > 0:
                 detected_emotions[emotion] = {
@@ -545,6 +549,29 @@ FAMILY_MEMBER_CHARACTERISTICS = {
 }
 
 
+# Family member indicators: type -> (keywords, score per keyword hit)
+FAMILY_MEMBER_KEYWORDS = {
+    # Young child indicators
+    FamilyMemberType.YOUNG_CHILD: (["mama", "papa", "mommy", "daddy", "play", "toy", "cartoon",
+                                    "mamá", "papá", "jugar", "juguete"], 0.3),
+    # Parent indicators
+    FamilyMemberType.PARENT: (["my child", "my kid", "my son", "my daughter", "school for",
+                               "mi hijo", "mi hija", "escuela para", "looking for schools",
+                               "preschool", "kindergarten", "bilingual school"], 0.4),
+    # Service provider indicators
+    FamilyMemberType.SERVICE_PROVIDER: (["my customers", "my clients", "my restaurant", "my hotel",
+                                         "mis clientes", "mi restaurante", "better service",
+                                         "tourists", "expats come", "work in hospitality"], 0.4),
+    # Traveler indicators
+    FamilyMemberType.TRAVELER: (["visiting", "on vacation", "tourist", "few days", "trip",
+                                 "de vacaciones", "turista", "viaje", "hotel", "airbnb"], 0.3),
+    # Digital nomad indicators
+    FamilyMemberType.DIGITAL_NOMAD: (["remote work", "coworking", "wifi", "digital nomad",
+                                      "trabajo remoto", "nómada digital", "coffee shop with wifi"], 0.4),
+}
+FAMILY_MEMBER_GROUPS = KeywordGroups((member_type, words) for member_type, (words, _) in FAMILY_MEMBER_KEYWORDS.items())
+
+
 class EnhancedFamilyDetector:
     """Detect and track family member types for personalization."""
     
@@ -554,35 +581,11 @@ class EnhancedFamilyDetector:
     
     def detect_member_type(self, text: str, user_id: str = None) -> Dict[str, Any]:
         """Detect family member type from message patterns."""
-        text_lower = text.lower()
+        hits = keyword_engine.scan(text.lower())
         scores = {}
         
-        # Young child indicators
-        child_words = ["mama", "papa", "mommy", "daddy", "play", "toy", "cartoon", 
-                      "mamá", "papá", "jugar", "juguete"]
-        scores[FamilyMemberType.YOUNG_CHILD] = sum(1 for w in child_words if w in text_lower) * 0.3
-        
-        # Parent indicators
-        parent_words = ["my child", "my kid", "my son", "my daughter", "school for", 
-                       "mi hijo", "mi hija", "escuela para", "looking for schools",
-                       "preschool", "kindergarten", "bilingual school"]
-        scores[FamilyMemberType.PARENT] = sum(1 for w in parent_words if w in text_lower) * 0.4
-        
-        # Service provider indicators
-        service_words = ["my customers", "my clients", "my restaurant", "my hotel",
-                        "mis clientes", "mi restaurante", "better service",
-                        "tourists", "expats come", "work in hospitality"]
-        scores[FamilyMemberType.SERVICE_PROVIDER] = sum(1 for w in service_words if w in text_lower) * 0.4
-        
-        # Traveler indicators
-        traveler_words = ["visiting", "on vacation", "tourist", "few days", "trip",
-                         "de vacaciones", "turista", "viaje", "hotel", "airbnb"]
-        scores[FamilyMemberType.TRAVELER] = sum(1 for w in traveler_words if w in text_lower) * 0.3
-        
-        # Digital nomad indicators
-        nomad_words = ["remote work", "coworking", "wifi", "digital nomad", 
-                      "trabajo remoto", "nómada digital", "coffee shop with wifi"]
-        scores[FamilyMemberType.DIGITAL_NOMAD] = sum(1 for w in nomad_words if w in text_lower) * 0.4
+        for member_type, count in FAMILY_MEMBER_GROUPS.counts(hits):
+            scores[member_type] = count * FAMILY_MEMBER_KEYWORDS[member_type][1]
         
         # Find best match
         if scores:
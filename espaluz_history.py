@@ -0,0 +1,129 @@
+"""
+EspaLuz Conversation History
+============================
+Bounded per-session conversation history.
+
+session["messages"] used to grow forever even though Claude only ever sees the
+last MAX_HISTORY_MESSAGES. HistoryBuffer is a list that keeps at most
+HISTORY_MAX_MESSAGES turns in memory; older turns are folded into a compact
+session["history_summary"] record (and optionally appended to a per-user JSONL
+archive on disk). It is still a list, so existing session["messages"].append()
+calls and JSON persistence keep working unchanged.
+
+Usage:
+    from espaluz_history import bound_session_history
+
+    bound_session_history(session)   # after creating or loading a session
+    session["messages"].append({"role": "user", "content": text})
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# In-memory cap per session - must stay above MAX_HISTORY_MESSAGES in main.py
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", 40))
+# Optional directory for per-user JSONL archives of evicted turns (empty = off)
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR", "")
+# How many recent user snippets the summary keeps, and how long each may be
+SUMMARY_SNIPPETS = 5
+SUMMARY_SNIPPET_CHARS = 80
+
+
+def _new_summary() -> Dict[str, Any]:
+    return {
+        "turns_archived": 0,
+        "user_turns": 0,
+        "assistant_turns": 0,
+        "first_archived_at": None,
+        "last_archived_at": None,
+        "recent_user_snippets": []
+    }
+
+
+class HistoryBuffer(list):
+    """A list of chat turns that rolls its oldest turns into a summary"""
+
+    def __init__(self, iterable=(), summary: Optional[Dict[str, Any]] = None,
+                 user_id: Optional[str] = None, maxlen: int = HISTORY_MAX_MESSAGES):
+        super().__init__(iterable)
+        self.summary = summary if summary is not None else _new_summary()
+        self.user_id = user_id
+        # Even cap so the retained window always starts on a user turn
+        self.maxlen = max(2, maxlen - maxlen % 2)
+        self._trim()
+
+    def append(self, item):
+        super().append(item)
+        self._trim()
+
+    def extend(self, items):
+        super().extend(items)
+        self._trim()
+
+    def _trim(self):
+        overflow = len(self) - self.maxlen
+        if overflow <= 0:
+            return
+        # Evict whole user/assistant pairs where possible
+        overflow += overflow % 2
+        evicted = self[:overflow]
+        del self[:overflow]
+        self._roll_into_summary(evicted)
+        if HISTORY_ARCHIVE_DIR and self.user_id:
+            archive_turns(self.user_id, evicted)
+
+    def _roll_into_summary(self, evicted: List[Dict[str, Any]]):
+        now = datetime.now().isoformat()
+        summary = self.summary
+        summary["turns_archived"] += len(evicted)
+        summary["first_archived_at"] = summary["first_archived_at"] or now
+        summary["last_archived_at"] = now
+        snippets = summary["recent_user_snippets"]
+        for turn in evicted:
+            role = turn.get("role")
+            if role == "user":
+                summary["user_turns"] += 1
+                content = turn.get("content")
+                if isinstance(content, str) and content.strip():
+                    snippets.append(content.strip()[:SUMMARY_SNIPPET_CHARS])
+            elif role == "assistant":
+                summary["assistant_turns"] += 1
+        del snippets[:-SUMMARY_SNIPPETS]
+
+
+def archive_turns(user_id: str, turns: List[Dict[str, Any]]):
+    """Append evicted turns to HISTORY_ARCHIVE_DIR/<user_id>.jsonl"""
+    try:
+        os.makedirs(HISTORY_ARCHIVE_DIR, exist_ok=True)
+        path = os.path.join(HISTORY_ARCHIVE_DIR, f"{user_id}.jsonl")
+        with open(path, "a", encoding="utf-8") as f:
+            for turn in turns:
+                f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+    except Exception as e:
+        logging.error(f"History archive error for {user_id}: {e}")
+
+
+def bound_session_history(session: Dict[str, Any], user_id: Optional[str] = None) -> Dict[str, Any]:
+    """Wrap session["messages"] in a HistoryBuffer, trimming it if it is too long"""
+    messages = session.get("messages", [])
+    if isinstance(messages, HistoryBuffer):
+        return session
+    if user_id is None:
+        user_id = session.get("context", {}).get("user", {}).get("id")
+    summary = session.setdefault("history_summary", _new_summary())
+    session["messages"] = HistoryBuffer(messages, summary=summary, user_id=user_id)
+    return session
+
+
+def migrate_session_histories(sessions: Dict[str, Dict[str, Any]]) -> int:
+    """Bound every loaded session; returns how many had to be trimmed"""
+    trimmed = 0
+    for user_id, session in sessions.items():
+        before = len(session.get("messages", []))
+        bound_session_history(session, user_id)
+        if len(session["messages"]) < before:
+            trimmed += 1
+    return trimmed
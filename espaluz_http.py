@@ -0,0 +1,236 @@
+"""
+EspaLuz HTTP Clients
+====================
+Shared keep-alive clients for every outbound API call.
+
+Each call used to go through a bare requests.post()/requests.get() (or a brand
+new anthropic/OpenAI SDK client), so every message paid DNS + TCP + TLS setup
+again and some calls had no timeout at all. This module owns one pooled
+requests.Session per provider plus cached SDK clients, with:
+
+- keep-alive connection pools, capped per provider (HTTP_POOL_<PROVIDER>)
+- a default (connect, read) timeout per provider, overridable per call; for
+  anthropic the default read timeout is scoped to streaming, and one-shot
+  Messages API calls use ANTHROPIC_MESSAGE_TIMEOUT
+- retry with full jitter on connection failures and 429/5xx/529 responses,
+  honouring Retry-After - for idempotent requests only. A write that may
+  already have reached the server (dropped connection, 502 after commit) is
+  not repeated: non-idempotent requests are only retried when they never left
+  (connect error / connect timeout) or were turned away with 429/529. GETs
+  are idempotent; POSTs only for providers whose POSTs just generate text
+  (anthropic, openai) or with an explicit idempotent=True
+
+Usage:
+    from espaluz_http import http_post, anthropic_client
+
+    res = http_post("openai", OPENAI_CHAT_URL, headers=headers, json=data)
+    client = anthropic_client()
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+ANTHROPIC_MESSAGES_URL = "https://api.anthropic.com/v1/messages"
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+OPENAI_TRANSCRIPTIONS_URL = "https://api.openai.com/v1/audio/transcriptions"
+SUPABASE_FUNCTIONS_URL = "https://euyidvolwqmzijkfrplh.supabase.co/functions/v1"
+
+# Retries after the first attempt, and the jitter backoff base/cap in seconds
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 2))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 8))
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504, 529})
+# Statuses that mean the request was refused before being processed - safe to
+# retry even for writes
+REFUSED_STATUSES = frozenset({429, 529})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Per-provider pool size and default (connect, read) timeout. With stream=True
+# the read timeout is the longest gap between two chunks. idempotent_post marks
+# providers whose POSTs write nothing (completions), so they keep full retries
+PROVIDERS = {
+    "anthropic": {"pool": 8, "timeout": (10, 60), "idempotent_post": True},
+    "openai": {"pool": 8, "timeout": (10, 60), "idempotent_post": True},
+    "supabase": {"pool": 4, "timeout": (5, 10)},
+    "paypal": {"pool": 4, "timeout": (10, 30)},
+    "telegram": {"pool": 2, "timeout": (10, 30)},
+}
+DEFAULT_PROVIDER = {"pool": 4, "timeout": (10, 30)}
+
+# A non-streaming Messages API call gets no bytes until the whole reply is
+# done - with extended thinking that can take minutes, far past the streaming
+# read timeout above. Used by one-shot anthropic calls and the SDK client
+ANTHROPIC_MESSAGE_TIMEOUT = (10, float(os.getenv("ANTHROPIC_MESSAGE_READ_TIMEOUT", 600)))
+
+_sessions: Dict[str, requests.Session] = {}
+_sdk_clients: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def provider_config(provider: str) -> Dict[str, Any]:
+    config = dict(PROVIDERS.get(provider, DEFAULT_PROVIDER))
+    config["pool"] = int(os.getenv(f"HTTP_POOL_{provider.upper()}", config["pool"]))
+    return config
+
+
+def get_session(provider: str) -> requests.Session:
+    """Return the shared keep-alive session for a provider, creating it on first use"""
+    session = _sessions.get(provider)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(provider)
+        if session is None:
+            pool_size = provider_config(provider)["pool"]
+            # pool_block makes extra threads wait for a connection instead of
+            # opening throwaway ones past the cap
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[provider] = session
+    return session
+
+
+def _backoff_delay(attempt: int, response: Optional[requests.Response] = None) -> float:
+    """Full-jitter exponential backoff, or the server's Retry-After if it sent one"""
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), HTTP_BACKOFF_MAX)
+            except ValueError:
+                pass
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+
+def _rewind_files(files):
+    """Seek uploaded file objects back to the start before a retry"""
+    if not files:
+        return
+    values = files.values() if isinstance(files, dict) else [f for _, f in files]
+    for value in values:
+        fileobj = value[1] if isinstance(value, tuple) else value
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+
+
+def _never_sent(error: requests.RequestException) -> bool:
+    """Whether a failed request provably never reached the server"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # Refused / unresolvable: requests wraps urllib3's MaxRetryError around it
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def http_request(method: str, provider: str, url: str,
+                 timeout: Optional[Tuple[float, float]] = None,
+                 retries: Optional[int] = None,
+                 idempotent: Optional[bool] = None, **kwargs) -> requests.Response:
+    """
+    Send a request through the provider's pooled session.
+    Retries connection failures and retryable statuses; the last response
+    (whatever its status) or exception is returned/raised to the caller.
+    Non-idempotent requests (POSTs unless the provider or idempotent=True says
+    otherwise) are only retried if they never left or got a 429/529.
+    """
+    session = get_session(provider)
+    config = provider_config(provider)
+    if timeout is None:
+        timeout = config["timeout"]
+    if retries is None:
+        retries = HTTP_MAX_RETRIES
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS or (
+            method.upper() == "POST" and config.get("idempotent_post", False))
+    retry_statuses = RETRY_STATUSES if idempotent else REFUSED_STATUSES
+
+    attempt = 0
+    while True:
+        if attempt:
+            _rewind_files(kwargs.get("files"))
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            # A read timeout may mean the server is still working - don't pile on;
+            # a write that may have arrived is not sent twice
+            if (isinstance(e, requests.ReadTimeout) or attempt >= retries
+                    or not (idempotent or _never_sent(e))):
+                raise
+            delay = _backoff_delay(attempt)
+            logging.warning(f"{provider} request failed ({e}), retrying in {delay:.2f}s")
+        else:
+            if response.status_code not in retry_statuses or attempt >= retries:
+                return response
+            delay = _backoff_delay(attempt, response)
+            logging.warning(f"{provider} returned {response.status_code}, retrying in {delay:.2f}s")
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+def http_post(provider: str, url: str, **kwargs) -> requests.Response:
+    return http_request("POST", provider, url, **kwargs)
+
+
+def http_get(provider: str, url: str, **kwargs) -> requests.Response:
+    return http_request("GET", provider, url, **kwargs)
+
+
+def _sdk_client(name: str, factory):
+    client = _sdk_clients.get(name)
+    if client is None:
+        with _lock:
+            client = _sdk_clients.get(name)
+            if client is None:
+                client = _sdk_clients[name] = factory()
+    return client
+
+
+def anthropic_client():
+    """Shared anthropic.Anthropic client - its httpx pool stays warm between messages"""
+    def factory():
+        import anthropic
+        # SDK calls here are one-shot messages.create, never streamed
+        connect, read = ANTHROPIC_MESSAGE_TIMEOUT
+        return anthropic.Anthropic(
+            api_key=os.environ.get("CLAUDE_API_KEY"),
+            timeout=read,
+            max_retries=HTTP_MAX_RETRIES
+        )
+    return _sdk_client("anthropic", factory)
+
+
+def openai_client():
+    """Shared OpenAI client (SDK v1.0+)"""
+    def factory():
+        from openai import OpenAI
+        connect, read = provider_config("openai")["timeout"]
+        return OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=read,
+            max_retries=HTTP_MAX_RETRIES
+        )
+    return _sdk_client("openai", factory)
+
+
+def close_all():
+    """Close every pooled session and SDK client"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        for client in _sdk_clients.values():
+            close = getattr(client, "close", None)
+            if close:
+                close()
+        _sdk_clients.clear()
@@ -0,0 +1,172 @@
+"""
+EspaLuz Keyword Engine
+======================
+One multi-pattern matcher for every keyword-based detector.
+
+Emotion, language-specific emotion, enhanced emotion, family member, country
+and role detection each used to loop over their own keyword lists with
+`if keyword in text_lower`, i.e. hundreds of substring scans per message.
+Now every detector registers its keywords with the shared keyword_engine at
+import time, and a message is scanned once:
+
+- all registered keywords are compiled into one Aho-Corasick automaton
+  (trie + failure links, with each state's output set already merged with
+  its failure chain), so a single left-to-right pass over the text reports
+  every keyword occurrence, overlapping and nested ones included - exactly
+  {k for k in keywords if k in text}
+- the hit set of recent texts is cached, so the detectors that run on the
+  same message share one scan
+
+Detectors describe their tables as KeywordGroups - ordered (label, keywords)
+pairs, registered with the engine on creation - and only walk the few hits of
+a message instead of every keyword they own. Groups and keywords come back in
+table order, duplicates included, so scores and tie-breaks stay identical to
+the substring loops they replace.
+
+Usage:
+    from espaluz_keywords import KeywordGroups, keyword_engine
+
+    MOODS = KeywordGroups([("happy", ["feliz", "genial"]), ("sad", ["triste"])])
+    hits = keyword_engine.scan(text.lower())
+    for mood, matched in MOODS.matched(hits): ...
+    first_mood = MOODS.first(hits)
+"""
+
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+# Distinct message texts whose hit sets are kept
+KEYWORD_SCAN_CACHE_SIZE = 256
+
+
+class KeywordEngine:
+    """Registry of keywords from all detectors, compiled into one matcher"""
+
+    def __init__(self, cache_size: int = KEYWORD_SCAN_CACHE_SIZE):
+        self._keywords = set()
+        # Automaton: goto transitions, failure links and merged outputs per state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[Optional[FrozenSet[str]]] = [None]
+        self._compiled = False
+        self._lock = threading.Lock()
+        self._scan_cached = lru_cache(maxsize=cache_size)(self._scan)
+
+    def register(self, keywords: Iterable[str]):
+        """Add keywords (already lower-case, like the text they are matched against)"""
+        new = {keyword for keyword in keywords if keyword} - self._keywords
+        if not new:
+            return
+        with self._lock:
+            self._keywords |= new
+            self._compiled = False
+        self._scan_cached.cache_clear()
+
+    def _compile(self):
+        with self._lock:
+            if self._compiled:
+                return
+            goto: List[Dict[str, int]] = [{}]
+            outputs: List[set] = [set()]
+            for keyword in self._keywords:
+                state = 0
+                for char in keyword:
+                    nxt = goto[state].get(char)
+                    if nxt is None:
+                        goto.append({})
+                        outputs.append(set())
+                        nxt = goto[state][char] = len(goto) - 1
+                    state = nxt
+                outputs[state].add(keyword)
+
+            # Breadth-first failure links; outputs inherit their failure state's
+            fail = [0] * len(goto)
+            queue = deque(goto[0].values())
+            while queue:
+                state = queue.popleft()
+                for char, nxt in goto[state].items():
+                    queue.append(nxt)
+                    fallback = fail[state]
+                    while fallback and char not in goto[fallback]:
+                        fallback = fail[fallback]
+                    target = goto[fallback].get(char, 0)
+                    fail[nxt] = target if target != nxt else 0
+                    outputs[nxt] |= outputs[fail[nxt]]
+
+            self._goto = goto
+            self._fail = fail
+            self._outputs = [frozenset(out) if out else None for out in outputs]
+            self._compiled = True
+
+    def _scan(self, text_lower: str) -> FrozenSet[str]:
+        if not self._compiled:
+            self._compile()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        hits = set()
+        state = 0
+        for char in text_lower:
+            while True:
+                nxt = goto[state].get(char)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            found = outputs[state]
+            if found:
+                hits |= found
+        return frozenset(hits)
+
+    def scan(self, text_lower: str) -> FrozenSet[str]:
+        """Every registered keyword that occurs in text_lower (substring semantics)"""
+        return self._scan_cached(text_lower)
+
+    def clear_cache(self):
+        self._scan_cached.cache_clear()
+
+    def __len__(self):
+        return len(self._keywords)
+
+
+# Global engine shared by main.py, espaluz_emotional_brain and espaluz_country_contexts
+keyword_engine = KeywordEngine()
+
+
+class KeywordGroups:
+    """A detector's ordered keyword table, queried with a hit set from the engine"""
+
+    def __init__(self, groups: Iterable[Tuple[Any, Sequence[str]]], engine: KeywordEngine = keyword_engine):
+        self.labels: List[Any] = []
+        # keyword -> [(group index, position in the group), ...]
+        self._index: Dict[str, List[Tuple[int, int]]] = {}
+        for group, (label, keywords) in enumerate(groups):
+            self.labels.append(label)
+            for position, keyword in enumerate(keywords):
+                self._index.setdefault(keyword, []).append((group, position))
+        engine.register(self._index)
+
+    def _hit_positions(self, hits: FrozenSet[str]) -> Dict[int, List[Tuple[int, str]]]:
+        found: Dict[int, List[Tuple[int, str]]] = {}
+        for keyword in hits:
+            for group, position in self._index.get(keyword, ()):
+                found.setdefault(group, []).append((position, keyword))
+        return found
+
+    def matched(self, hits: FrozenSet[str]) -> List[Tuple[Any, List[str]]]:
+        """(label, matched keywords) for every group with a hit, both in table order"""
+        found = self._hit_positions(hits)
+        return [(self.labels[group], [keyword for _, keyword in sorted(found[group])])
+                for group in sorted(found)]
+
+    def counts(self, hits: FrozenSet[str]) -> List[Tuple[Any, int]]:
+        """(label, number of matched keywords) for every group, in table order"""
+        found = self._hit_positions(hits)
+        return [(label, len(found.get(group, ()))) for group, label in enumerate(self.labels)]
+
+    def first(self, hits: FrozenSet[str]) -> Optional[Any]:
+        """Label of the first group in table order with any hit"""
+        groups = [group for keyword in hits for group, _ in self._index.get(keyword, ())]
+        return self.labels[min(groups)] if groups else None
@@ -0,0 +1,251 @@
+"""
+EspaLuz Language Identifier
+===========================
+One language identifier for Spanish, English, Russian and Portuguese.
+
+main.py and espaluz_conversation_mode each had their own detect_language,
+scoring word lists with substring checks and falling back to English on a
+tie - so short Spanish utterances without accents ("donde esta el bano")
+were routed as English. Both now use identify_language:
+
+- the text is tokenized once (letters only, casefolded)
+- Russian is only considered for text with Cyrillic words, and all-Cyrillic
+  text is Russian straight away
+- Portuguese is only considered with positive evidence - one of its own
+  letters (ã õ ç ...) or function words (você, não, eu ...) - so short
+  Spanish like "de nada" or "vale" is never routed as Portuguese
+- every word is scored by a character trigram model per language (built at
+  import from the small sample texts below, add-k smoothed), plus a bonus for
+  each function word found in the language's frozenset and for letters only
+  one language uses (ñ ¿ ¡ / ã õ ç)
+- word scores are cached, so the common words of a conversation cost one
+  dict lookup each
+- the per-language totals go through a softmax; the top probability is the
+  confidence
+
+Usage:
+    from espaluz_language_id import identify_language, detect_language
+
+    lang, confidence = identify_language("donde esta el bano")  # ("es", 0.9...)
+    lang = detect_language("Where is the pharmacy?")              # "en"
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Tuple
+
+LANGUAGES = ("es", "en", "pt", "ru")
+
+# Returned for text without any letters
+DEFAULT_LANGUAGE = "en"
+
+NGRAM_SIZE = 3
+# Add-k smoothing for trigrams a language never produced in its sample
+NGRAM_SMOOTHING = 0.5
+# Log-score bonus per function word / per language-specific letter
+FUNCTION_WORD_BONUS = 2.0
+MARKER_BONUS = 3.0
+# Distinct words whose score vectors are kept
+WORD_SCORE_CACHE_SIZE = 8192
+
+FUNCTION_WORDS: Dict[str, frozenset] = {
+    "es": frozenset("""
+        el la los las un una unos unas a y e o pero porque que de del al en con por para sin
+        es son soy eres está esta estás estas estoy están hay ser estar tengo tiene tienes
+        quiero necesito puedo puede da yo tú tu él ella nosotros ustedes ellos ellas mi mis su
+        me te se le lo nos muy más mas también tambien aquí aqui allí donde dónde cuando
+        cuándo como cómo qué quién cuál cuánto cuanto hola gracias bueno buena buenos buenas
+        sí si no ahora hoy mañana manana favor ya bien mucho poco este esto ese eso esa
+        nada vale claro pues oye adiós adios chao perdón perdon
+    """.split()),
+    "en": frozenset("""
+        the a an and or but because that of to in on at with by for from as into
+        is are was were be been being am have has had do does did will would could should
+        may might must can need i you he she we they it my your his her our their me him us
+        them this these those what who which where when why how here there not no yes
+        very just so too than then please thanks thank hello hi okay ok good well
+        bye yeah sure sorry great cool nice
+    """.split()),
+    "pt": frozenset("""
+        o a os as um uma e ou mas porque que de do da dos das no na nos nas em com por para
+        sem é são sou está estou estão tem tenho quero preciso posso pode eu você voce ele
+        ela nós nos eles elas meu minha seu sua não nao sim muito mais também tambem aqui
+        onde quando como quem qual obrigado obrigada olá ola bom boa hoje amanhã agora isso
+    """.split()),
+    "ru": frozenset("""
+        и в не на я что он она они мы вы ты с а как это по но из у за то так все ещё уже
+        да нет где когда почему кто мне меня тебя есть был была быть очень спасибо привет
+        пожалуйста хорошо здравствуйте можно нужно хочу могу
+    """.split()),
+}
+
+# Letters that (among these four languages) point to one of them
+MARKERS: Dict[str, str] = {
+    "ñ": "es", "¿": "es", "¡": "es",
+    "ã": "pt", "õ": "pt", "ç": "pt", "ê": "pt", "ô": "pt", "â": "pt", "à": "pt",
+}
+
+# Evidence that has to be present before 'pt' is returned
+PORTUGUESE_ONLY_WORDS = FUNCTION_WORDS["pt"] - FUNCTION_WORDS["es"]
+PORTUGUESE_MARKERS = frozenset(char for char, lang in MARKERS.items() if lang == "pt")
+
+# Sample text per language the trigram model is trained on - everyday
+# phrases of the kind users send, not literature
+SAMPLES: Dict[str, str] = {
+    "es": """
+        Hola, ¿cómo estás? Estoy bien, gracias. ¿Dónde está la farmacia más cercana?
+        Necesito comprar medicina para mi hijo, tiene fiebre desde ayer. Quiero aprender
+        español porque vivimos en Panamá con toda la familia. No entiendo lo que dice el
+        taxista, habla muy rápido. ¿Cuánto cuesta el pasaje al centro de la ciudad?
+        Mi esposa trabaja desde casa y los niños van a una escuela bilingüe. Mañana
+        tenemos una cita con el médico por la tarde. ¿Me puede ayudar, por favor? Perdón,
+        ¿puede repetir más despacio? La comida aquí es deliciosa, me encantan las frutas
+        tropicales y el arroz con pollo. Buenos días, quisiera una mesa para cuatro
+        personas. ¿A qué hora abre el supermercado? Tenemos que pagar la cuenta de la luz
+        y del agua este mes. Me gustaría practicar la conversación todos los días.
+        Nosotros estamos buscando un apartamento con dos habitaciones cerca del parque.
+        Ella es mi hermana y él es mi hermano. Hace mucho calor hoy, vamos a la playa.
+        Todavía me cuesta el subjuntivo, pero ya entiendo mejor los verbos irregulares.
+        ¿Qué significa esta palabra? Gracias por tu paciencia, eres una profesora genial.
+    """,
+    "en": """
+        Hello, how are you? I'm fine, thanks. Where is the nearest pharmacy? I need to buy
+        medicine for my son, he has had a fever since yesterday. I want to learn Spanish
+        because we live in Panama with the whole family. I don't understand what the taxi
+        driver says, he speaks very fast. How much is the fare to the city center? My wife
+        works from home and the kids go to a bilingual school. Tomorrow we have a doctor's
+        appointment in the afternoon. Can you help me, please? Sorry, could you repeat that
+        more slowly? The food here is delicious, I love the tropical fruit and the chicken
+        with rice. Good morning, I would like a table for four people. What time does the
+        supermarket open? We have to pay the electricity and water bills this month. I'd
+        like to practice conversation every day. We are looking for an apartment with two
+        bedrooms near the park. She is my sister and he is my brother. It's very hot today,
+        let's go to the beach. The subjunctive is still hard for me, but I understand the
+        irregular verbs better now. What does this word mean? Thank you for your patience,
+        you're a great teacher. Where can I find a good place to eat nearby?
+    """,
+    "pt": """
+        Olá, como você está? Estou bem, obrigado. Onde fica a farmácia mais próxima?
+        Preciso comprar remédio para o meu filho, ele está com febre desde ontem. Quero
+        aprender espanhol porque moramos no Panamá com toda a família. Não entendo o que o
+        taxista diz, ele fala muito rápido. Quanto custa a passagem para o centro da
+        cidade? Minha esposa trabalha em casa e as crianças vão para uma escola bilíngue.
+        Amanhã temos uma consulta com o médico à tarde. Você pode me ajudar, por favor?
+        Desculpe, pode repetir mais devagar? A comida aqui é deliciosa, eu adoro as frutas
+        tropicais e o frango com arroz. Bom dia, eu gostaria de uma mesa para quatro
+        pessoas. Que horas abre o supermercado? Temos que pagar a conta de luz e de água
+        este mês. Eu gostaria de praticar a conversação todos os dias. Nós estamos
+        procurando um apartamento com dois quartos perto do parque. Ela é minha irmã e
+        ele é meu irmão. Está muito calor hoje, vamos à praia. O subjuntivo ainda é difícil
+        para mim, mas já entendo melhor os verbos irregulares. O que significa essa
+        palavra? Obrigada pela sua paciência, você é uma professora ótima.
+    """,
+    "ru": """
+        Привет, как дела? Всё хорошо, спасибо. Где ближайшая аптека? Мне нужно купить
+        лекарство для сына, у него температура со вчерашнего дня. Я хочу выучить испанский,
+        потому что мы живём в Панаме всей семьёй. Я не понимаю, что говорит таксист, он
+        говорит очень быстро. Сколько стоит проезд до центра города? Моя жена работает из
+        дома, а дети ходят в двуязычную школу. Завтра у нас приём у врача после обеда.
+        Вы можете мне помочь, пожалуйста? Извините, можно повторить медленнее? Еда здесь
+        очень вкусная, я люблю тропические фрукты и курицу с рисом. Доброе утро, мне нужен
+        столик на четверых. Во сколько открывается супермаркет? Нам нужно оплатить счета
+        за свет и воду в этом месяце. Я хотел бы практиковать разговор каждый день. Мы ищем
+        квартиру с двумя спальнями рядом с парком. Она моя сестра, а он мой брат. Сегодня
+        очень жарко, пойдём на пляж. Сослагательное наклонение мне всё ещё трудно даётся,
+        но неправильные глаголы я уже понимаю лучше. Что значит это слово? Спасибо за
+        терпение, вы отличный преподаватель.
+    """,
+}
+
+_WORD = re.compile(r"[^\W\d_]+")
+_CYRILLIC = re.compile(r"[Ѐ-ӿ]")
+
+
+def _trigrams(word: str) -> Iterable[str]:
+    padded = f" {word} "
+    return (padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1))
+
+
+def _build_model() -> Tuple[Dict[str, Tuple[float, ...]], Tuple[float, ...]]:
+    """trigram -> log-probability per language, and the per-language unseen score"""
+    counts = {lang: {} for lang in LANGUAGES}
+    for lang in LANGUAGES:
+        for word in _WORD.findall(SAMPLES[lang].casefold()):
+            for gram in _trigrams(word):
+                counts[lang][gram] = counts[lang].get(gram, 0) + 1
+
+    vocabulary = set().union(*counts.values())
+    denominators = {lang: sum(counts[lang].values()) + NGRAM_SMOOTHING * (len(vocabulary) + 1)
+                    for lang in LANGUAGES}
+    unseen = tuple(math.log(NGRAM_SMOOTHING / denominators[lang]) for lang in LANGUAGES)
+    table = {
+        gram: tuple(math.log((counts[lang].get(gram, 0) + NGRAM_SMOOTHING) / denominators[lang])
+                    for lang in LANGUAGES)
+        for gram in vocabulary
+    }
+    return table, unseen
+
+
+_TRIGRAM_SCORES, _UNSEEN_SCORES = _build_model()
+
+
+@lru_cache(maxsize=WORD_SCORE_CACHE_SIZE)
+def _word_scores(word: str) -> Tuple[float, ...]:
+    """Log-score of one casefolded word under each language, in LANGUAGES order"""
+    scores = [0.0] * len(LANGUAGES)
+    for gram in _trigrams(word):
+        gram_scores = _TRIGRAM_SCORES.get(gram, _UNSEEN_SCORES)
+        for i, value in enumerate(gram_scores):
+            scores[i] += value
+    for i, lang in enumerate(LANGUAGES):
+        if word in FUNCTION_WORDS[lang]:
+            scores[i] += FUNCTION_WORD_BONUS
+    return tuple(scores)
+
+
+def identify_language(text: str, languages: Iterable[str] = LANGUAGES) -> Tuple[str, float]:
+    """
+    Most likely language of text among `languages`, with its probability (0-1).
+    Text without letters gives (DEFAULT_LANGUAGE, 0.0).
+    """
+    candidates = [i for i, lang in enumerate(LANGUAGES) if lang in languages]
+    text_lower = (text or "").casefold()
+    words = _WORD.findall(text_lower)
+    if not words or not candidates:
+        return DEFAULT_LANGUAGE, 0.0
+
+    # Russian is only a candidate for text written (partly) in Cyrillic, and
+    # then the only one if all of it is
+    cyrillic = [bool(_CYRILLIC.match(word)) for word in words]
+    ru = LANGUAGES.index("ru")
+    if not any(cyrillic):
+        candidates = [i for i in candidates if i != ru]
+    elif ru in candidates and all(cyrillic):
+        return "ru", 1.0
+
+    # This is a Spanish tutor: Portuguese needs positive evidence - one of its
+    # own letters or function words - before it can win over Spanish
+    pt = LANGUAGES.index("pt")
+    if pt in candidates and not (PORTUGUESE_ONLY_WORDS.intersection(words)
+                                 or any(char in text_lower for char in PORTUGUESE_MARKERS)):
+        candidates = [i for i in candidates if i != pt]
+    if not candidates:
+        return DEFAULT_LANGUAGE, 0.0
+
+    totals = [0.0] * len(LANGUAGES)
+    for word in words:
+        for i, value in enumerate(_word_scores(word)):
+            totals[i] += value
+    for char, lang in MARKERS.items():
+        if char in text_lower:
+            totals[LANGUAGES.index(lang)] += MARKER_BONUS
+
+    best = max(candidates, key=lambda i: totals[i])
+    probabilities = sum(math.exp(totals[i] - totals[best]) for i in candidates)
+    return LANGUAGES[best], 1.0 / probabilities
+
+
+def detect_language(text: str) -> str:
+    """'es', 'en', 'pt' or 'ru' - identify_language without the confidence"""
+    return identify_language(text)[0]
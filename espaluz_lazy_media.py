@@ -0,0 +1,106 @@
+"""
+EspaLuz Lazy Media
+==================
+Per-reply registry for on-demand voice/video.
+
+With LAZY_MEDIA on, a tutor reply no longer triggers voice and video
+generation up front. It gets inline buttons ("🎧 Listen", "🎬 Video"),
+and the media is only rendered when a button is tapped (the callback_query
+handler in main.py). LazyMediaStore remembers the reply behind each button
+set - text, render plan - and, once a medium has been sent, its Telegram
+file_id, so later taps re-send the same file instantly.
+
+Entries live in a bounded LRU (LAZY_MEDIA_CACHE_SIZE); buttons of evicted
+replies answer with an "expired" notice.
+
+Usage:
+    from espaluz_lazy_media import lazy_media_store, media_callback_data
+
+    reply_id = lazy_media_store.register(chat_id, full_reply, short_reply, plan)
+    button_data = media_callback_data("voice", reply_id)
+"""
+
+import os
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+LAZY_MEDIA = os.getenv("LAZY_MEDIA", "false").lower() in ("1", "true", "yes")
+LAZY_MEDIA_CACHE_SIZE = int(os.getenv("LAZY_MEDIA_CACHE_SIZE", 500))
+
+CALLBACK_PREFIX = "media"
+MEDIA_KINDS = ("voice", "video")
+
+
+class LazyReply:
+    """Everything needed to render one reply's media later"""
+
+    __slots__ = ("reply_id", "chat_id", "full_reply", "short_reply", "plan", "file_ids", "lock")
+
+    def __init__(self, reply_id, chat_id, full_reply, short_reply, plan):
+        self.reply_id = reply_id
+        self.chat_id = chat_id
+        self.full_reply = full_reply
+        self.short_reply = short_reply
+        self.plan = plan
+        # kind -> (Telegram media type, file_id) of the message already sent
+        self.file_ids: Dict[str, Tuple[str, str]] = {}
+        # Serializes renders of the same reply, so double taps send one render
+        self.lock = threading.Lock()
+
+
+class LazyMediaStore:
+    """Bounded LRU of replies that still have media buttons"""
+
+    def __init__(self, max_entries: int = LAZY_MEDIA_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, LazyReply]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(("registered", "rendered", "reused", "expired"), 0)
+
+    def register(self, chat_id, full_reply: str, short_reply: str = "", plan=None) -> str:
+        reply_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._entries[reply_id] = LazyReply(reply_id, chat_id, full_reply, short_reply, plan)
+            self._counters["registered"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return reply_id
+
+    def get(self, reply_id: str) -> Optional[LazyReply]:
+        with self._lock:
+            entry = self._entries.get(reply_id)
+            if entry is None:
+                self._counters["expired"] += 1
+                return None
+            self._entries.move_to_end(reply_id)
+            return entry
+
+    def record(self, outcome: str):
+        """Count a "rendered" or "reused" delivery"""
+        with self._lock:
+            self._counters[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        return stats
+
+
+def media_callback_data(kind: str, reply_id: str) -> str:
+    # Telegram caps callback_data at 64 bytes
+    return f"{CALLBACK_PREFIX}:{kind}:{reply_id}"
+
+
+def parse_media_callback(data: str) -> Optional[Tuple[str, str]]:
+    """(kind, reply_id) for one of our buttons, else None"""
+    parts = (data or "").split(":")
+    if len(parts) != 3 or parts[0] != CALLBACK_PREFIX or parts[1] not in MEDIA_KINDS:
+        return None
+    return parts[1], parts[2]
+
+
+# Global store used by main.py
+lazy_media_store = LazyMediaStore()
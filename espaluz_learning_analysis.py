@@ -0,0 +1,163 @@
+"""
+EspaLuz Learning Analysis
+=========================
+One memoized analysis per text for the learning tracker.
+
+process_message_with_tracking ran enhance_language_learning_detection on the
+reply, then adapt_learning_path ran it again on the same text, and
+detect_success_indicators / detect_struggle_indicators lower-cased and
+scanned the user's message once per phrase list. Now:
+
+- analyze_text tokenizes a text once; tenses marked by a word ending
+  (past, future, conditional) are read off the tokens, and the patterns that
+  need context (subjunctive, commands, "ayer ... -é") are precompiled, one
+  regex per grammar point with a named group, and only run for points still
+  missing; idioms, topic words and indicator phrases come from one scan of
+  the shared keyword_engine
+- the result is an immutable TextAnalysis, cached per text, so repeated
+  calls on the same reply cost a dictionary lookup
+- analyze_exchange pairs the user's message with the reply; main.py hands
+  that one object to enhance_language_learning_detection,
+  adapt_learning_path and the success / struggle detectors
+
+Usage:
+    from espaluz_learning_analysis import analyze_exchange
+
+    analysis = analyze_exchange(user_input, full_reply)
+    analysis.reply.grammar_points   # ("past_tense", "future_tense")
+    analysis.user.has("struggle")   # any struggle phrase in the user's message
+"""
+
+import re
+from functools import lru_cache
+from typing import FrozenSet, List, Tuple
+
+from espaluz_keywords import KeywordGroups, keyword_engine
+
+# Distinct texts whose analyses are kept
+ANALYSIS_CACHE_SIZE = 256
+
+GRAMMAR_POINTS = ("past_tense", "future_tense", "subjunctive", "commands", "conditional")
+
+# Points recognizable from a single word's ending: some word has one of these
+# endings with at least one more character in front (\b\w+(é|aste|...)\b)
+GRAMMAR_SUFFIXES = {
+    "past_tense": ("é", "aste", "ó", "amos", "aron"),
+    "future_tense": ("ré", "rás", "rá", "remos", "rán"),
+    "conditional": ("ría", "rías", "ríamos", "rían"),
+}
+
+# Points that need context across words - one precompiled regex per point,
+# its alternatives joined under the point's named group; each is only run
+# when the word endings have not already found the point
+GRAMMAR_CONTEXT_PATTERNS = {
+    "past_tense": [r'\b(ayer|pasado).+\b(é|aste|ó|amos|aron)\b'],
+    "future_tense": [r'\b(mañana|futuro).+\b\w+(ré|rás|rá|remos|rán)\b'],
+    "subjunctive": [r'\bque \w+(e|es|a|an|emos)\b', r'\bsi \w+(era|ese|ara)\b'],
+    "commands": [r'\b\w+(a|e|ad|ed)(!| ahora| por favor)\b'],
+}
+
+GRAMMAR_CONTEXT_REGEXES = {
+    point: re.compile(f"(?P<{point}>{'|'.join(patterns)})")
+    for point, patterns in GRAMMAR_CONTEXT_PATTERNS.items()
+}
+
+# Grammar topics the tutor names explicitly; only the first one found counts
+EXPLICIT_GRAMMAR_POINTS = [("por vs para", "por_vs_para"), ("ser vs estar", "ser_vs_estar")]
+
+SPANISH_IDIOMS = [
+    "poco a poco", "de vez en cuando", "más o menos", "en seguida",
+    "hacer caso", "tener ganas", "dar la vuelta", "echar de menos"
+]
+
+VOCABULARY_TOPICS = {
+    "food": ["comida", "comer", "bebida", "beber", "restaurante", "cocina", "plato"],
+    "travel": ["viaje", "viajar", "hotel", "avión", "tren", "reserva", "turista"],
+    "health": ["salud", "médico", "enfermo", "hospital", "dolor", "medicina"],
+    "work": ["trabajo", "oficina", "reunión", "proyecto", "colega", "jefe"],
+    "family": ["familia", "padre", "madre", "hijo", "hija", "hermano", "hermana"],
+    "daily_routines": ["levantarse", "acostarse", "ducharse", "desayunar", "almorzar", "cenar"]
+}
+
+# Phrases in the user's message that signal progress or difficulty
+INDICATOR_PHRASES = {
+    "success": ["entiendo", "entendí", "comprendo", "now i get it", "ahora entiendo",
+                "gracias", "спасибо", "thank you", "that helps", "that's clear"],
+    "struggle": ["no entiendo", "don't understand", "confused", "i don't get", "не понимаю",
+                 "difficult", "difícil", "hard", "help", "ayuda", "помоги"],
+    "vocabulary_struggle": ["what does", "que significa", "mean", "significado", "что значит"],
+    "grammar_struggle": ["conjugate", "conjugar", "tense", "tiempo", "form", "forma"],
+}
+
+SPANISH_MARKERS = frozenset("ñáéíóú")
+SPANISH_LETTERS = frozenset("abcdefghijklmnopqrstuvwxyzáéíóúñ")
+
+IDIOM_GROUPS = KeywordGroups([(idiom, [idiom]) for idiom in SPANISH_IDIOMS])
+TOPIC_GROUPS = KeywordGroups(VOCABULARY_TOPICS.items())
+INDICATOR_GROUPS = KeywordGroups(INDICATOR_PHRASES.items())
+
+# Maximal runs of word characters - the units \b...\b patterns match against
+_WORD = re.compile(r"\w+")
+
+
+class TextAnalysis:
+    """Everything the learning tracker reads from one text"""
+
+    __slots__ = ("text_lower", "words", "spanish_words", "explicit_grammar_points",
+                 "grammar_points", "expressions", "topics", "indicators")
+
+    def __init__(self, text: str):
+        self.text_lower = text.lower()
+        tokens = _WORD.findall(self.text_lower)
+        # Unique words in order of appearance
+        self.words: Tuple[str, ...] = tuple(dict.fromkeys(tokens))
+        # Words made only of 3+ Spanish-alphabet letters, every occurrence (used for counts)
+        self.spanish_words: Tuple[str, ...] = tuple(
+            w for w in tokens if len(w) >= 3 and SPANISH_LETTERS.issuperset(w))
+
+        self.explicit_grammar_points: Tuple[str, ...] = next(
+            ((point,) for phrase, point in EXPLICIT_GRAMMAR_POINTS if phrase in self.text_lower), ())
+        found = set()
+        for point, suffixes in GRAMMAR_SUFFIXES.items():
+            # w[1:] ending with a suffix = w ends with it and is longer than it
+            if any(word[1:].endswith(suffixes) for word in self.words):
+                found.add(point)
+        for point, regex in GRAMMAR_CONTEXT_REGEXES.items():
+            if point not in found and regex.search(self.text_lower):
+                found.add(point)
+        self.grammar_points: Tuple[str, ...] = tuple(point for point in GRAMMAR_POINTS if point in found)
+
+        hits = keyword_engine.scan(self.text_lower)
+        self.expressions: Tuple[str, ...] = tuple(idiom for idiom, _ in IDIOM_GROUPS.matched(hits))
+        self.topics: Tuple[str, ...] = tuple(topic for topic, _ in TOPIC_GROUPS.matched(hits))
+        self.indicators: FrozenSet[str] = frozenset(label for label, _ in INDICATOR_GROUPS.matched(hits))
+
+    @property
+    def marked_spanish_words(self) -> List[str]:
+        """Candidate words carrying a Spanish-only letter, in order, repeats included"""
+        return [w for w in self.spanish_words if not SPANISH_MARKERS.isdisjoint(w)]
+
+    def has(self, indicator: str) -> bool:
+        """Whether any phrase of an INDICATOR_PHRASES group occurs in the text"""
+        return indicator in self.indicators
+
+
+@lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def analyze_text(text: str) -> TextAnalysis:
+    return TextAnalysis(text or "")
+
+
+class ExchangeAnalysis:
+    """The analyses of a user message and the reply to it"""
+
+    __slots__ = ("user_input", "response", "user", "reply")
+
+    def __init__(self, user_input: str, response: str):
+        self.user_input = user_input or ""
+        self.response = response or ""
+        self.user = analyze_text(self.user_input)
+        self.reply = analyze_text(self.response)
+
+
+def analyze_exchange(user_input: str, response: str) -> ExchangeAnalysis:
+    return ExchangeAnalysis(user_input, response)
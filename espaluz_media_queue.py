@@ -0,0 +1,186 @@
+"""
+EspaLuz Media Queue
+===================
+Fixed-size worker pool for voice/video generation.
+
+Every tutor reply used to start its own daemon thread running gTTS plus an
+ffmpeg video encode, so a burst of messages meant dozens of concurrent encodes
+fighting for the CPU. MediaWorkerPool runs media jobs on MEDIA_WORKERS threads
+fed from a bounded priority queue:
+
+- voice notes are served ahead of videos (PRIORITY_VOICE < PRIORITY_VIDEO)
+- per-chat coalescing: when a newer reply for the same chat and media kind is
+  queued, older jobs that have not started yet are dropped as stale; the
+  bookkeeping for a (chat, kind) key is pruned once its newest job is done,
+  so one-off kinds (e.g. "voice:<reply_id>") do not accumulate
+- backpressure: submit() waits up to MEDIA_ENQUEUE_TIMEOUT for room in the
+  queue and then rejects the job instead of growing without bound
+- metrics: queue depth, wait/run times and drop/reject counters via stats()
+
+Usage:
+    from espaluz_media_queue import media_pool, PRIORITY_VOICE
+
+    media_pool.submit(chat_id, "voice", send_full_voice_message, chat_id, text,
+                      priority=PRIORITY_VOICE)
+"""
+
+import os
+import time
+import queue
+import logging
+import itertools
+import threading
+from collections import deque
+from typing import Any, Callable, Dict
+
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+MEDIA_QUEUE_MAX = int(os.getenv("MEDIA_QUEUE_MAX", 32))
+MEDIA_ENQUEUE_TIMEOUT = float(os.getenv("MEDIA_ENQUEUE_TIMEOUT", 2))
+
+PRIORITY_VOICE = 0
+PRIORITY_VIDEO = 1
+
+# Recent samples kept for the wait/run time percentiles
+METRICS_WINDOW = 200
+
+
+class MediaJob:
+    __slots__ = ("chat_id", "kind", "fn", "args", "kwargs", "generation", "enqueued_at", "done")
+
+    def __init__(self, chat_id, kind, fn, args, kwargs, generation):
+        self.chat_id = chat_id
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.generation = generation
+        self.enqueued_at = time.monotonic()
+        self.done = False
+
+
+class MediaWorkerPool:
+    """Bounded priority queue + fixed worker threads for media generation"""
+
+    def __init__(self, workers: int = MEDIA_WORKERS, max_queue: int = MEDIA_QUEUE_MAX,
+                 enqueue_timeout: float = MEDIA_ENQUEUE_TIMEOUT):
+        self.workers = workers
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.PriorityQueue(maxsize=max_queue)
+        self._sequence = itertools.count()
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._started = False
+        self._counters = dict.fromkeys(
+            ("submitted", "completed", "failed", "dropped_stale", "rejected"), 0
+        )
+        self._running = 0
+        self._wait_times = deque(maxlen=METRICS_WINDOW)
+        self._run_times = deque(maxlen=METRICS_WINDOW)
+
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"media-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._started = True
+
+    def submit(self, chat_id, kind: str, fn: Callable, *args,
+               priority: int = PRIORITY_VIDEO, **kwargs) -> bool:
+        """Queue fn(*args, **kwargs); returns False if the queue stayed full"""
+        self._ensure_started()
+        with self._lock:
+            self._counters["submitted"] += 1
+        # The global sequence doubles as the job's generation for coalescing
+        sequence = next(self._sequence)
+        job = MediaJob(chat_id, kind, fn, args, kwargs, sequence)
+        try:
+            self._queue.put((priority, sequence, job), timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._lock:
+                self._counters["rejected"] += 1
+            logging.warning(f"Media queue full - rejected {kind} job for chat {chat_id}")
+            return False
+        # Only an accepted job may supersede older ones - unless a worker
+        # already finished it, which would leave its key behind for good
+        key = (chat_id, kind)
+        with self._lock:
+            if not job.done:
+                self._latest[key] = max(self._latest.get(key, -1), sequence)
+        return True
+
+    def _is_stale(self, job: MediaJob) -> bool:
+        with self._lock:
+            return self._latest.get((job.chat_id, job.kind), -1) > job.generation
+
+    def _worker(self):
+        while True:
+            _, _, job = self._queue.get()
+            try:
+                if self._is_stale(job):
+                    with self._lock:
+                        self._counters["dropped_stale"] += 1
+                    print(f"🎞️ Dropped stale {job.kind} job for chat {job.chat_id} - a newer reply is queued")
+                    continue
+                self._run(job)
+            finally:
+                self._forget(job)
+                self._queue.task_done()
+
+    def _forget(self, job: MediaJob):
+        # Nothing newer is queued for the key once its latest job is done
+        key = (job.chat_id, job.kind)
+        with self._lock:
+            job.done = True
+            if self._latest.get(key) == job.generation:
+                del self._latest[key]
+
+    def _run(self, job: MediaJob):
+        started = time.monotonic()
+        waited = started - job.enqueued_at
+        with self._lock:
+            self._running += 1
+            self._wait_times.append(waited)
+        print(f"🎞️ {job.kind} job for chat {job.chat_id} started after {waited:.2f}s "
+              f"(queue depth {self._queue.qsize()})")
+        outcome = "completed"
+        try:
+            job.fn(*job.args, **job.kwargs)
+        except Exception as e:
+            outcome = "failed"
+            logging.error(f"Media {job.kind} job for chat {job.chat_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._counters[outcome] += 1
+                self._run_times.append(time.monotonic() - started)
+
+    @staticmethod
+    def _summary(samples) -> Dict[str, float]:
+        if not samples:
+            return {"avg": 0.0, "p95": 0.0, "max": 0.0}
+        ordered = sorted(samples)
+        return {
+            "avg": round(sum(ordered) / len(ordered), 3),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+            "max": round(ordered[-1], 3)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["running"] = self._running
+            stats["wait_seconds"] = self._summary(self._wait_times)
+            stats["run_seconds"] = self._summary(self._run_times)
+        stats["workers"] = self.workers
+        stats["queue_depth"] = self._queue.qsize()
+        return stats
+
+
+# Global pool used by main.py
+media_pool = MediaWorkerPool()
@@ -0,0 +1,170 @@
+"""
+EspaLuz Media Workspace
+=======================
+Isolated scratch space for voice/video generation.
+
+Media jobs used to write fixed names in the working directory (bp_audio.mp3,
+bp_video.mp4, simple_voice.mp3) or names built from int(time.time()), so two
+chats generating media at the same moment overwrote each other's files. Now
+every job gets its own directory under MEDIA_WORKSPACE_ROOT - on tmpfs
+(/dev/shm) when available, so intermediate audio/video never touches the
+persistent disk - and the directory is removed when the job finishes or fails.
+
+Files that must outlive a job (paths handed back to a caller) go to
+scratch_path() instead. A janitor thread purges workspaces and scratch files
+left behind by crashed processes or callers that never cleaned up.
+
+Usage:
+    from espaluz_media_workspace import media_workspace
+
+    with media_workspace("video") as ws:
+        audio_path = ws.path("audio.mp3")
+        video_path = ws.path("video.mp4")
+        ...  # removed on exit, even on exceptions
+"""
+
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+def _default_root() -> str:
+    shm = "/dev/shm"
+    base = shm if os.path.isdir(shm) and os.access(shm, os.W_OK) else tempfile.gettempdir()
+    return os.path.join(base, "espaluz_media")
+
+
+MEDIA_WORKSPACE_ROOT = os.getenv("MEDIA_WORKSPACE_ROOT") or _default_root()
+# Anything in the root older than this is an orphan (seconds)
+MEDIA_WORKSPACE_MAX_AGE = int(os.getenv("MEDIA_WORKSPACE_MAX_AGE", 3600))
+MEDIA_JANITOR_INTERVAL = int(os.getenv("MEDIA_JANITOR_INTERVAL", 600))
+SCRATCH_DIR = "scratch"
+
+
+class MediaWorkspace:
+    """A private directory for one media job"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WorkspaceManager:
+    """Creates per-job workspaces under one root and purges orphans"""
+
+    def __init__(self, root: str = MEDIA_WORKSPACE_ROOT, max_age: int = MEDIA_WORKSPACE_MAX_AGE):
+        self.root = root
+        self.max_age = max_age
+        self._active = set()
+        self._lock = threading.Lock()
+        self._janitor = None
+
+    def _ensure_root(self):
+        os.makedirs(os.path.join(self.root, SCRATCH_DIR), exist_ok=True)
+
+    @contextmanager
+    def workspace(self, kind: str = "job") -> Iterator[MediaWorkspace]:
+        """Unique directory for one job, deleted on completion or failure"""
+        self._ensure_root()
+        # The pid in the name lets the janitor spot directories of dead processes
+        directory = tempfile.mkdtemp(prefix=f"{kind}_{os.getpid()}_", dir=self.root)
+        with self._lock:
+            self._active.add(directory)
+        ws = MediaWorkspace(directory)
+        try:
+            yield ws
+        finally:
+            ws.cleanup()
+            with self._lock:
+                self._active.discard(directory)
+
+    def scratch_path(self, prefix: str, extension: str) -> str:
+        """Unique file path for output handed to a caller; purged by the janitor once stale"""
+        self._ensure_root()
+        fd, path = tempfile.mkstemp(prefix=prefix, suffix=f".{extension}",
+                                    dir=os.path.join(self.root, SCRATCH_DIR))
+        os.close(fd)
+        return path
+
+    def _is_orphan(self, name: str, path: str, now: float) -> bool:
+        with self._lock:
+            if path in self._active:
+                return False
+        try:
+            if now - os.path.getmtime(path) > self.max_age:
+                return True
+        except OSError:
+            return False
+        parts = name.split("_")
+        if len(parts) >= 3 and parts[1].isdigit():
+            pid = int(parts[1])
+            return pid != os.getpid() and not _pid_alive(pid)
+        return False
+
+    def purge_orphans(self) -> int:
+        """Remove stale workspaces and scratch files; returns how many were purged"""
+        if not os.path.isdir(self.root):
+            return 0
+        now = time.time()
+        purged = 0
+        for entry in os.scandir(self.root):
+            if entry.name == SCRATCH_DIR or not entry.is_dir(follow_symlinks=False):
+                continue
+            if self._is_orphan(entry.name, entry.path, now):
+                shutil.rmtree(entry.path, ignore_errors=True)
+                purged += 1
+        scratch = os.path.join(self.root, SCRATCH_DIR)
+        if os.path.isdir(scratch):
+            for entry in os.scandir(scratch):
+                try:
+                    if now - entry.stat().st_mtime > self.max_age:
+                        os.remove(entry.path)
+                        purged += 1
+                except OSError:
+                    pass
+        if purged:
+            print(f"🧹 Media janitor purged {purged} orphaned workspace entries")
+        return purged
+
+    def _janitor_loop(self, interval: int):
+        while True:
+            try:
+                self.purge_orphans()
+            except Exception as e:
+                logging.error(f"Media janitor error: {e}")
+            time.sleep(interval)
+
+    def start_janitor(self, interval: int = MEDIA_JANITOR_INTERVAL):
+        """Purge once now (leftovers from a previous crash), then periodically"""
+        if self._janitor is not None:
+            return
+        self._janitor = threading.Thread(
+            target=self._janitor_loop, args=(interval,), name="media-janitor", daemon=True
+        )
+        self._janitor.start()
+
+
+# Global manager used by main.py and espaluz_neural_tts
+workspace_manager = WorkspaceManager()
+media_workspace = workspace_manager.workspace
+scratch_path = workspace_manager.scratch_path
@@ -18,14 +18,38 @@ Usage:
     
     # Sync (for compatibility with existing code)
     audio_path = generate_voice_sync("Hello, how are you?", lang="en")
+
+    # Voice note bytes for bot.send_voice - no files at all
+    ogg_bytes = generate_voice_bytes_sync("¿Dónde está la farmacia?", lang="es")
+
+    # Long replies: chunks synthesized concurrently, then joined in order
+    parts = generate_voice_chunks_sync(chunks, lang="es")
+    ogg_bytes = concat_ogg_bytes(parts)
+
+Synthesized audio is kept in a content-addressed OGG/Opus cache (TTS_CACHE_DIR),
+keyed on (text, voice, rate, pitch, format) and bounded to TTS_CACHE_MAX_MB with
+LRU eviction. Callers always get their own file, which they may delete.
+
+All synchronous callers share one background event loop thread (tts_worker),
+so syntheses from different telebot threads run concurrently, up to
+TTS_MAX_CONCURRENCY at a time, each bounded by TTS_REQUEST_TIMEOUT seconds.
 """
 
 import asyncio
 import os
+import time
+import uuid
+import shutil
+import hashlib
+import io
+import threading
 import subprocess
-from typing import Optional
+import concurrent.futures
+from typing import Callable, List, Optional
 import logging
 
+from espaluz_media_workspace import media_workspace, scratch_path, workspace_manager, SCRATCH_DIR
+
 # Try edge-tts, fall back to gTTS
 try:
     import edge_tts
@@ -66,6 +90,18 @@ NEURAL_VOICES = {
     "pt": "pt-BR-FranciscaNeural",    # Brazilian Portuguese
 }
 
+# gTTS language codes for the fallback path
+GTTS_LANGS = {
+    "es": "es",
+    "es-mx": "es",
+    "es-es": "es",
+    "en": "en",
+    "en-us": "en",
+    "en-gb": "en",
+    "ru": "ru",
+    "pt": "pt"
+}
+
 # Voice settings for different contexts
 VOICE_STYLES = {
     "tutor": {
@@ -87,10 +123,226 @@ VOICE_STYLES = {
 }
 
 
+# =============================================================================
+# TTS AUDIO CACHE - content-addressed, size-bounded LRU on disk
+# =============================================================================
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", 200))
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Part of the cache key - bump it if the transcode settings below change
+TTS_CACHE_FORMAT = "ogg-opus-64k"
+
+
+def tts_cache_key(text: str, voice: str, rate: str, pitch: str, audio_format: str = TTS_CACHE_FORMAT) -> str:
+    raw = "\x1f".join((voice, rate, pitch, audio_format, text))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def unique_audio_path(prefix: str, file_id, extension: str) -> str:
+    """Per-request file in the media scratch area - message ids repeat across chats"""
+    return scratch_path(f"{prefix}{file_id or 'x'}_", extension)
+
+
+class TTSAudioCache:
+    """
+    Ready-to-send voice notes stored as <dir>/<key[:2]>/<key>.ogg.
+    File mtimes double as LRU timestamps, so the order survives restarts.
+    """
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_mb: float = TTS_CACHE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.ogg")
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _ensure_size(self):
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            # Touch for LRU ordering
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key: str, source_path: str) -> Optional[str]:
+        """Move a freshly rendered file into the cache and return its cached path"""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            size = os.path.getsize(source_path)
+            with self._lock:
+                self._ensure_size()
+                replaced = os.path.getsize(path) if os.path.exists(path) else 0
+                shutil.move(source_path, path)
+                self._total_bytes += size - replaced
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+            return path
+        except OSError as e:
+            logging.error(f"TTS cache write error: {e}")
+            return None
+
+    def _evict(self):
+        """Drop least recently used entries until we are 10% under budget"""
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in sorted(self._scan()):
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._total_bytes -= size
+            except OSError:
+                pass
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            # Evicted between get() and open()
+            return None
+
+    def put_bytes(self, key: str, data: bytes) -> Optional[str]:
+        tmp_path = f"{self._path(key)}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        except OSError as e:
+            logging.error(f"TTS cache write error: {e}")
+            return None
+        return self.put(key, tmp_path)
+
+    def stats(self):
+        with self._lock:
+            self._ensure_size()
+            return {"hits": self.hits, "misses": self.misses, "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+
+tts_cache = TTSAudioCache()
+
+
+def transcode_to_ogg_bytes(audio: bytes, input_format: str = "mp3") -> Optional[bytes]:
+    """
+    MP3 (or any ffmpeg input format) -> OGG/Opus for Telegram voice notes,
+    through one stdin/stdout pipe - no temp files.
+    """
+    result = subprocess.run([
+        "ffmpeg", "-v", "error",
+        "-f", input_format, "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", "64k",
+        "-f", "ogg", "pipe:1"
+    ], input=audio, capture_output=True)
+    if result.returncode != 0 or not result.stdout:
+        logging.error(f"ffmpeg opus transcode failed: {result.stderr.decode(errors='ignore')[-300:]}")
+        return None
+    return result.stdout
+
+
+def gtts_ogg_bytes(text: str, lang: str = "es") -> Optional[bytes]:
+    """gTTS rendered into memory and transcoded to OGG/Opus"""
+    if not GTTS_AVAILABLE:
+        return None
+    try:
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=GTTS_LANGS.get(lang.lower(), "es"), slow=False).write_to_fp(buffer)
+        return transcode_to_ogg_bytes(buffer.getvalue())
+    except Exception as e:
+        logging.error(f"gTTS voice note error: {e}")
+        return None
+
+
 # =============================================================================
 # ASYNC TTS GENERATION (Preferred - Fast)
 # =============================================================================
 
+async def _stream_edge_tts(text: str, voice: str, rate: str, pitch: str) -> bytes:
+    """Collect the edge-tts audio stream in memory"""
+    communicate = edge_tts.Communicate(
+        text=text,
+        voice=voice,
+        rate=rate,
+        pitch=pitch
+    )
+    audio = bytearray()
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio.extend(chunk["data"])
+    return bytes(audio)
+
+
+async def generate_voice_bytes(
+    text: str,
+    lang: str = "es",
+    style: str = "tutor"
+) -> Optional[bytes]:
+    """
+    Generate a neural voice note as OGG/Opus bytes, ready for bot.send_voice.
+    Returns None if neural synthesis is unavailable or failed.
+    """
+    if not EDGE_TTS_AVAILABLE:
+        return None
+
+    try:
+        # Get voice for language
+        voice = NEURAL_VOICES.get(lang.lower(), NEURAL_VOICES["es"])
+
+        # Get style settings
+        settings = VOICE_STYLES.get(style, VOICE_STYLES["tutor"])
+        rate = settings["rate"]
+        pitch = settings["pitch"]
+
+        key = tts_cache_key(text, voice, rate, pitch) if TTS_CACHE_ENABLED else None
+        if key:
+            cached = await asyncio.to_thread(tts_cache.get_bytes, key)
+            if cached:
+                return cached
+
+        # The Edge read-aloud endpoint only serves MP3, so stream it into memory
+        # and make the Opus in a single piped ffmpeg pass - off the event loop
+        mp3_audio = await _stream_edge_tts(text, voice, rate, pitch)
+        if not mp3_audio:
+            raise Exception("edge-tts returned no audio")
+        ogg_audio = await asyncio.to_thread(transcode_to_ogg_bytes, mp3_audio)
+        if not ogg_audio:
+            return None
+
+        if key:
+            await asyncio.to_thread(tts_cache.put_bytes, key, ogg_audio)
+        return ogg_audio
+
+    except Exception as e:
+        logging.error(f"Neural TTS error: {e}")
+        return None
+
+
 async def generate_voice(
     text: str,
     lang: str = "es",
@@ -105,60 +357,92 @@ async def generate_voice(
         text: Text to speak
         lang: Language code (es, en, ru, etc.)
         style: Voice style (tutor, conversation, slow, excited)
-        output_format: Output format (mp3 or ogg)
+        output_format: Ignored - neural audio is always returned as OGG/Opus
         message_id: Optional message ID for unique filename
         
     Returns:
-        Path to generated audio file, or None if failed
+        Path to generated audio file (owned by the caller), or None if failed
     """
-    if not EDGE_TTS_AVAILABLE:
-        return generate_voice_gtts_fallback(text, lang, message_id)
-    
-    try:
-        # Get voice for language
-        voice = NEURAL_VOICES.get(lang.lower(), NEURAL_VOICES["es"])
-        
-        # Get style settings
-        settings = VOICE_STYLES.get(style, VOICE_STYLES["tutor"])
-        rate = settings["rate"]
-        pitch = settings["pitch"]
-        
-        # Generate unique filename
-        file_id = message_id or hash(text) % 100000
-        output_path = f"neural_tts_{file_id}.{output_format}"
-        
-        # Generate with edge-tts
-        communicate = edge_tts.Communicate(
-            text=text,
-            voice=voice,
-            rate=rate,
-            pitch=pitch
-        )
-        
-        await communicate.save(output_path)
-        
-        # Convert to OGG if needed for Telegram voice notes
-        if output_format == "ogg":
-            ogg_path = output_path
-        else:
-            ogg_path = f"neural_tts_{file_id}.ogg"
-            # Convert MP3 to OGG opus for Telegram
-            subprocess.run([
-                "ffmpeg", "-y", "-i", output_path,
-                "-c:a", "libopus", "-b:a", "64k",
-                ogg_path
-            ], capture_output=True)
-            # Clean up MP3
-            if os.path.exists(output_path) and output_path != ogg_path:
-                os.remove(output_path)
-            output_path = ogg_path
-        
-        return output_path
-        
-    except Exception as e:
-        logging.error(f"Neural TTS error: {e}")
+    ogg_audio = await generate_voice_bytes(text, lang, style)
+    if not ogg_audio:
         # Fall back to gTTS
-        return generate_voice_gtts_fallback(text, lang, message_id)
+        return await asyncio.to_thread(generate_voice_gtts_fallback, text, lang, message_id)
+
+    ogg_path = unique_audio_path("neural_tts_", message_id, "ogg")
+    with open(ogg_path, "wb") as f:
+        f.write(ogg_audio)
+    return ogg_path
+
+
+# =============================================================================
+# BACKGROUND TTS LOOP - one event loop thread owns every edge-tts session
+# =============================================================================
+
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", 4))
+TTS_REQUEST_TIMEOUT = float(os.getenv("TTS_REQUEST_TIMEOUT", 30))
+
+
+class TTSLoopWorker:
+    """
+    Runs generate_voice() on a dedicated asyncio loop thread.
+    submit() can be called from any thread and returns a concurrent.futures.Future.
+    """
+
+    def __init__(self, max_concurrency: int = TTS_MAX_CONCURRENCY, timeout: float = TTS_REQUEST_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.loop = None
+        self._thread = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run_loop, args=(ready,), name="tts-loop", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def _run_loop(self, ready: threading.Event):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        ready.set()
+        self.loop.run_forever()
+
+    async def _bounded(self, coro):
+        async with self._semaphore:
+            return await asyncio.wait_for(coro, timeout=self.timeout)
+
+    def in_worker_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(
+        self,
+        text: str,
+        lang: str = "es",
+        style: str = "tutor",
+        output_format: str = "mp3",
+        message_id: Optional[int] = None
+    ) -> concurrent.futures.Future:
+        """Schedule a file-producing synthesis on the TTS loop; thread-safe"""
+        return self.run(generate_voice(text, lang, style, output_format, message_id))
+
+    def run(self, coro) -> concurrent.futures.Future:
+        """Run any TTS coroutine on the loop under the concurrency cap and timeout"""
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._bounded(coro), self.loop)
+
+    def stop(self):
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+tts_worker = TTSLoopWorker()
 
 
 # =============================================================================
@@ -174,34 +458,124 @@ def generate_voice_sync(
 ) -> Optional[str]:
     """
     Synchronous wrapper for generate_voice.
-    Use this in existing code that isn't async.
+    Use this in existing code that isn't async - it blocks until the
+    background TTS loop has produced the file (or the timeout hits).
     """
+    if tts_worker.in_worker_thread():
+        # Blocking here would deadlock the loop we are waiting on
+        logging.error("generate_voice_sync called from the TTS loop - use generate_voice instead")
+        return generate_voice_gtts_fallback(text, lang, message_id)
+
+    future = tts_worker.submit(text, lang, style, output_format, message_id)
     try:
-        # Create new event loop if none exists
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        
-        if loop.is_running():
-            # If we're already in an async context, use run_coroutine_threadsafe
-            import concurrent.futures
-            future = asyncio.run_coroutine_threadsafe(
-                generate_voice(text, lang, style, output_format, message_id),
-                loop
-            )
-            return future.result(timeout=30)
-        else:
-            # Run directly
-            return loop.run_until_complete(
-                generate_voice(text, lang, style, output_format, message_id)
-            )
+        # Small grace period on top of the in-loop timeout for the hand-off
+        return future.result(timeout=tts_worker.timeout + 5)
     except Exception as e:
-        logging.error(f"Sync TTS wrapper error: {e}")
+        future.cancel()
+        logging.error(f"Sync TTS wrapper error: {e!r}")
         return generate_voice_gtts_fallback(text, lang, message_id)
 
 
+def generate_voice_bytes_sync(
+    text: str,
+    lang: str = "es",
+    style: str = "tutor"
+) -> Optional[bytes]:
+    """
+    OGG/Opus voice note bytes from any thread - neural voice when possible,
+    otherwise gTTS transcoded in memory. None only if both failed.
+    """
+    if not tts_worker.in_worker_thread():
+        future = tts_worker.run(generate_voice_bytes(text, lang, style))
+        try:
+            ogg_audio = future.result(timeout=tts_worker.timeout + 5)
+            if ogg_audio:
+                return ogg_audio
+        except Exception as e:
+            future.cancel()
+            logging.error(f"Sync TTS bytes error: {e!r}")
+    return gtts_ogg_bytes(text, lang)
+
+
+def cached_voice_bytes(text: str, lang: str = "es", style: str = "tutor") -> Optional[bytes]:
+    """The voice note generate_voice_bytes would serve from cache, or None - never synthesizes"""
+    if not (EDGE_TTS_AVAILABLE and TTS_CACHE_ENABLED):
+        return None
+    voice = NEURAL_VOICES.get(lang.lower(), NEURAL_VOICES["es"])
+    settings = VOICE_STYLES.get(style, VOICE_STYLES["tutor"])
+    return tts_cache.get_bytes(tts_cache_key(text, voice, settings["rate"], settings["pitch"]))
+
+
+def concat_ogg_bytes(parts: List[bytes]) -> Optional[bytes]:
+    """Join OGG/Opus voice notes in order with a stream-copy ffmpeg concat"""
+    parts = [part for part in parts if part]
+    if len(parts) <= 1:
+        return parts[0] if parts else None
+    with media_workspace("concat") as ws:
+        list_path = ws.path("parts.txt")
+        with open(list_path, "w") as listing:
+            for i, part in enumerate(parts):
+                part_path = ws.path(f"part_{i}.ogg")
+                with open(part_path, "wb") as f:
+                    f.write(part)
+                listing.write(f"file '{part_path}'\n")
+        result = subprocess.run([
+            "ffmpeg", "-v", "error",
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-c", "copy", "-f", "ogg", "pipe:1"
+        ], capture_output=True)
+    if result.returncode != 0 or not result.stdout:
+        logging.error(f"ffmpeg voice concat failed: {result.stderr.decode(errors='ignore')[-300:]}")
+        return None
+    return result.stdout
+
+
+def generate_voice_chunks_sync(
+    chunks: List[str],
+    lang: str = "es",
+    style: str = "tutor",
+    on_first_chunk: Optional[Callable[[bytes], None]] = None
+) -> List[Optional[bytes]]:
+    """
+    Synthesize all chunks concurrently on the TTS loop and return their
+    OGG/Opus bytes in chunk order, so a long reply takes about as long as its
+    slowest chunk instead of the sum of all of them. Chunks whose neural
+    synthesis fails fall back to gTTS individually.
+
+    on_first_chunk(audio) is called as soon as chunk 0 is ready, while the
+    others may still be synthesizing.
+    """
+    if tts_worker.in_worker_thread():
+        logging.error("generate_voice_chunks_sync called from the TTS loop - falling back to gTTS")
+        futures = [None] * len(chunks)
+    else:
+        futures = [tts_worker.run(generate_voice_bytes(chunk, lang, style)) for chunk in chunks]
+
+    # Chunks beyond the concurrency cap queue behind the first ones, so the
+    # overall deadline grows with the number of waves
+    waves = -(-len(chunks) // tts_worker.max_concurrency) if chunks else 0
+    deadline = time.monotonic() + tts_worker.timeout * waves + 5
+
+    results = []
+    for i, (chunk, future) in enumerate(zip(chunks, futures)):
+        audio = None
+        if future is not None:
+            try:
+                audio = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except Exception as e:
+                future.cancel()
+                logging.error(f"Chunk {i} TTS error: {e!r}")
+        if not audio:
+            audio = gtts_ogg_bytes(chunk, lang)
+        if i == 0 and audio and on_first_chunk is not None:
+            try:
+                on_first_chunk(audio)
+            except Exception as e:
+                logging.error(f"First chunk callback error: {e}")
+        results.append(audio)
+    return results
+
+
 # =============================================================================
 # GTTS FALLBACK (If edge-tts fails)
 # =============================================================================
@@ -217,20 +591,9 @@ def generate_voice_gtts_fallback(
         return None
     
     try:
-        # Map language codes
-        gtts_lang = {
-            "es": "es",
-            "es-mx": "es",
-            "es-es": "es",
-            "en": "en",
-            "en-us": "en",
-            "en-gb": "en",
-            "ru": "ru",
-            "pt": "pt"
-        }.get(lang.lower(), "es")
+        gtts_lang = GTTS_LANGS.get(lang.lower(), "es")
         
-        file_id = message_id or hash(text) % 100000
-        output_path = f"gtts_fallback_{file_id}.mp3"
+        output_path = unique_audio_path("gtts_fallback_", message_id, "mp3")
         
         tts = gTTS(text=text, lang=gtts_lang, slow=False)
         tts.save(output_path)
@@ -274,7 +637,7 @@ def list_available_voices():
 def cleanup_audio_files(prefix: str = "neural_tts_"):
     """Clean up old audio files"""
     import glob
-    for f in glob.glob(f"{prefix}*"):
+    for f in glob.glob(os.path.join(workspace_manager.root, SCRATCH_DIR, f"{prefix}*")):
         try:
             os.remove(f)
         except:
@@ -8,7 +8,7 @@ import os
 from dotenv import load_dotenv
 load_dotenv()  # Load .env before reading credentials
 import json
-import requests
+from espaluz_http import http_get, http_post
 import logging
 import re
 from datetime import datetime, timedelta
@@ -80,12 +80,15 @@ class TelegramPayPalSystem:
             }
             data = "grant_type=client_credentials"
             
-            response = requests.post(
+            response = http_post(
+                "paypal",
                 auth_url,
                 headers=headers,
                 data=data,
                 auth=(PAYPAL_CLIENT_ID, PAYPAL_CLIENT_SECRET),
-                timeout=10
+                timeout=10,
+                # Token requests create nothing - safe to retry
+                idempotent=True
             )
             
             if response.status_code == 200:
@@ -158,7 +161,7 @@ class TelegramPayPalSystem:
             }
             
             try:
-                res = requests.get(transactions_url, headers=headers, params=params, timeout=15)
+                res = http_get("paypal", transactions_url, headers=headers, params=params, timeout=15)
                 
                 if res.status_code == 200:
                     data = res.json()
@@ -219,7 +222,7 @@ class TelegramPayPalSystem:
         """Verify a specific subscription ID belongs to the email and is active"""
         try:
             url = f"{PAYPAL_BASE_URL}/v1/billing/subscriptions/{subscription_id}"
-            res = requests.get(url, headers=headers, timeout=10)
+            res = http_get("paypal", url, headers=headers, timeout=10)
             
             if res.status_code == 200:
                 sub_data = res.json()
@@ -310,7 +313,7 @@ class TelegramPayPalSystem:
             
             # Get transaction details
             url = f"{PAYPAL_BASE_URL}/v2/payments/captures/{transaction_id}"
-            res = requests.get(url, headers=headers, timeout=10)
+            res = http_get("paypal", url, headers=headers, timeout=10)
             
             if res.status_code == 200:
                 data = res.json()
@@ -346,7 +349,7 @@ class TelegramPayPalSystem:
             
             # Verify the subscription exists and is active
             url = f"{PAYPAL_BASE_URL}/v1/billing/subscriptions/{subscription_id}"
-            res = requests.get(url, headers=headers, timeout=10)
+            res = http_get("paypal", url, headers=headers, timeout=10)
             
             if res.status_code == 200:
                 sub_data = res.json()
@@ -641,7 +644,7 @@ Find it in PayPal → Settings → Payments → Automatic payments."""
             
             # REAL PayPal API call to verify subscription
             url = f"{PAYPAL_BASE_URL}/v1/billing/subscriptions/{subscription_id}"
-            res = requests.get(url, headers=headers, timeout=15)
+            res = http_get("paypal", url, headers=headers, timeout=15)
             
             if res.status_code == 200:
                 data = res.json()
@@ -854,7 +857,7 @@ Don't lose access to your AI tutor. Subscribe now:
                 "page_size": 500
             }
             
-            res = requests.get(transactions_url, headers=headers, params=params, timeout=30)
+            res = http_get("paypal", transactions_url, headers=headers, params=params, timeout=30)
             
             if res.status_code == 200:
                 data = res.json()
@@ -948,7 +951,7 @@ Don't lose access to your AI tutor. Subscribe now:
                 "page_size": 500
             }
             
-            res = requests.get(transactions_url, headers=headers, params=params, timeout=30)
+            res = http_get("paypal", transactions_url, headers=headers, params=params, timeout=30)
             
             if res.status_code != 200:
                 return 0
@@ -0,0 +1,107 @@
+"""
+EspaLuz Reply Render Plan
+=========================
+One audio render per distinct text segment of a reply.
+
+The video job used to synthesize the video script and the voice job then
+synthesized the whole reply again - script included - so every reply paid for
+the script twice. A ReplyRenderPlan names the spoken segments of one reply
+(e.g. "script" and "rest"), renders each distinct text at most once no matter
+how many jobs ask for it or from which thread, and lets outputs be assembled
+from segments: the script audio is both the video soundtrack and the opening
+of the voice note.
+
+Long segments (the "rest" of a long reply) are split with the plan's
+splitter and their chunks synthesized concurrently through
+generate_voice_chunks_sync, then joined; each chunk is looked up in the TTS
+cache first, so only the chunks never heard before are synthesized.
+
+Every segment records where its audio came from ("cache", "synth",
+"partial" or "failed") for logging.
+
+Usage:
+    from espaluz_render_plan import ReplyRenderPlan
+
+    plan = ReplyRenderPlan([("script", script_text), ("rest", rest_text)], splitter=split_voice_chunks)
+    soundtrack = plan.audio("script")               # OGG/Opus bytes
+    voice_note = plan.combined(["script", "rest"])  # script audio reused
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from espaluz_neural_tts import cached_voice_bytes, generate_voice_chunks_sync, concat_ogg_bytes
+
+
+class ReplyRenderPlan:
+    """Per-reply memo of rendered speech segments, shared by the voice and video jobs"""
+
+    def __init__(self, segments: List[Tuple[str, str]], lang: str = "es", style: str = "tutor",
+                 splitter: Optional[Callable[[str], List[str]]] = None):
+        self.lang = lang
+        self.style = style
+        # text -> chunks synthesized separately; None renders every segment whole
+        self.splitter = splitter
+        self.segments = OrderedDict((name, text) for name, text in segments if text and text.strip())
+        self._audio: Dict[str, bytes] = {}
+        self._sources: Dict[str, str] = {}
+        self._text_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def has(self, name: str) -> bool:
+        return name in self.segments
+
+    def _text_lock(self, text: str) -> threading.Lock:
+        with self._lock:
+            return self._text_locks.setdefault(text, threading.Lock())
+
+    def _render(self, text: str) -> Optional[bytes]:
+        # Segments with the same text share one render; a second caller waits for the first
+        with self._text_lock(text):
+            if text in self._audio:
+                return self._audio[text]
+            audio, source = self._synthesize(text)
+            self._sources[text] = source
+            # Only complete audio is kept - after a failure the next caller
+            # (e.g. another tap on a media button) tries again
+            if source in ("cache", "synth"):
+                self._audio[text] = audio
+            return audio
+
+    def _synthesize(self, text: str) -> Tuple[Optional[bytes], str]:
+        chunks = self.splitter(text) if self.splitter else [text]
+        parts = [cached_voice_bytes(chunk, self.lang, self.style) for chunk in chunks]
+        missing = [i for i, part in enumerate(parts) if part is None]
+        if missing:
+            rendered = generate_voice_chunks_sync([chunks[i] for i in missing], self.lang, self.style)
+            for i, part in zip(missing, rendered):
+                parts[i] = part
+        audio = concat_ogg_bytes(parts)
+        if audio is None:
+            return None, "failed"
+        if not missing:
+            return audio, "cache"
+        return audio, "synth" if all(parts) else "partial"
+
+    def audio(self, name: str) -> Optional[bytes]:
+        """OGG/Opus bytes for one named segment, rendered on first use"""
+        text = self.segments.get(name)
+        return self._render(text) if text else None
+
+    def combined(self, names: List[str]) -> Optional[bytes]:
+        """Named segments rendered (once each) and joined in order"""
+        return concat_ogg_bytes([self.audio(name) for name in names if self.has(name)])
+
+    def release(self, names: List[str]):
+        """Forget the rendered audio of segments no output needs any more"""
+        with self._lock:
+            kept = {text for name, text in self.segments.items() if name not in names}
+            for name in names:
+                text = self.segments.get(name)
+                if text not in kept:
+                    self._audio.pop(text, None)
+
+    def report(self) -> Dict[str, str]:
+        """Segment name -> "cache" / "synth" / "partial" / "failed" / "pending" """
+        return {name: self._sources.get(text, "pending") for name, text in self.segments.items()}
@@ -0,0 +1,271 @@
+"""
+EspaLuz Session Store
+=====================
+Incremental persistence for user tutor sessions.
+
+The old approach rewrote all of user_sessions.json after every message, so
+each save cost O(total users x history). The store here persists sessions one
+row at a time and skips sessions whose serialized form has not changed since
+the last save, so saving after a message only touches that one user.
+
+Backends:
+- SQLiteSessionStore (default): one row per user in a WAL-mode SQLite file.
+  Every write is an atomic transaction; compact() checkpoints the WAL. The
+  user_sessions.json snapshot other readers still use is an explicit export,
+  refreshed at most every SESSION_JSON_SNAPSHOT_INTERVAL seconds and only
+  after sessions changed.
+- JsonFileSessionStore: the legacy single JSON file, now written atomically
+  (temp file + os.replace) and only when something actually changed.
+
+Usage:
+    from espaluz_session_store import create_session_store
+
+    store = create_session_store("user_sessions.json")
+    sessions = store.load_all()
+    store.save(user_id, sessions[user_id])   # after a conversation
+    store.save_all(sessions)                 # periodic safety net
+    store.compact()                          # periodic, cheap
+    store.export_json_if_due()               # periodic, rarely does anything
+"""
+
+import os
+import abc
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import logging
+from typing import Dict, Any, Optional
+
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "sqlite").lower()
+SESSION_DB_FILE = os.getenv("SESSION_DB_FILE", "user_sessions.db")
+# Keep exporting a user_sessions.json snapshot - the JSON fallback in
+# espaluz_database still reads it for user counts and migration. It is a full
+# rewrite, so it runs at most once per interval (seconds)
+SESSION_JSON_SNAPSHOT = os.getenv("SESSION_JSON_SNAPSHOT", "true").lower() in ("1", "true", "yes")
+SESSION_JSON_SNAPSHOT_INTERVAL = float(os.getenv("SESSION_JSON_SNAPSHOT_INTERVAL", 6 * 3600))
+
+
+def _serialize(session: Dict[str, Any]) -> Optional[str]:
+    """Serialize a session, or None if it holds non-JSON values"""
+    try:
+        return json.dumps(session, ensure_ascii=False, separators=(",", ":"))
+    except (TypeError, ValueError, RuntimeError):
+        # RuntimeError: mutated by a handler thread mid-dump - next save picks it up
+        return None
+
+
+def _digest(payload: str) -> bytes:
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = 2):
+    """Write JSON to a temp file in the same directory and rename it into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SessionStore(abc.ABC):
+    """Common dirty-tracking logic; backends implement load_all/_write/delete"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._saved_digests = {}
+
+    @abc.abstractmethod
+    def load_all(self) -> Dict[str, Dict[str, Any]]:
+        """Every stored session, keyed by user id"""
+
+    @abc.abstractmethod
+    def _write(self, rows: Dict[str, str]):
+        """Persist serialized sessions; called with the lock held"""
+
+    @abc.abstractmethod
+    def delete(self, user_id: str):
+        """Remove one user's session"""
+
+    def compact(self):
+        """Reclaim space / fold logs - cheap, safe to call at any time"""
+
+    def export_json_if_due(self) -> bool:
+        """Refresh a JSON snapshot for legacy readers if one is due; True if written"""
+        return False
+
+    def _dirty_rows(self, sessions: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        rows = {}
+        for user_id, session in sessions.items():
+            payload = _serialize(session)
+            if payload is None:
+                print(f"⚠️ Session for {user_id} not serializable, skipping")
+                continue
+            digest = _digest(payload)
+            if self._saved_digests.get(user_id) != digest:
+                rows[user_id] = payload
+        return rows
+
+    def save(self, user_id: str, session: Dict[str, Any]) -> bool:
+        """Persist a single session if it changed. Returns True if written."""
+        return self.save_all({str(user_id): session}) > 0
+
+    def save_all(self, sessions: Dict[str, Dict[str, Any]]) -> int:
+        """Persist every changed session. Returns the number written."""
+        with self._lock:
+            rows = self._dirty_rows(sessions)
+            if rows:
+                self._write(rows)
+                for user_id, payload in rows.items():
+                    self._saved_digests[user_id] = _digest(payload)
+            return len(rows)
+
+
+class SQLiteSessionStore(SessionStore):
+    """One row per user in a WAL-mode SQLite database"""
+
+    def __init__(self, db_path: str = SESSION_DB_FILE, legacy_json: Optional[str] = None,
+                 json_snapshot: bool = SESSION_JSON_SNAPSHOT,
+                 snapshot_interval: float = SESSION_JSON_SNAPSHOT_INTERVAL):
+        super().__init__()
+        self.db_path = db_path
+        self.legacy_json = legacy_json
+        self.json_snapshot = json_snapshot
+        self.snapshot_interval = snapshot_interval
+        # Writes so far, and how many of them the last JSON export included
+        self._changes = 0
+        self._exported_changes = 0
+        self._last_export = None
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                user_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    def _import_legacy_json(self) -> Dict[str, Dict[str, Any]]:
+        """First run: seed the database from the old user_sessions.json"""
+        if not self.legacy_json or not os.path.exists(self.legacy_json):
+            return {}
+        try:
+            with open(self.legacy_json, "r", encoding="utf-8") as f:
+                sessions = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not import legacy sessions from {self.legacy_json}: {e}")
+            return {}
+        self.save_all(sessions)
+        print(f"💾 Imported {len(sessions)} sessions from {self.legacy_json} into {self.db_path}")
+        return sessions
+
+    def load_all(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT user_id, data FROM sessions").fetchall()
+        if not rows:
+            return self._import_legacy_json()
+
+        sessions = {}
+        for user_id, payload in rows:
+            try:
+                sessions[user_id] = json.loads(payload)
+                self._saved_digests[user_id] = _digest(payload)
+            except ValueError as e:
+                logging.error(f"Corrupt session row for {user_id}: {e}")
+        return sessions
+
+    def _write(self, rows: Dict[str, str]):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany("""
+                INSERT INTO sessions (user_id, data, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at
+            """, list(rows.items()))
+            self._conn.execute("COMMIT")
+            self._changes += 1
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE user_id = ?", (str(user_id),))
+            self._saved_digests.pop(str(user_id), None)
+            self._changes += 1
+
+    def compact(self):
+        """Checkpoint the WAL into the main file"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def export_json(self, path: Optional[str] = None) -> int:
+        """Write every session to one JSON file (the legacy file by default); returns how many"""
+        path = path or self.legacy_json
+        with self._lock:
+            rows = self._conn.execute("SELECT user_id, data FROM sessions").fetchall()
+            changes = self._changes
+        snapshot = {user_id: json.loads(payload) for user_id, payload in rows}
+        write_json_atomic(path, snapshot)
+        self._exported_changes = changes
+        self._last_export = time.monotonic()
+        return len(snapshot)
+
+    def export_json_if_due(self) -> bool:
+        """Export to the legacy file if sessions changed and the interval has passed"""
+        if not (self.json_snapshot and self.legacy_json) or self._changes == self._exported_changes:
+            return False
+        if self._last_export is not None and time.monotonic() - self._last_export < self.snapshot_interval:
+            return False
+        self.export_json()
+        return True
+
+
+class JsonFileSessionStore(SessionStore):
+    """Legacy single-file backend, written atomically and only when dirty"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._sessions = {}
+
+    def load_all(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            sessions = json.load(f)
+        with self._lock:
+            for user_id, session in sessions.items():
+                payload = _serialize(session)
+                self._sessions[user_id] = session
+                if payload is not None:
+                    self._saved_digests[user_id] = _digest(payload)
+        return sessions
+
+    def _write(self, rows: Dict[str, str]):
+        for user_id, payload in rows.items():
+            self._sessions[user_id] = json.loads(payload)
+        write_json_atomic(self.path, self._sessions)
+
+    def delete(self, user_id: str):
+        with self._lock:
+            if self._sessions.pop(str(user_id), None) is not None:
+                write_json_atomic(self.path, self._sessions)
+            self._saved_digests.pop(str(user_id), None)
+
+
+def create_session_store(legacy_json: str, backend: str = SESSION_STORE_BACKEND) -> SessionStore:
+    """Build the configured session store backend"""
+    if backend == "json":
+        return JsonFileSessionStore(legacy_json)
+    return SQLiteSessionStore(SESSION_DB_FILE, legacy_json=legacy_json)
@@ -0,0 +1,135 @@
+"""
+EspaLuz Speech Text
+===================
+Text normalization for TTS and Telegram output, compiled once.
+
+clean_text_for_speech rebuilt its emoji class on every call and then ran
+about ten regex passes; strip_emojis built its own copy of the class (the
+same set of characters) on every call and strip_markdown_formatting added
+three more passes. Every reply goes through them, often several times
+(video script, voice note, convo mode). The functions here produce exactly
+the same output with:
+
+- every pattern compiled at import, and one emoji class - the 17 ranges
+  merged into 3 - shared by both callers
+- passes skipped when the text cannot match them (an ASCII text has no
+  emoji, a text without "*" has no bold, ...), so a typical reply only pays
+  for the passes its content needs
+- whitespace collapsed with str.split / join instead of a regex pass that
+  matches between every two words
+- the keycap-digit pass ("1️⃣") dropped: the emoji pass has already removed
+  the U+FE0F it required, so it could never match
+
+The order of the markdown / quote / list-number passes is kept - they
+interact ("*a_b* c_d"), so merging them into one alternation would change
+results.
+
+Usage:
+    from espaluz_speech_text import clean_text_for_speech, strip_emojis, strip_markdown_formatting
+"""
+
+import re
+
+# The single emoji strip_emojis also listed (✅ ❌ 💡 🗣 📖 🌎 🎯 ☕ 🎓 🏖) all fall inside these
+EMOJI_RANGES = [
+    ("\U0001F600", "\U0001F64F"),  # emoticons
+    ("\U0001F300", "\U0001F5FF"),  # symbols & pictographs
+    ("\U0001F680", "\U0001F6FF"),  # transport & map symbols
+    ("\U0001F700", "\U0001F77F"),  # alchemical symbols
+    ("\U0001F780", "\U0001F7FF"),  # Geometric Shapes Extended
+    ("\U0001F800", "\U0001F8FF"),  # Supplemental Arrows-C
+    ("\U0001F900", "\U0001F9FF"),  # Supplemental Symbols and Pictographs
+    ("\U0001FA00", "\U0001FA6F"),  # Chess Symbols
+    ("\U0001FA70", "\U0001FAFF"),  # Symbols and Pictographs Extended-A
+    ("\U00002702", "\U000027B0"),  # Dingbats
+    ("\U000024C2", "\U0001F251"),  # Enclosed characters
+    ("\U0001F1E0", "\U0001F1FF"),  # Flags
+    ("\U00002600", "\U000026FF"),  # Misc symbols (sun, stars, etc)
+    ("\U00002700", "\U000027BF"),  # Dingbats
+    ("\U0000FE00", "\U0000FE0F"),  # Variation Selectors
+    ("\U0001F000", "\U0001F02F"),  # Mahjong
+    ("\U0001F0A0", "\U0001F0FF"),  # Playing cards
+]
+
+
+def _merged_class(ranges) -> str:
+    """A character class with overlapping / adjacent ranges merged (3 instead of 17)"""
+    merged = []
+    for start, end in sorted((ord(a), ord(b)) for a, b in ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return "[" + "".join(f"{chr(a)}-{chr(b)}" for a, b in merged) + "]"
+
+
+EMOJI_RE = re.compile(_merged_class(EMOJI_RANGES) + "+")
+
+# clean_text_for_speech passes, in the order they must run
+_ASTERISKS = re.compile(r'\*+([^*]+)\*+')
+_UNDERSCORES = re.compile(r'_+([^_]+)_+')
+_BACKTICKS = re.compile(r'`+([^`]+)`+')
+_DOUBLE_QUOTES = re.compile(r'"([^"]+)"')
+_SINGLE_QUOTES = re.compile(r"'([^']+)'")
+_LIST_NUMBER_LINE_START = re.compile(r'^\d+\.\s*', re.MULTILINE)
+_LIST_NUMBER_AFTER_NEWLINE = re.compile(r'\n\d+\.\s*')
+_SPEECH_SYMBOLS = re.compile(r'[#@\[\](){}<>]+')
+
+# strip_markdown_formatting passes
+_BOLD = re.compile(r'\*\*([^*]+)\*\*')
+_ITALIC = re.compile(r'(?<![\w])\*([^*]+)\*(?![\w])')
+
+
+def _strip_emoji_chars(text: str) -> str:
+    # Every emoji range lies outside ASCII
+    return text if text.isascii() else EMOJI_RE.sub('', text)
+
+
+def clean_text_for_speech(text: str) -> str:
+    """Remove punctuation marks, formatting AND EMOJIS for natural speech"""
+    # FIRST: Remove ALL emojis (so they're not pronounced!)
+    text = _strip_emoji_chars(text)
+
+    # Remove markdown formatting
+    if '*' in text:
+        text = _ASTERISKS.sub(r'\1', text)
+    if '_' in text:
+        text = _UNDERSCORES.sub(r'\1', text)
+    if '`' in text:
+        text = _BACKTICKS.sub(r'\1', text)
+
+    # Remove quotes but keep the content
+    if '"' in text:
+        text = _DOUBLE_QUOTES.sub(r'\1', text)
+    if "'" in text:
+        text = _SINGLE_QUOTES.sub(r'\1', text)
+
+    # Remove numbers in lists (1. 2. etc) - a leftover "\n2." can only exist
+    # once the first pass has removed something
+    if '.' in text:
+        text, removed = _LIST_NUMBER_LINE_START.subn('', text)
+        if removed:
+            text = _LIST_NUMBER_AFTER_NEWLINE.sub('\n', text)
+
+    # Remove other common symbols but keep sentence flow
+    text = _SPEECH_SYMBOLS.sub('', text)
+
+    # Clean up extra whitespace - str.split() uses the same whitespace as \s
+    return ' '.join(text.split())
+
+
+def strip_emojis(text: str) -> str:
+    """Remove ALL emojis from text (for TTS so they're not pronounced)"""
+    return _strip_emoji_chars(text).strip()
+
+
+def strip_markdown_formatting(text: str) -> str:
+    """Remove **bold** and *italic* markdown from text"""
+    if '*' not in text:
+        return text
+    # Remove **bold** -> bold
+    text = _BOLD.sub(r'\1', text)
+    # Remove *italic* -> italic (but not inside words)
+    text = _ITALIC.sub(r'\1', text)
+    # Remove any remaining double asterisks
+    return text.replace('**', '')
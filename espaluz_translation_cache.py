@@ -0,0 +1,263 @@
+"""
+EspaLuz Translation Cache
+=========================
+Cache for short-phrase translations.
+
+Conversation mode keeps translating the same phrases ("¿Dónde está la
+farmacia?", "thank you", "how much is it") and every one of them used to be a
+full LLM round trip. TranslationCache maps normalized text to a translation,
+keyed on (source, target, model):
+
+- an in-memory LRU tier (TRANSLATION_CACHE_SIZE entries) - microsecond hits
+- an optional persistent SQLite tier (TRANSLATION_CACHE_DB, empty = off) that
+  survives restarts and is shared with other processes
+- a TTL on both tiers, so prompt or model changes eventually age out
+- hit/miss counters, mirrored into the SQLite file so the admin app (a
+  separate process) can show them via read_translation_cache_stats()
+
+Usage:
+    from espaluz_translation_cache import translation_cache
+
+    translation = translation_cache.get_or_compute(
+        text, "en", "es", "claude-sonnet-4-20250514",
+        lambda: call_the_llm(text)
+    )
+"""
+
+import os
+import re
+import atexit
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional
+
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", 2048))
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL", 30 * 24 * 3600))
+TRANSLATION_CACHE_DB = os.getenv("TRANSLATION_CACHE_DB", "translation_cache.db")
+# Longer texts are effectively unique - caching them only churns the LRU
+TRANSLATION_CACHE_MAX_CHARS = int(os.getenv("TRANSLATION_CACHE_MAX_CHARS", 500))
+# Write the counters to SQLite at most this often (seconds)
+STATS_SYNC_INTERVAL = 30
+
+_WHITESPACE = re.compile(r"\s+")
+
+STAT_KEYS = ("memory_hits", "disk_hits", "misses", "stores", "expired", "evictions", "skipped")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for the cache key: NFC, trimmed, single spaces, casefolded"""
+    text = unicodedata.normalize("NFC", text)
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def cache_key(text: str, source: str, target: str, model: str) -> str:
+    raw = "\x1f".join((source, target, model, normalize_text(text)))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class TranslationCache:
+    """Two-tier (LRU + SQLite) translation cache with TTL"""
+
+    def __init__(self, max_entries: int = TRANSLATION_CACHE_SIZE, ttl: int = TRANSLATION_CACHE_TTL,
+                 db_path: Optional[str] = TRANSLATION_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(STAT_KEYS, 0)
+        self._stats_synced_at = 0.0
+        self._conn = None
+        if self.db_path:
+            self._open_db()
+
+    def _open_db(self):
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    key TEXT PRIMARY KEY,
+                    source TEXT,
+                    target TEXT,
+                    model TEXT,
+                    translation TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute("DELETE FROM translations WHERE expires_at < ?", (time.time(),))
+        except sqlite3.Error as e:
+            logging.error(f"Translation cache DB unavailable ({self.db_path}), memory only: {e}")
+            self._conn = None
+
+    # --- tiers -------------------------------------------------------------
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        translation, expires_at = entry
+        if expires_at < now:
+            del self._entries[key]
+            self._stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return translation
+
+    def _memory_put(self, key: str, translation: str, expires_at: float):
+        self._entries[key] = (translation, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_get(self, key: str, now: float):
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT translation, expires_at FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Translation cache read error: {e}")
+            return None
+        if row is None:
+            return None
+        if row[1] < now:
+            self._stats["expired"] += 1
+            return None
+        return row
+
+    def _disk_put(self, key: str, source: str, target: str, model: str, translation: str, expires_at: float):
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute("""
+                INSERT INTO translations (key, source, target, model, translation, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET translation = excluded.translation, expires_at = excluded.expires_at
+            """, (key, source, target, model, translation, expires_at))
+        except sqlite3.Error as e:
+            logging.error(f"Translation cache write error: {e}")
+
+    # --- public API --------------------------------------------------------
+
+    def get(self, text: str, source: str, target: str, model: str) -> Optional[str]:
+        key = cache_key(text, source, target, model)
+        now = time.time()
+        with self._lock:
+            translation = self._memory_get(key, now)
+            if translation is not None:
+                self._stats["memory_hits"] += 1
+                self._maybe_sync_stats(now)
+                return translation
+            row = self._disk_get(key, now)
+            if row is not None:
+                self._memory_put(key, row[0], row[1])
+                self._stats["disk_hits"] += 1
+                self._maybe_sync_stats(now)
+                return row[0]
+            self._stats["misses"] += 1
+            self._maybe_sync_stats(now)
+            return None
+
+    def put(self, text: str, source: str, target: str, model: str, translation: str):
+        key = cache_key(text, source, target, model)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._memory_put(key, translation, expires_at)
+            self._disk_put(key, source, target, model, translation, expires_at)
+            self._stats["stores"] += 1
+
+    def get_or_compute(self, text: str, source: str, target: str, model: str,
+                       compute: Callable[[], Optional[str]]) -> Optional[str]:
+        """Return the cached translation or call compute(); failures (None) are not cached"""
+        if not text or len(text) > TRANSLATION_CACHE_MAX_CHARS:
+            with self._lock:
+                self._stats["skipped"] += 1
+            return compute()
+        translation = self.get(text, source, target, model)
+        if translation is not None:
+            return translation
+        translation = compute()
+        if translation:
+            self.put(text, source, target, model, translation)
+        return translation
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM translations")
+
+    # --- stats -------------------------------------------------------------
+
+    def _maybe_sync_stats(self, now: float):
+        """Mirror the counters into SQLite so other processes can read them"""
+        if self._conn is None or now - self._stats_synced_at < STATS_SYNC_INTERVAL:
+            return
+        self._stats_synced_at = now
+        self._write_stats()
+
+    def _write_stats(self):
+        try:
+            self._conn.executemany(
+                "INSERT INTO cache_stats (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                [(name, self._stats[name]) for name in STAT_KEYS]
+                + [("memory_entries", len(self._entries)), ("synced_at", int(time.time()))]
+            )
+        except sqlite3.Error as e:
+            logging.error(f"Translation cache stats write error: {e}")
+
+    def sync_stats(self):
+        with self._lock:
+            if self._conn is not None:
+                self._write_stats()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+def read_translation_cache_stats(db_path: str = TRANSLATION_CACHE_DB) -> Dict[str, Any]:
+    """Counters last synced by the bot process, read straight from the SQLite tier"""
+    if not db_path or not os.path.exists(db_path):
+        return {"enabled": False}
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            stats = dict(conn.execute("SELECT name, value FROM cache_stats").fetchall())
+            stats["disk_entries"] = conn.execute(
+                "SELECT COUNT(*) FROM translations WHERE expires_at >= ?", (time.time(),)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return {"enabled": True, "error": str(e)}
+    lookups = stats.get("memory_hits", 0) + stats.get("disk_hits", 0) + stats.get("misses", 0)
+    hits = stats.get("memory_hits", 0) + stats.get("disk_hits", 0)
+    stats["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+    stats["enabled"] = True
+    return stats
+
+
+# Global instance used by main.py
+translation_cache = TranslationCache()
+atexit.register(translation_cache.sync_stats)
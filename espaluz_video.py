@@ -0,0 +1,179 @@
+"""
+EspaLuz Avatar Video Renderer
+=============================
+Sub-second avatar videos by muxing instead of encoding.
+
+Every video reply used to re-encode the whole avatar clip with libx264 just to
+attach new audio. LoopLibrary instead prepares, once, looped variants of the
+base clip at several lengths (VIDEO_LOOP_LENGTHS) - plus square low-resolution
+variants for Telegram video notes - and each reply only muxes its audio onto
+the shortest variant that covers it with `-c:v copy`, trimmed to the audio
+length. Only the audio is encoded per reply.
+
+The library lives in VIDEO_LIBRARY_DIR and is keyed on the base clip's size and
+mtime, so replacing the clip rebuilds it automatically.
+
+Usage:
+    from espaluz_video import loop_library, render_reply_video
+
+    loop_library.prepare_async()                        # at startup
+    render_reply_video("reply.mp3", "reply.mp4")        # per reply
+    render_reply_video("reply.mp3", "note.mp4", video_note=True)
+"""
+
+import os
+import logging
+import threading
+import subprocess
+from typing import Dict, Optional, Tuple
+
+VIDEO_BASE_CLIP = os.getenv(
+    "VIDEO_BASE_CLIP",
+    "looped_video.mp4" if os.path.exists("looped_video.mp4") else "espaluz_loop.mp4"
+)
+VIDEO_LIBRARY_DIR = os.getenv("VIDEO_LIBRARY_DIR", "video_library")
+VIDEO_LOOP_LENGTHS = tuple(
+    int(length) for length in os.getenv("VIDEO_LOOP_LENGTHS", "10,20,30,60").split(",")
+)
+# Telegram video notes are square and at most one minute long
+VIDEO_NOTE_SIZE = int(os.getenv("VIDEO_NOTE_SIZE", 384))
+VIDEO_NOTE_MAX_SECONDS = 60
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """Container duration in seconds via ffprobe"""
+    result = subprocess.run([
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        path
+    ], capture_output=True, text=True)
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+
+class LoopLibrary:
+    """Precomputed looped base-video variants, built once and reused for every reply"""
+
+    def __init__(self, base_clip: str = VIDEO_BASE_CLIP, directory: str = VIDEO_LIBRARY_DIR,
+                 lengths: Tuple[int, ...] = VIDEO_LOOP_LENGTHS):
+        self.base_clip = base_clip
+        self.directory = directory
+        self.lengths = tuple(sorted(lengths))
+        self._variants: Dict[str, Dict[int, str]] = {}
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _fingerprint(self) -> str:
+        st = os.stat(self.base_clip)
+        return f"{st.st_size:x}{int(st.st_mtime):x}"
+
+    def _build_video(self, length: int, path: str) -> bool:
+        """Loop the base clip to `length` seconds without re-encoding"""
+        result = subprocess.run([
+            "ffmpeg", "-y", "-v", "error",
+            "-stream_loop", "-1", "-i", self.base_clip,
+            "-t", str(length), "-an",
+            "-c:v", "copy", "-movflags", "+faststart",
+            path
+        ], capture_output=True)
+        return result.returncode == 0
+
+    def _build_video_note(self, length: int, path: str) -> bool:
+        """Square low-resolution loop for send_video_note - encoded once, here"""
+        size = VIDEO_NOTE_SIZE
+        result = subprocess.run([
+            "ffmpeg", "-y", "-v", "error",
+            "-stream_loop", "-1", "-i", self.base_clip,
+            "-t", str(length), "-an",
+            "-vf", f"crop='min(iw,ih)':'min(iw,ih)',scale={size}:{size}",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", "28",
+            "-pix_fmt", "yuv420p", "-g", "30", "-movflags", "+faststart",
+            path
+        ], capture_output=True)
+        return result.returncode == 0
+
+    def prepare(self) -> bool:
+        """Build (or reuse) every variant; safe to call repeatedly"""
+        with self._lock:
+            if self._ready:
+                return True
+            if not os.path.exists(self.base_clip):
+                logging.error(f"Avatar base clip not found: {self.base_clip}")
+                return False
+            os.makedirs(self.directory, exist_ok=True)
+            fingerprint = self._fingerprint()
+            builders = {"video": self._build_video, "video_note": self._build_video_note}
+            variants = {}
+            for variant, build in builders.items():
+                variants[variant] = {}
+                for length in self.lengths:
+                    if variant == "video_note" and length > VIDEO_NOTE_MAX_SECONDS:
+                        continue
+                    path = os.path.join(self.directory, f"{variant}_{fingerprint}_{length}s.mp4")
+                    if os.path.exists(path) or build(length, path):
+                        variants[variant][length] = path
+                    else:
+                        logging.error(f"Could not build {variant} loop of {length}s")
+            self._variants = variants
+            self._ready = bool(variants["video"])
+            print(f"🎬 Video loop library ready: { {k: sorted(v) for k, v in variants.items()} }")
+            return self._ready
+
+    def prepare_async(self):
+        threading.Thread(target=self.prepare, name="video-loop-library", daemon=True).start()
+
+    def pick(self, duration: float, variant: str = "video") -> Optional[str]:
+        """Shortest loop covering `duration`, or the longest one available"""
+        if not self.prepare():
+            return None
+        loops = self._variants.get(variant) or {}
+        for length in sorted(loops):
+            if length >= duration:
+                return loops[length]
+        return loops[max(loops)] if loops else None
+
+
+def render_reply_video(audio_path: str, output_path: str, video_note: bool = False,
+                       max_duration: Optional[float] = None,
+                       library: Optional["LoopLibrary"] = None) -> bool:
+    """
+    Mux reply audio onto a precomputed loop: video stream copied, audio encoded
+    to AAC, output trimmed to the audio length (and max_duration if given).
+    """
+    library = library or loop_library
+    duration = probe_duration(audio_path) or 0.0
+    if video_note:
+        max_duration = min(max_duration or VIDEO_NOTE_MAX_SECONDS, VIDEO_NOTE_MAX_SECONDS)
+    if max_duration:
+        duration = min(duration, max_duration) if duration else max_duration
+
+    loop_path = library.pick(duration, "video_note" if video_note else "video")
+    if loop_path is None:
+        return False
+
+    command = [
+        "ffmpeg", "-y", "-v", "error",
+        "-i", loop_path,
+        "-i", audio_path,
+        "-map", "0:v:0",
+        "-map", "1:a:0",
+        "-c:v", "copy",
+        "-c:a", "aac", "-b:a", "96k",
+        "-shortest",
+    ]
+    if duration:
+        command += ["-t", f"{duration:.3f}"]
+    command += ["-movflags", "+faststart", output_path]
+
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        logging.error(f"Video mux failed: {result.stderr[-300:]}")
+        return False
+    return os.path.exists(output_path) and os.path.getsize(output_path) > 1000
+
+
+# Global library used by main.py
+loop_library = LoopLibrary()
@@ -0,0 +1,192 @@
+"""
+EspaLuz Vocabulary Store
+========================
+Set-indexed vocabulary and grammar progress.
+
+session["context"]["learning"]["progress"] keeps, per kind ("vocabulary",
+"grammar") and language, a "learned" and a "needs_review" list. Every new
+word was checked with `word not in learned` and mastered words were moved
+with `needs_review.remove(word)` - linear scans that grow with the learner's
+vocabulary. bind_learning_progress turns those lists into ProgressLists:
+
+- still lists (insertion order, slicing, len, JSON), so the existing reads
+  such as learned[:5] and the list-shaped user_sessions.json keep working
+- membership is a set lookup, and appending an item that is already there
+  is a no-op; assigning an item that is already elsewhere in the list raises
+  ValueError, so the items stay unique
+- copies and pickles are rebuilt from the items, so the index always
+  matches the list
+- each section gets a compact "meta" map, item -> [first_seen, times_seen,
+  last_reviewed] (epoch seconds, 0 = unknown / never), saved next to the
+  lists; sessions saved before it existed simply start without it
+
+Usage:
+    from espaluz_vocabulary import bind_learning_progress, record_learned, mark_reviewed
+
+    bind_learning_progress(session)   # after creating or loading a session
+    section = session["context"]["learning"]["progress"]["vocabulary"]["spanish"]
+    record_learned(section, "mañana")
+    mark_reviewed(section, "mañana")
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+PROGRESS_KINDS = ("vocabulary", "grammar")
+PROGRESS_LISTS = ("learned", "needs_review")
+
+# Positions in a meta entry
+FIRST_SEEN, TIMES_SEEN, LAST_REVIEWED = range(3)
+
+
+class ProgressList(list):
+    """An insertion-ordered list of unique items with set-speed membership"""
+
+    def __init__(self, iterable: Iterable[str] = ()):
+        # Duplicates from older saves collapse onto their first occurrence
+        super().__init__(dict.fromkeys(iterable))
+        self._members = set(self)
+
+    def __contains__(self, item) -> bool:
+        return item in self._members
+
+    def __reduce__(self):
+        # list's default reduce restores __dict__ (the index) first and then
+        # appends the items, which our append skips as already present
+        return self.__class__, (list(self),)
+
+    def append(self, item):
+        if item not in self._members:
+            super().append(item)
+            self._members.add(item)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def remove(self, item):
+        if item not in self._members:
+            raise ValueError(f"{item!r} not in progress list")
+        super().remove(item)
+        self._members.discard(item)
+
+    def discard(self, item) -> bool:
+        """Remove item if present; only then pays for the list shift"""
+        if item not in self._members:
+            return False
+        self.remove(item)
+        return True
+
+    # The remaining mutators keep the index in step
+
+    def _reindex(self):
+        self._members = set(self)
+
+    def insert(self, index, item):
+        if item not in self._members:
+            super().insert(index, item)
+            self._members.add(item)
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self._members.discard(item)
+        return item
+
+    def clear(self):
+        super().clear()
+        self._members.clear()
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+            others = self._members.difference(self[index])
+            if len(set(value)) != len(value) or not others.isdisjoint(value):
+                raise ValueError("assignment would duplicate items in progress list")
+        elif value in self._members and self[index] != value:
+            raise ValueError(f"{value!r} already in progress list")
+        super().__setitem__(index, value)
+        self._reindex()
+
+    def __imul__(self, n):
+        # Repeating would only duplicate items
+        if n <= 0:
+            self.clear()
+        return self
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._reindex()
+
+
+def bind_progress_section(section: Dict[str, Any]) -> Dict[str, Any]:
+    """Wrap a section's learned / needs_review lists and make sure it has a meta map"""
+    for name in PROGRESS_LISTS:
+        items = section.get(name, [])
+        if not isinstance(items, ProgressList):
+            section[name] = ProgressList(items)
+    section.setdefault("meta", {})
+    return section
+
+
+def bind_learning_progress(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Bind every progress section of a session (sessions without progress are left alone)"""
+    progress = session.get("context", {}).get("learning", {}).get("progress")
+    if not isinstance(progress, dict):
+        return session
+    for kind in PROGRESS_KINDS:
+        for section in progress.get(kind, {}).values():
+            if isinstance(section, dict):
+                bind_progress_section(section)
+    return session
+
+
+def migrate_learning_progress(sessions: Dict[str, Dict[str, Any]]) -> int:
+    """Bind every loaded session; returns how many had progress to bind"""
+    bound = 0
+    for session in sessions.values():
+        if isinstance(session.get("context", {}).get("learning", {}).get("progress"), dict):
+            bind_learning_progress(session)
+            bound += 1
+    return bound
+
+
+def _meta_entry(section: Dict[str, Any], item: str, now: int, is_new: bool) -> List[int]:
+    meta = section.setdefault("meta", {})
+    entry = meta.get(item)
+    if entry is None:
+        entry = meta[item] = [now if is_new else 0, 0, 0]
+    return entry
+
+
+def record_learned(section: Dict[str, Any], item: str, now: Optional[int] = None) -> bool:
+    """Count a sighting of item and add it to "learned"; True if it was new"""
+    now = int(now if now is not None else time.time())
+    learned = section["learned"]
+    is_new = item not in learned
+    if is_new:
+        learned.append(item)
+    _meta_entry(section, item, now, is_new)[TIMES_SEEN] += 1
+    return is_new
+
+
+def mark_reviewed(section: Dict[str, Any], item: str, now: Optional[int] = None) -> bool:
+    """Move item from "needs_review" to "learned"; True if it was due for review"""
+    if not section["needs_review"].discard(item):
+        return False
+    now = int(now if now is not None else time.time())
+    section["learned"].append(item)
+    _meta_entry(section, item, now, False)[LAST_REVIEWED] = now
+    return True
+
+
+def item_stats(section: Dict[str, Any], item: str) -> Optional[Dict[str, int]]:
+    """first_seen / times_seen / last_reviewed of one item, None if never recorded"""
+    entry = section.get("meta", {}).get(item)
+    if entry is None:
+        return None
+    return {"first_seen": entry[FIRST_SEEN], "times_seen": entry[TIMES_SEEN],
+            "last_reviewed": entry[LAST_REVIEWED]}
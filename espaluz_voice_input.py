@@ -0,0 +1,207 @@
+"""
+EspaLuz Voice Input
+===================
+In-memory ingestion of Telegram voice messages for speech-to-text.
+
+Telegram voice notes are already OGG/Opus, which Whisper accepts as-is, so the
+downloaded bytes are uploaded straight from memory - no input_<id>.ogg /
+.mp3 files in the working directory.
+
+Before upload the clip is preprocessed on the CPU (VOICE_PREPROCESS, on by
+default): decoded to 16 kHz mono PCM, run through an energy-based voice
+activity detector that trims leading/trailing silence and shortens long
+internal pauses, then re-encoded to low-bitrate Opus. Users who hold the record
+button through pauses no longer pay (in upload time, Whisper time and billing)
+for every silent second. All of it goes through in-memory ffmpeg pipes.
+VOICE_DOWNSAMPLE=true alone only resamples, without trimming.
+
+Usage:
+    from espaluz_voice_input import transcribe_voice_bytes
+
+    voice_bytes = bot.download_file(file_info.file_path)
+    text = transcribe_voice_bytes(voice_bytes)
+"""
+
+import os
+import math
+import logging
+import subprocess
+from array import array
+from operator import mul
+from typing import List, Optional, Tuple
+
+from espaluz_http import openai_client
+
+VOICE_PREPROCESS = os.getenv("VOICE_PREPROCESS", "true").lower() in ("1", "true", "yes")
+VOICE_DOWNSAMPLE = os.getenv("VOICE_DOWNSAMPLE", "false").lower() in ("1", "true", "yes")
+STT_MODEL = os.getenv("STT_MODEL", "whisper-1")
+# Whisper sample rate - anything above it is wasted upload
+STT_SAMPLE_RATE = 16000
+
+# Voice activity detection
+VAD_FRAME_MS = 30
+# Speech kept around every detected segment so word edges are not clipped
+VAD_PADDING_MS = int(os.getenv("VAD_PADDING_MS", 200))
+# Internal pauses longer than this are shortened to it
+VAD_MAX_PAUSE_MS = int(os.getenv("VAD_MAX_PAUSE_MS", 600))
+# Clips whose loud and quiet frames differ by less than this have no usable
+# silence to cut (continuous speech or continuous noise) and are left alone
+VAD_MIN_DYNAMIC_RANGE_DB = 10.0
+# Below this much detected speech the VAD is not trusted to cut anything - a
+# short "sí" can fall under it - and the clip is uploaded untrimmed
+VAD_MIN_SPEECH_MS = 250
+
+
+def _ffmpeg_pipe(args: List[str], data: bytes) -> Optional[bytes]:
+    try:
+        result = subprocess.run(["ffmpeg", "-v", "error"] + args, input=data, capture_output=True)
+    except OSError as e:
+        logging.error(f"ffmpeg unavailable for voice preprocessing: {e}")
+        return None
+    if result.returncode != 0 or not result.stdout:
+        logging.error(f"ffmpeg voice preprocessing failed: {result.stderr.decode(errors='ignore')[-300:]}")
+        return None
+    return result.stdout
+
+
+def decode_to_pcm(audio: bytes, sample_rate: int = STT_SAMPLE_RATE) -> Optional[bytes]:
+    """Any ffmpeg-readable audio -> mono signed 16-bit little-endian PCM"""
+    return _ffmpeg_pipe(["-i", "pipe:0", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"], audio)
+
+
+def downsample_to_opus(audio: bytes, sample_rate: int = STT_SAMPLE_RATE) -> Optional[bytes]:
+    """Re-encode any ffmpeg-readable audio to mono Opus at sample_rate, pipe to pipe"""
+    return _ffmpeg_pipe([
+        "-i", "pipe:0", "-ac", "1", "-ar", str(sample_rate),
+        "-c:a", "libopus", "-b:a", "24k", "-application", "voip",
+        "-f", "ogg", "pipe:1"
+    ], audio)
+
+
+def encode_pcm_to_opus(pcm: bytes, sample_rate: int = STT_SAMPLE_RATE) -> Optional[bytes]:
+    return _ffmpeg_pipe([
+        "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", "24k", "-application", "voip",
+        "-f", "ogg", "pipe:1"
+    ], pcm)
+
+
+def frame_energies_db(samples: array, frame_len: int) -> List[float]:
+    """Mean power per frame in dBFS"""
+    energies = []
+    for start in range(0, len(samples) - frame_len + 1, frame_len):
+        frame = samples[start:start + frame_len]
+        power = sum(map(mul, frame, frame)) / frame_len
+        energies.append(10 * math.log10(power / (32768.0 * 32768.0)) if power else -120.0)
+    return energies
+
+
+def detect_speech_frames(energies: List[float]) -> Optional[List[bool]]:
+    """
+    Flag speech frames with a threshold adapted to this clip's noise floor.
+    Returns None if the clip has no clear speech/silence contrast.
+    """
+    if not energies:
+        return None
+    ordered = sorted(energies)
+    floor = ordered[int(len(ordered) * 0.1)]
+    peak = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    if peak - floor < VAD_MIN_DYNAMIC_RANGE_DB:
+        return None
+    threshold = floor + max(6.0, 0.3 * (peak - floor))
+    return [energy > threshold for energy in energies]
+
+
+def trim_silence(pcm: bytes, sample_rate: int = STT_SAMPLE_RATE) -> bytes:
+    """
+    Drop leading/trailing silence and shorten internal pauses to VAD_MAX_PAUSE_MS.
+    Returns pcm unchanged if there is nothing safe to cut, including clips with
+    too little detected speech to trust the detector - Whisper decides those.
+    """
+    samples = array("h")
+    samples.frombytes(pcm[:len(pcm) - len(pcm) % 2])
+    frame_len = sample_rate * VAD_FRAME_MS // 1000
+    speech = detect_speech_frames(frame_energies_db(samples, frame_len))
+    if speech is None:
+        return pcm
+    if sum(speech) * VAD_FRAME_MS < VAD_MIN_SPEECH_MS:
+        return pcm
+
+    # Grow every speech frame by the padding so word onsets/tails survive
+    pad = VAD_PADDING_MS // VAD_FRAME_MS
+    keep = [False] * len(speech)
+    for i, is_speech in enumerate(speech):
+        if is_speech:
+            for j in range(max(0, i - pad), min(len(keep), i + pad + 1)):
+                keep[j] = True
+
+    # Shorten internal gaps: keep at most max_pause frames of every silent run
+    max_pause = VAD_MAX_PAUSE_MS // VAD_FRAME_MS
+    first = keep.index(True)
+    last = len(keep) - 1 - keep[::-1].index(True)
+    out = array("h")
+    gap = 0
+    for i in range(first, last + 1):
+        if keep[i]:
+            gap = 0
+        else:
+            gap += 1
+            if gap > max_pause:
+                continue
+        out.extend(samples[i * frame_len:(i + 1) * frame_len])
+    return out.tobytes()
+
+
+def preprocess_voice(audio: bytes, sample_rate: int = STT_SAMPLE_RATE) -> Optional[bytes]:
+    """
+    Decode, VAD-trim and re-encode a voice clip to 16 kHz mono Opus.
+    Returns None if preprocessing failed.
+    """
+    pcm = decode_to_pcm(audio, sample_rate)
+    if pcm is None:
+        return None
+    trimmed = trim_silence(pcm, sample_rate)
+    bytes_per_second = sample_rate * 2
+    before_s = len(pcm) / bytes_per_second
+    after_s = len(trimmed) / bytes_per_second
+    encoded = encode_pcm_to_opus(trimmed, sample_rate)
+    if encoded is None:
+        return None
+    saved = 100 * (1 - after_s / before_s) if before_s else 0
+    print(f"🎙️ Voice trimmed {before_s:.1f}s → {after_s:.1f}s (-{saved:.0f}%), "
+          f"{len(audio) // 1024}KB → {len(encoded) // 1024}KB")
+    return encoded
+
+
+def prepare_voice_for_stt(audio: bytes, filename: str = "voice.ogg") -> Tuple[str, bytes]:
+    """
+    Return the (filename, bytes) pair to upload - preprocessed or downsampled if
+    enabled.
+    """
+    if VOICE_PREPROCESS:
+        processed = preprocess_voice(audio)
+        if processed is not None:
+            return "voice.ogg", processed
+    elif VOICE_DOWNSAMPLE:
+        downsampled = downsample_to_opus(audio)
+        if downsampled:
+            return "voice.ogg", downsampled
+    return filename, audio
+
+
+def transcribe_voice_bytes(audio: bytes, filename: str = "voice.ogg") -> Optional[str]:
+    """Transcribe in-memory audio with Whisper; None if it failed or heard nothing"""
+    if not audio:
+        return None
+    try:
+        upload_name, upload_bytes = prepare_voice_for_stt(audio, filename)
+        transcript = openai_client().audio.transcriptions.create(
+            model=STT_MODEL,
+            # The filename extension is how the API detects the container
+            file=(upload_name, upload_bytes),
+            response_format="text"
+        )
+        return transcript.strip() or None
+    except Exception as e:
+        print(f"❌ Transcription error: {e}")
+        return None
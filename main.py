@@ -8,7 +8,10 @@ from datetime import datetime, timedelta
 from gtts import gTTS
 # Neural TTS for beautiful voices (Microsoft Edge)
 try:
-    from espaluz_neural_tts import generate_voice_sync
+    from espaluz_neural_tts import (
+        generate_voice_sync, generate_voice_bytes_sync, generate_voice_chunks_sync, concat_ogg_bytes
+    )
+    from espaluz_render_plan import ReplyRenderPlan
     NEURAL_TTS_AVAILABLE = True
     print("✓ Neural TTS loaded - beautiful voices enabled!")
 except ImportError:
@@ -21,8 +24,26 @@ from PIL import Image
 import pytesseract
 import io
 import base64
-import math
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from espaluz_session_store import create_session_store
+from espaluz_history import bound_session_history, migrate_session_histories
+from espaluz_vocabulary import bind_learning_progress, migrate_learning_progress, record_learned, mark_reviewed
+from espaluz_translation_cache import translation_cache
+from espaluz_voice_input import transcribe_voice_bytes
+from espaluz_media_queue import media_pool, PRIORITY_VOICE, PRIORITY_VIDEO
+from espaluz_video import loop_library, render_reply_video
+from espaluz_media_workspace import media_workspace, scratch_path, workspace_manager
+from espaluz_lazy_media import LAZY_MEDIA, lazy_media_store, media_callback_data, parse_media_callback
+from espaluz_keywords import KeywordGroups, keyword_engine
+from espaluz_language_id import detect_language, identify_language
+from espaluz_learning_analysis import analyze_exchange, analyze_text
+from espaluz_speech_text import clean_text_for_speech, strip_emojis, strip_markdown_formatting
+from espaluz_http import (
+    http_get, http_post, anthropic_client,
+    ANTHROPIC_MESSAGES_URL, ANTHROPIC_MESSAGE_TIMEOUT, OPENAI_CHAT_URL, OPENAI_TRANSCRIPTIONS_URL, SUPABASE_FUNCTIONS_URL
+)
 
 # === Load environment variables ===
 load_dotenv()
@@ -74,7 +95,7 @@ except ImportError as e:
 try:
     from espaluz_paypal_system import paypal_system, PAYPAL_SUBSCRIPTION_LINK
     from espaluz_demo_mode import demo_mode, detect_demo_emotion
-    from espaluz_conversation_mode import conversation_mode, detect_language, get_opposite_language, get_quick_translate_prompt
+    from espaluz_conversation_mode import conversation_mode, get_opposite_language, get_quick_translate_prompt
     PAYPAL_SYSTEM_AVAILABLE = True
     print("✅ PayPal system and Demo mode loaded successfully!")
 except ImportError as e:
@@ -163,14 +184,11 @@ COUNTRY_KEYWORDS = {
     "paraguay": ["paraguay", "парагвай"]
 }
 
+COUNTRY_GROUPS = KeywordGroups(COUNTRY_KEYWORDS.items())
+
 def detect_country_from_text(text):
     """Detect country from user's message"""
-    text_lower = text.lower()
-    for country, keywords in COUNTRY_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in text_lower:
-                return country
-    return None
+    return COUNTRY_GROUPS.first(keyword_engine.scan(text.lower()))
 
 # Role detection from text
 ROLE_KEYWORDS = {
@@ -183,14 +201,11 @@ ROLE_KEYWORDS = {
     "student": ["student", "estudent", "estudiante", "студент"]
 }
 
+ROLE_GROUPS = KeywordGroups(ROLE_KEYWORDS.items())
+
 def detect_role_from_text(text):
     """Detect user role from message"""
-    text_lower = text.lower()
-    for role, keywords in ROLE_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in text_lower:
-                return role
-    return None
+    return ROLE_GROUPS.first(keyword_engine.scan(text.lower()))
 
 def finish_onboarding(user_id, message, onboarding):
     """Complete onboarding and set up user session"""
@@ -320,6 +335,26 @@ SUPABASE_ANON_KEY = os.environ.get("SUPABASE_ANON_KEY")
 CLAUDE_MODEL = os.environ.get("CLAUDE_MODEL_NAME", "claude-sonnet-4-20250514")
 CLAUDE_API_VERSION = os.environ.get("CLAUDE_API_VERSION", "2023-06-01")
 MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", 10))
+MAX_THINKING_HISTORY = int(os.getenv("MAX_THINKING_HISTORY", 5))
+# Translation runs alongside the Claude request; set to true to make Claude wait
+# for it so the [TRANSLATION] appendix is included in the prompt
+CLAUDE_WAITS_FOR_TRANSLATION = os.getenv("CLAUDE_WAITS_FOR_TRANSLATION", "false").lower() in ("1", "true", "yes")
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", 4))
+# How many distinct user profiles keep a rendered stable system prompt in memory
+STABLE_PROMPT_CACHE_SIZE = int(os.getenv("STABLE_PROMPT_CACHE_SIZE", 512))
+# Stream Claude replies into a placeholder message that is edited as text arrives
+STREAM_CLAUDE_RESPONSES = os.getenv("STREAM_CLAUDE_RESPONSES", "true").lower() in ("1", "true", "yes")
+# Seconds between edits - Telegram throttles edits of the same message to roughly one per second
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", 1.5))
+TELEGRAM_MESSAGE_LIMIT = 4096
+# Avatar replies as a regular "video" or a round Telegram "video_note"
+VIDEO_REPLY_FORMAT = os.getenv("VIDEO_REPLY_FORMAT", "video").lower()
+# Long voice replies are synthesized in chunks of this many characters, concurrently
+VOICE_CHUNK_CHARS = int(os.getenv("VOICE_CHUNK_CHARS", 1500))
+# Send the first chunk as its own voice note as soon as it is ready
+VOICE_SEND_FIRST_CHUNK_EARLY = os.getenv("VOICE_SEND_FIRST_CHUNK_EARLY", "false").lower() in ("1", "true", "yes")
+# Telebot handler workers - espaluz_database sizes its connection pool from the same variable
+TELEBOT_NUM_THREADS = int(os.getenv("TELEBOT_NUM_THREADS", 2))
 
 # === WEBHOOK KILLER THREAD ===
 def webhook_killer_thread():
@@ -335,11 +370,11 @@ def webhook_killer_thread():
             delete_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/deleteWebhook?drop_pending_updates=true"
             info_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getWebhookInfo"
 
-            delete_response = requests.get(delete_url, timeout=30)
+            delete_response = http_get("telegram", delete_url)
             delete_result = delete_response.json()
             print(f"🧹 Webhook deletion result: {delete_result}")
 
-            info_response = requests.get(info_url, timeout=30)
+            info_response = http_get("telegram", info_url)
             webhook_info = info_response.json()
             webhook_url = webhook_info.get('result', {}).get('url', '')
 
@@ -408,66 +443,14 @@ def debug_file_paths():
         print(f"FFmpeg check error: {e}")
     print("====================\n")
 
-def clean_text_for_speech(text: str) -> str:
-    """Remove punctuation marks, formatting AND EMOJIS for natural speech"""
-    # FIRST: Remove ALL emojis (so they're not pronounced!)
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F700-\U0001F77F"  # alchemical symbols
-        "\U0001F780-\U0001F7FF"  # Geometric Shapes Extended
-        "\U0001F800-\U0001F8FF"  # Supplemental Arrows-C
-        "\U0001F900-\U0001F9FF"  # Supplemental Symbols and Pictographs
-        "\U0001FA00-\U0001FA6F"  # Chess Symbols
-        "\U0001FA70-\U0001FAFF"  # Symbols and Pictographs Extended-A
-        "\U00002702-\U000027B0"  # Dingbats
-        "\U000024C2-\U0001F251"  # Enclosed characters
-        "\U0001F1E0-\U0001F1FF"  # Flags
-        "\U00002600-\U000026FF"  # Misc symbols (sun, stars, etc)
-        "\U00002700-\U000027BF"  # Dingbats
-        "\U0000FE00-\U0000FE0F"  # Variation Selectors
-        "\U0001F000-\U0001F02F"  # Mahjong
-        "\U0001F0A0-\U0001F0FF"  # Playing cards
-        "\U00002B50"              # Star
-        "\U00002705"              # Check mark
-        "\U0000274C"              # X mark
-        "\U0001F4A1"              # Lightbulb
-        "\U0001F5E3"              # Speaking head
-        "\U0001F4D6"              # Book
-        "\U0001F30E"              # Globe
-        "\U0001F3AF"              # Target
-        "]+"
-    , re.UNICODE)
-    text = emoji_pattern.sub('', text)
-    
-    # Remove markdown formatting
-    text = re.sub(r'\*+([^*]+)\*+', r'\1', text)  # Remove asterisks
-    text = re.sub(r'_+([^_]+)_+', r'\1', text)    # Remove underscores
-    text = re.sub(r'`+([^`]+)`+', r'\1', text)    # Remove backticks
-    
-    # Remove quotes but keep the content
-    text = re.sub(r'"([^"]+)"', r'\1', text)
-    text = re.sub(r"'([^']+)'", r'\1', text)
-    
-    # Remove numbers in lists (1. 2. etc)
-    text = re.sub(r'^\d+\.\s*', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\n\d+\.\s*', '\n', text)
-    
-    # Remove emoji numbers
-    text = re.sub(r'[0-9]️⃣', '', text)
-    
-    # Remove other common symbols but keep sentence flow
-    text = re.sub(r'[#@\[\](){}<>]', '', text)
-    
-    # Clean up extra whitespace
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
-
 # Call startup checks
 create_test_video()
 debug_file_paths()
+if FFMPEG_AVAILABLE:
+    # Build the stream-copy loop variants once, off the startup path
+    loop_library.prepare_async()
+# Purge media workspaces orphaned by a previous crash, then keep purging
+workspace_manager.start_janitor()
 
 # === SUPABASE INTEGRATION FUNCTIONS ===
 def track_telegram_conversation(user_id, user_message, bot_reply, session_data):
@@ -506,14 +489,16 @@ def track_telegram_conversation(user_id, user_message, bot_reply, session_data):
             "duration_minutes": estimated_duration
         }
         
-        response = requests.post(
-            "https://euyidvolwqmzijkfrplh.supabase.co/functions/v1/submit-progress",
+        response = http_post(
+            "supabase",
+            f"{SUPABASE_FUNCTIONS_URL}/submit-progress",
             json=session_payload,
             headers={
                 "Authorization": f"Bearer {os.environ.get('SUPABASE_ANON_KEY')}",
                 "Content-Type": "application/json"
             },
-            timeout=10
+            timeout=10,
+            idempotent=False
         )
         
         if response.status_code == 200:
@@ -549,14 +534,16 @@ def update_connected_bot_activity(user_id):
             "last_activity": datetime.now().isoformat()
         }
         
-        response = requests.post(
-            "https://euyidvolwqmzijkfrplh.supabase.co/functions/v1/update-bot-activity",
+        response = http_post(
+            "supabase",
+            f"{SUPABASE_FUNCTIONS_URL}/update-bot-activity",
             json=payload,
             headers={
                 "Authorization": f"Bearer {os.environ.get('SUPABASE_ANON_KEY')}",
                 "Content-Type": "application/json"
             },
-            timeout=5
+            timeout=5,
+            idempotent=False
         )
         
         if response.status_code == 200:
@@ -570,50 +557,6 @@ def update_connected_bot_activity(user_id):
 # === TELEBOT SETUP ===
 
 
-# =============================================================================
-# STRIP ASTERISKS FROM AI RESPONSES (Force clean formatting)
-# =============================================================================
-
-def strip_emojis(text: str) -> str:
-    """Remove ALL emojis from text (for TTS so they're not pronounced)"""
-    import re
-    # Comprehensive emoji pattern covering all Unicode emoji ranges
-    emoji_pattern = re.compile(
-        "["
-        "😀-🙏"  # emoticons
-        "🌀-🗿"  # symbols & pictographs
-        "🚀-🛿"  # transport & map symbols
-        "🜀-🝿"  # alchemical symbols
-        "🞀-🟿"  # Geometric Shapes Extended
-        "🠀-🣿"  # Supplemental Arrows-C
-        "🤀-🧿"  # Supplemental Symbols and Pictographs
-        "🨀-🩯"  # Chess Symbols
-        "🩰-🫿"  # Symbols and Pictographs Extended-A
-        "✂-➰"  # Dingbats
-        "Ⓜ-🉑"  # Enclosed characters
-        "🇠-🇿"  # Flags
-        "☀-⛿"  # Misc symbols (sun, stars, etc)
-        "✀-➿"  # Dingbats
-        "︀-️"  # Variation Selectors
-        "🀀-🀯"  # Mahjong
-        "🂠-🃿"  # Playing cards
-        "✅❌💡🗣️📖🌎🎯☕🎓🏖️"  # Common ones we use
-        "]+"
-    , re.UNICODE)
-    return emoji_pattern.sub('', text).strip()
-
-
-def strip_markdown_formatting(text: str) -> str:
-    """Remove **bold** and *italic* markdown from text"""
-    import re
-    # Remove **bold** -> bold
-    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)
-    # Remove *italic* -> italic (but not inside words)
-    text = re.sub(r'(?<![\w])\*([^*]+)\*(?![\w])', r'\1', text)
-    # Remove any remaining double asterisks
-    text = text.replace('**', '')
-    return text
-
 # =============================================================================
 # NEURAL TTS WRAPPER - Use this instead of gTTS directly
 # =============================================================================
@@ -623,7 +566,6 @@ def generate_speech(text: str, lang: str = "es", message_id=None) -> str:
     Returns path to audio file.
     """
     import os
-    temp_path = f"speech_{message_id or hash(text) % 100000}.mp3"
     
     # Try Neural TTS first (beautiful Microsoft voices)
     if NEURAL_TTS_AVAILABLE:
@@ -634,54 +576,57 @@ def generate_speech(text: str, lang: str = "es", message_id=None) -> str:
         except Exception as e:
             print(f"Neural TTS failed, falling back to gTTS: {e}")
     
-    # Fallback to gTTS
+    # Fallback to gTTS - only this path needs a scratch file of our own
+    temp_path = None
     try:
         from gtts import gTTS
+        temp_path = scratch_path(f"speech_{message_id or 'x'}_", "mp3")
         tts = gTTS(text=text, lang=lang, slow=False)
         tts.save(temp_path)
         return temp_path
     except Exception as e:
         print(f"gTTS also failed: {e}")
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
         return None
 
 
-bot = telebot.TeleBot(TELEGRAM_TOKEN)
+bot = telebot.TeleBot(TELEGRAM_TOKEN, num_threads=TELEBOT_NUM_THREADS)
 
 # =============================================================================
 # 💾 PERSISTENT SESSION STORAGE (NEW - Upgrade #3)
 # =============================================================================
 SESSIONS_FILE = "user_sessions.json"
+session_store = create_session_store(SESSIONS_FILE)
 
 def load_persistent_sessions():
     """Load user sessions from persistent storage."""
     try:
-        if os.path.exists(SESSIONS_FILE):
-            with open(SESSIONS_FILE, 'r', encoding='utf-8') as f:
-                sessions = json.load(f)
-                print(f"💾 Loaded {len(sessions)} user sessions from disk")
-                return sessions
+        sessions = session_store.load_all()
+        print(f"💾 Loaded {len(sessions)} user sessions from disk")
+        trimmed = migrate_session_histories(sessions)
+        if trimmed:
+            print(f"💾 Trimmed conversation history for {trimmed} sessions")
+        migrate_learning_progress(sessions)
+        return sessions
     except Exception as e:
         print(f"⚠️ Error loading sessions (starting fresh): {e}")
     return {}
 
+def save_persistent_session(user_id):
+    """Save one user's session - only written if it changed since the last save."""
+    try:
+        session = user_sessions.get(user_id)
+        if session is not None and session_store.save(user_id, session):
+            print(f"💾 Saved session for {user_id}")
+    except Exception as e:
+        print(f"⚠️ Error saving session for {user_id}: {e}")
+
 def save_persistent_sessions():
-    """Save user sessions to persistent storage."""
-    global user_sessions
+    """Save all changed user sessions to persistent storage."""
     try:
-        # Create a serializable copy (remove non-serializable items)
-        serializable_sessions = {}
-        for user_id, session in user_sessions.items():
-            try:
-                # Test if serializable
-                json.dumps(session)
-                serializable_sessions[user_id] = session
-            except (TypeError, ValueError):
-                # Skip non-serializable sessions
-                print(f"⚠️ Session for {user_id} not serializable, skipping")
-        
-        with open(SESSIONS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(serializable_sessions, f, indent=2, ensure_ascii=False)
-        print(f"💾 Saved {len(serializable_sessions)} user sessions to disk")
+        saved = session_store.save_all(dict(user_sessions))
+        print(f"💾 Saved {saved} changed user sessions to disk")
     except Exception as e:
         print(f"⚠️ Error saving sessions: {e}")
 
@@ -691,6 +636,9 @@ def auto_save_sessions():
         time.sleep(300)  # 5 minutes
         try:
             save_persistent_sessions()
+            session_store.compact()
+            if session_store.export_json_if_due():
+                print(f"💾 Exported session snapshot to {SESSIONS_FILE}")
         except Exception as e:
             print(f"⚠️ Auto-save error: {e}")
 
@@ -719,7 +667,7 @@ def poll_subscriptions():
         url = f"https://api.gumroad.com/v2/subscriptions?product_id={GUMROAD_PRODUCT_ID}"
         headers = {"Authorization": f"Bearer {GUMROAD_API_KEY}"}
 
-        res = requests.get(url, headers=headers)
+        res = http_get("gumroad", url, headers=headers)
         if res.status_code != 200:
             print(f"❌ Gumroad error {res.status_code}: {res.text}")
             return
@@ -849,23 +797,24 @@ FAMILY_MEMBERS = {
     }
 }
 
+# Emotion detection keywords
+EMOTION_CUES = {
+    "happy": ["happy", "glad", "joy", "excited", "feliz", "contento", "alegre", "радость", "счастье", "рада", "рад", "!"],
+    "sad": ["sad", "upset", "unhappy", "triste", "грустно", "печально", ":("],
+    "confused": ["confused", "don't understand", "no entiendo", "confundido", "не понимаю", "путаюсь", "confused"],
+    "frustrated": ["frustrated", "annoyed", "molesto", "frustrado", "разочарован", "раздражен"],
+    "curious": ["curious", "wonder", "interesting", "curioso", "interesante", "любопытно", "интересно", "?"]
+}
+EMOTION_CUE_GROUPS = KeywordGroups(EMOTION_CUES.items())
+
 def detect_emotion(text):
     """Simple emotion detection from text"""
-    emotions = {
-        "happy": ["happy", "glad", "joy", "excited", "feliz", "contento", "alegre", "радость", "счастье", "рада", "рад", "!"],
-        "sad": ["sad", "upset", "unhappy", "triste", "грустно", "печально", ":("],
-        "confused": ["confused", "don't understand", "no entiendo", "confundido", "не понимаю", "путаюсь", "confused"],
-        "frustrated": ["frustrated", "annoyed", "molesto", "frustrado", "разочарован", "раздражен"],
-        "curious": ["curious", "wonder", "interesting", "curioso", "interesante", "любопытно", "интересно", "?"]
-    }
-
-    text_lower = text.lower()
+    hits = keyword_engine.scan(text.lower())
     detected = {"curious": 0.2}  # Default low-level curiosity
 
-    for emotion, keywords in emotions.items():
-        for keyword in keywords:
-            if keyword in text_lower:
-                detected[emotion] = detected.get(emotion, 0) + 0.3
+    for emotion, keywords in EMOTION_CUE_GROUPS.matched(hits):
+        for _ in keywords:
+            detected[emotion] = detected.get(emotion, 0) + 0.3
 
     # Find dominant emotion
     dominant = max(detected.items(), key=lambda x: x[1]) if detected else ("neutral", 1.0)
@@ -1005,36 +954,26 @@ def analyze_emotional_context(text, session):
 
     return contextual_emotions
 
+# Language-specific emotional cues, checked in this order
+LANGUAGE_EMOTION_CUES = [
+    # Russian emotional cues
+    ("happy", ["отлично", "класс", "здорово", "супер"]),
+    ("sad", ["грустно", "жаль", "печально"]),
+    ("confused", ["не понимаю", "не ясно", "запутался"]),
+    # Spanish emotional cues
+    ("happy", ["genial", "excelente", "maravilloso", "fantástico"]),
+    ("sad", ["triste", "lástima", "pena"]),
+    ("confused", ["confundido", "no entiendo", "no comprendo"]),
+]
+LANGUAGE_EMOTION_GROUPS = KeywordGroups(LANGUAGE_EMOTION_CUES)
+
 def detect_language_specific_emotions(text):
     """Detect emotions based on language-specific cues"""
-    text_lower = text.lower()
+    hits = keyword_engine.scan(text.lower())
     language_emotions = {"neutral": 0.3}
 
-    # Russian emotional cues
-    russian_happy = ["отлично", "класс", "здорово", "супер"]
-    russian_sad = ["грустно", "жаль", "печально"]
-    russian_confused = ["не понимаю", "не ясно", "запутался"]
-
-    # Spanish emotional cues
-    spanish_happy = ["genial", "excelente", "maravilloso", "fantástico"]
-    spanish_sad = ["triste", "lástima", "pena"]
-    spanish_confused = ["confundido", "no entiendo", "no comprendo"]
-
-    # Check Russian cues
-    if any(cue in text_lower for cue in russian_happy):
-        language_emotions["happy"] = 0.8
-    if any(cue in text_lower for cue in russian_sad):
-        language_emotions["sad"] = 0.8
-    if any(cue in text_lower for cue in russian_confused):
-        language_emotions["confused"] = 0.8
-
-    # Check Spanish cues
-    if any(cue in text_lower for cue in spanish_happy):
-        language_emotions["happy"] = 0.8
-    if any(cue in text_lower for cue in spanish_sad):
-        language_emotions["sad"] = 0.8
-    if any(cue in text_lower for cue in spanish_confused):
-        language_emotions["confused"] = 0.8
+    for emotion, _ in LANGUAGE_EMOTION_GROUPS.matched(hits):
+        language_emotions[emotion] = 0.8
 
     return language_emotions
 
@@ -1198,32 +1137,18 @@ def detect_family_member(user_info, message_text=""):
     # Default to elena if we can't determine
     return "elena"
 
-def identify_language_learning_content(text, family_member):
+def identify_language_learning_content(text, family_member, analysis=None):
     """Extract words or phrases that should be tracked as learning progress"""
+    analysis = analysis or analyze_text(text)
     learned_items = {
-        "spanish_words": [],
+        # Filter to likely Spanish-only words
+        "spanish_words": analysis.marked_spanish_words,
         "english_words": [],
         "needs_review": [],
-        "grammar_points": []
+        # Simple grammar pattern detection
+        "grammar_points": list(analysis.explicit_grammar_points)
     }
 
-    # Spanish word pattern (simple approach)
-    spanish_words = re.findall(r'\b[a-záéíóúñ]{3,}\b', text.lower())
-    english_words = re.findall(r'\b[a-z]{3,}\b', text.lower())
-
-    # Filter to likely Spanish-only words
-    spanish_markers = ['ñ', 'á', 'é', 'í', 'ó', 'ú']
-
-    for word in spanish_words:
-        if any(marker in word for marker in spanish_markers):
-            learned_items["spanish_words"].append(word)
-
-    # Simple grammar pattern detection
-    if "por vs para" in text.lower():
-        learned_items["grammar_points"].append("por_vs_para")
-    elif "ser vs estar" in text.lower():
-        learned_items["grammar_points"].append("ser_vs_estar")
-
     # Limit to recent words based on level
     member_info = FAMILY_MEMBERS.get(family_member, FAMILY_MEMBERS["elena"])
     if member_info["learning_level"] == "beginner":
@@ -1232,57 +1157,24 @@ def identify_language_learning_content(text, family_member):
 
     return learned_items
 
-def enhance_language_learning_detection(text, family_member, session):
+def enhance_language_learning_detection(text, family_member, session, analysis=None):
     """Enhanced detection of language learning content with context awareness"""
+    # One cached analysis of the text serves every step below
+    analysis = analysis or analyze_text(text)
+
     # Start with basic detection
-    basic_items = identify_language_learning_content(text, family_member)
+    basic_items = identify_language_learning_content(text, family_member, analysis)
 
     # Add more sophisticated grammar pattern detection
-    grammar_patterns = {
-        "past_tense": [r'\b(ayer|pasado).+\b(é|aste|ó|amos|aron)\b', r'\b\w+(é|aste|ó|amos|aron)\b'],
-        "future_tense": [r'\b(mañana|futuro).+\b\w+(ré|rás|rá|remos|rán)\b', r'\b\w+(ré|rás|rá|remos|rán)\b'],
-        "subjunctive": [r'\bque \w+(e|es|a|an|emos)\b', r'\bsi \w+(era|ese|ara)\b'],
-        "commands": [r'\b\w+(a|e|ad|ed)(!| ahora| por favor)\b'],
-        "conditional": [r'\b\w+(ría|rías|ría|ríamos|rían)\b']
-    }
-
-    for point, patterns in grammar_patterns.items():
-        for pattern in patterns:
-            if re.search(pattern, text.lower()):
-                basic_items["grammar_points"].append(point)
-                break
+    basic_items["grammar_points"].extend(analysis.grammar_points)
 
     # Detect idioms and expressions
-    spanish_idioms = [
-        "poco a poco", "de vez en cuando", "más o menos", "en seguida", 
-        "hacer caso", "tener ganas", "dar la vuelta", "echar de menos"
-    ]
-
-    for idiom in spanish_idioms:
-        if idiom in text.lower():
-            if "expressions" not in basic_items:
-                basic_items["expressions"] = []
-            basic_items["expressions"].append(idiom)
+    if analysis.expressions:
+        basic_items["expressions"] = list(analysis.expressions)
 
     # Check for vocabulary by topic
-    vocabulary_topics = {
-        "food": ["comida", "comer", "bebida", "beber", "restaurante", "cocina", "plato"],
-        "travel": ["viaje", "viajar", "hotel", "avión", "tren", "reserva", "turista"],
-        "health": ["salud", "médico", "enfermo", "hospital", "dolor", "medicina"],
-        "work": ["trabajo", "oficina", "reunión", "proyecto", "colega", "jefe"],
-        "family": ["familia", "padre", "madre", "hijo", "hija", "hermano", "hermana"],
-        "daily_routines": ["levantarse", "acostarse", "ducharse", "desayunar", "almorzar", "cenar"]
-    }
-
-    text_lower = text.lower()
-    detected_topics = []
-
-    for topic, keywords in vocabulary_topics.items():
-        if any(keyword in text_lower for keyword in keywords):
-            detected_topics.append(topic)
-
-    if detected_topics:
-        basic_items["vocabulary_topics"] = detected_topics
+    if analysis.topics:
+        basic_items["vocabulary_topics"] = list(analysis.topics)
 
     # Detect learning level based on content
     advanced_indicators = len(basic_items.get("expressions", [])) + len(basic_items.get("grammar_points", []))
@@ -1298,11 +1190,14 @@ def enhance_language_learning_detection(text, family_member, session):
 
     # Add review suggestions
     if "learning" in session.get("context", {}) and "progress" in session["context"]["learning"]:
-        # Words used in this interaction to add to mastered list
+        # Words used in this interaction to add to mastered list - the reply's
+        # own words are looked up in the (set-indexed) review list
+        needs_review = session["context"]["learning"]["progress"]["vocabulary"]["spanish"].get("needs_review", [])
         used_words = []
-        for word in session["context"]["learning"]["progress"]["vocabulary"]["spanish"].get("needs_review", []):
-            if word in text_lower:
-                used_words.append(word)
+        if needs_review:
+            for word in analysis.words:
+                if word in needs_review:
+                    used_words.append(word)
 
         if used_words:
             basic_items["mastered_words"] = used_words
@@ -1316,7 +1211,7 @@ def create_initial_session(user_id, user_info, chat_info, message_text=""):
     family_member = detect_family_member(user_info, message_text) 
     member_info = FAMILY_MEMBERS.get(family_member, FAMILY_MEMBERS["elena"])
 
-    return {
+    session = {
         "messages": [],
         "context": {
             "user": {
@@ -1393,6 +1288,7 @@ def create_initial_session(user_id, user_info, chat_info, message_text=""):
             }
         }
     }
+    return bind_learning_progress(bound_session_history(session, str(user_id)))
 
 def assess_message_complexity(message, session):
     """Assess message complexity to determine need for extended thinking"""
@@ -1577,34 +1473,11 @@ IMPORTANT - Personalize for THIS user:
 
     return enhanced_prompt
 
-def format_mcp_request(session, new_message, translated_input=None, use_extended_thinking=None):
-    """Create a properly formatted MCP request with rich context embedded in the system prompt"""
-    # Use enhanced emotion detection
-    emotion_analysis = enhanced_emotion_detection(new_message, session)
-    emotion = emotion_analysis["dominant_emotion"]
-    emotion_confidence = emotion_analysis["confidence"]
-    emotion_data = emotion_analysis["emotion_data"]
-    emotion_progression = emotion_analysis["progression"]
-
-    # Update emotional state in context
-    session["context"]["emotional_state"]["current_emotion"] = emotion
-    session["context"]["emotional_state"]["emotion_confidence"] = emotion_confidence
-    session["context"]["emotional_state"]["emotional_context"] = emotion_data
-    session["context"]["emotional_state"]["emotional_progression"] = emotion_progression
-
-    # Keep track of the last 3 emotions for context
-    session["context"]["emotional_state"]["last_emotions"].append(emotion)
-    if len(session["context"]["emotional_state"]["last_emotions"]) > 3:
-        session["context"]["emotional_state"]["last_emotions"].pop(0)
-
-    # Get emotional calibration
-    emotional_calibration = calibrate_emotional_response(session, emotion, new_message)
-
-    # Get family member info
+def _compose_stable_system_prompt(session):
+    """Everything in the system prompt that only depends on the user's profile"""
     family_role = session["context"]["user"]["preferences"]["family_role"]
-    member_info = FAMILY_MEMBERS.get(family_role, FAMILY_MEMBERS["elena"])
 
-    # Customize system prompt based on family member and emotional state
+    # Customize system prompt based on family member
     system_content = """You are Espaluz, a bilingual emotionally intelligent AI language tutor.
 
 🚫🚫🚫 CRITICAL FORMATTING RULE - MUST FOLLOW 🚫🚫🚫
@@ -1666,6 +1539,98 @@ Provide nuanced language assistance focused on natural conversation, idioms, and
 Use vocabulary appropriate for their level. ALWAYS address them by their actual name, not "Elena".
 """
 
+    # Add country-specific cultural context (based on user's onboarding!)
+    system_content = add_country_cultural_context(system_content, session)
+
+    # Add response format instructions
+    system_content += """
+    Your answer should have TWO PARTS:
+
+    1️⃣ A full, thoughtful bilingual response (using both Spanish and English):
+       - Respond naturally to the message
+       - Be emotionally aware, friendly, and motivating
+       - Include cultural context from the USER'S COUNTRY (not Panama unless they're in Panama!)
+       - Use vocabulary appropriate for the user's level
+       - ALWAYS use the user's actual name from the context!
+
+    2️⃣ A second short block inside [VIDEO SCRIPT START] ... [VIDEO SCRIPT END] for video:
+       - Must be 2 to 4 concise sentences MAX
+       - Use both Spanish and English
+       - ALWAYS use the user's ACTUAL NAME (not Elena!)
+       - Tone: warm, clear, and simple for spoken delivery
+       - It will be spoken by an avatar on video, so make it suitable for audio (not robotic or boring!)
+       - NO EMOJIS in the video script section (they will be pronounced!)
+       
+📝 CRITICAL FORMATTING RULES:
+   - NEVER use asterisks (**bold**) for emphasis - they show as raw asterisks!
+   - Use EMOJIS to structure your response instead:
+     ✅ for correct answers
+     ❌ for errors to fix
+     💡 for tips
+     🗣️ for pronunciation
+     📖 for vocabulary
+     🌎 for cultural notes
+     🎯 for practice suggestions
+   - Keep formatting clean and readable
+   - Use line breaks and spacing for structure
+       - Example:
+
+    [VIDEO SCRIPT START]
+    ¡Hola! Hoy es un gran día para aprender. 
+    Hello! Today is a great day to learn.
+    [VIDEO SCRIPT END]
+    """
+
+    return system_content
+
+@lru_cache(maxsize=STABLE_PROMPT_CACHE_SIZE)
+def _cached_stable_system_prompt(profile_key):
+    user = json.loads(profile_key)
+    return _compose_stable_system_prompt({"context": {"user": user}})
+
+def build_stable_system_prompt(session):
+    """
+    Stable system prompt prefix for prompt caching. It is a pure function of the
+    user's profile, so the bytes are identical from turn to turn and Anthropic can
+    serve it from cache; the rendered text is also memoized per profile.
+    """
+    user = session["context"]["user"]
+    profile_key = json.dumps(
+        {"preferences": user.get("preferences", {}), "first_name": user.get("first_name")},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return _cached_stable_system_prompt(profile_key)
+
+def format_mcp_request(session, new_message, translated_input=None, use_extended_thinking=None):
+    """Create a properly formatted MCP request with rich context embedded in the system prompt"""
+    # Use enhanced emotion detection
+    emotion_analysis = enhanced_emotion_detection(new_message, session)
+    emotion = emotion_analysis["dominant_emotion"]
+    emotion_confidence = emotion_analysis["confidence"]
+    emotion_data = emotion_analysis["emotion_data"]
+    emotion_progression = emotion_analysis["progression"]
+
+    # Update emotional state in context
+    session["context"]["emotional_state"]["current_emotion"] = emotion
+    session["context"]["emotional_state"]["emotion_confidence"] = emotion_confidence
+    session["context"]["emotional_state"]["emotional_context"] = emotion_data
+    session["context"]["emotional_state"]["emotional_progression"] = emotion_progression
+
+    # Keep track of the last 3 emotions for context
+    session["context"]["emotional_state"]["last_emotions"].append(emotion)
+    if len(session["context"]["emotional_state"]["last_emotions"]) > 3:
+        session["context"]["emotional_state"]["last_emotions"].pop(0)
+
+    # Get emotional calibration
+    emotional_calibration = calibrate_emotional_response(session, emotion, new_message)
+
+    # Get family member info
+    family_role = session["context"]["user"]["preferences"]["family_role"]
+    member_info = FAMILY_MEMBERS.get(family_role, FAMILY_MEMBERS["elena"])
+
+    # Stable, cacheable prefix: formatting rules, persona, country context, output format
+    stable_content = build_stable_system_prompt(session)
+
     # =========================================================================
     # 🧠 ENHANCED EMOTIONAL INTELLIGENCE INTEGRATION
     # =========================================================================
@@ -1673,8 +1638,8 @@ Use vocabulary appropriate for their level. ALWAYS address them by their actual
     empathy_phrase = emotion_analysis.get("empathy_phrase", "")
     is_expat_emotion = emotion_analysis.get("is_expat_emotion", False)
     
-    # Build emotionally-aware instruction
-    system_content += f"""
+    # Per-turn segment: emotional state, learning progress and conversation metadata
+    system_content = f"""
 
 🧠 EMOTIONAL INTELLIGENCE ACTIVATED:
 - Detected emotion: {emotion.upper()} (confidence: {emotion_confidence:.2f})
@@ -1951,48 +1916,6 @@ I'll adjust my tone to be: {emotional_calibration.get('response_tone', 'supporti
     conversation_count = session["context"]["conversation"]["message_count"]
     system_content += f"\n\nThis is message #{conversation_count} in this conversation session."
 
-    # Add country-specific cultural context (based on user's onboarding!)
-    system_content = add_country_cultural_context(system_content, session)
-
-    # Add response format instructions
-    system_content += """
-    Your answer should have TWO PARTS:
-
-    1️⃣ A full, thoughtful bilingual response (using both Spanish and English):
-       - Respond naturally to the message
-       - Be emotionally aware, friendly, and motivating
-       - Include cultural context from the USER'S COUNTRY (not Panama unless they're in Panama!)
-       - Use vocabulary appropriate for the user's level
-       - ALWAYS use the user's actual name from the context!
-
-    2️⃣ A second short block inside [VIDEO SCRIPT START] ... [VIDEO SCRIPT END] for video:
-       - Must be 2 to 4 concise sentences MAX
-       - Use both Spanish and English
-       - ALWAYS use the user's ACTUAL NAME (not Elena!)
-       - Tone: warm, clear, and simple for spoken delivery
-       - It will be spoken by an avatar on video, so make it suitable for audio (not robotic or boring!)
-       - NO EMOJIS in the video script section (they will be pronounced!)
-       
-📝 CRITICAL FORMATTING RULES:
-   - NEVER use asterisks (**bold**) for emphasis - they show as raw asterisks!
-   - Use EMOJIS to structure your response instead:
-     ✅ for correct answers
-     ❌ for errors to fix
-     💡 for tips
-     🗣️ for pronunciation
-     📖 for vocabulary
-     🌎 for cultural notes
-     🎯 for practice suggestions
-   - Keep formatting clean and readable
-   - Use line breaks and spacing for structure
-       - Example:
-
-    [VIDEO SCRIPT START]
-    ¡Hola! Hoy es un gran día para aprender. 
-    Hello! Today is a great day to learn.
-    [VIDEO SCRIPT END]
-    """
-
     # Today's date for context
     system_content += f"\n\nToday is {datetime.now().strftime('%Y-%m-%d')}."
 
@@ -2017,7 +1940,12 @@ I'll adjust my tone to be: {emotional_calibration.get('response_tone', 'supporti
     request = {
         "model": CLAUDE_MODEL,
         "messages": messages,
-        "system": system_content,
+        "system": [
+            # Only the stable prefix is marked for caching - the per-turn segment
+            # after it changes every message
+            {"type": "text", "text": stable_content, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": system_content}
+        ],
         "max_tokens": 1000,
         "temperature": 0.7,
     }
@@ -2035,28 +1963,24 @@ I'll adjust my tone to be: {emotional_calibration.get('response_tone', 'supporti
 
 def update_session_learning(session, learned_items):
     """Update the session with newly learned items and track progress"""
+    progress = session["context"]["learning"]["progress"]
+
     if 'spanish_words' in learned_items:
         for word in learned_items['spanish_words']:
-            if word not in session["context"]["learning"]["progress"]["vocabulary"]["spanish"]["learned"]:
-                session["context"]["learning"]["progress"]["vocabulary"]["spanish"]["learned"].append(word)
+            record_learned(progress["vocabulary"]["spanish"], word)
 
     if 'english_words' in learned_items:
         for word in learned_items['english_words']:
-            if word not in session["context"]["learning"]["progress"]["vocabulary"]["english"]["learned"]:
-                session["context"]["learning"]["progress"]["vocabulary"]["english"]["learned"].append(word)
+            record_learned(progress["vocabulary"]["english"], word)
 
     if 'grammar_points' in learned_items:
         for point in learned_items['grammar_points']:
-            if point not in session["context"]["learning"]["progress"]["grammar"]["spanish"]["learned"]:
-                session["context"]["learning"]["progress"]["grammar"]["spanish"]["learned"].append(point)
+            record_learned(progress["grammar"]["spanish"], point)
 
     # Handle mastered words - move from needs_review to learned
     if 'mastered_words' in learned_items:
         for word in learned_items['mastered_words']:
-            if word in session["context"]["learning"]["progress"]["vocabulary"]["spanish"]["needs_review"]:
-                session["context"]["learning"]["progress"]["vocabulary"]["spanish"]["needs_review"].remove(word)
-                if word not in session["context"]["learning"]["progress"]["vocabulary"]["spanish"]["learned"]:
-                    session["context"]["learning"]["progress"]["vocabulary"]["spanish"]["learned"].append(word)
+            mark_reviewed(progress["vocabulary"]["spanish"], word)
 
     # Update learning path if new level detected
     if 'detected_level' in learned_items:
@@ -2079,14 +2003,16 @@ def post_progress_to_supabase(user_id, payload):
     return
     try:
         print(f"📡 Sending progress data to Supabase for user {user_id}...")
-        response = requests.post(
-            "https://euyidvolwqmzijkfrplh.supabase.co/functions/v1/submit-progress",
+        response = http_post(
+            "supabase",
+            f"{SUPABASE_FUNCTIONS_URL}/submit-progress",
             json=payload,
             headers={
                 "Authorization": f"Bearer {os.environ.get('SUPABASE_ANON_KEY')}",
                 "Content-Type": "application/json"
             },
-            timeout=15
+            timeout=15,
+            idempotent=False
         )
         if response.status_code == 200:
             print(f"✅ Supabase confirmed progress post for user {user_id}")
@@ -2095,7 +2021,7 @@ def post_progress_to_supabase(user_id, payload):
     except Exception as e:
         print(f"❌ Error posting to Supabase: {e}")
 
-def adapt_learning_path(session, user_input, response):
+def adapt_learning_path(session, user_input, response, analysis=None):
     """Dynamically adapt learning path based on user progress and interactions"""
     # Get family member profile
     family_role = session["context"]["user"]["preferences"]["family_role"]
@@ -2105,10 +2031,10 @@ def adapt_learning_path(session, user_input, response):
     vocabulary_size = len(session["context"]["learning"]["progress"]["vocabulary"]["spanish"]["learned"])
     grammar_points = len(session["context"]["learning"]["progress"]["grammar"]["spanish"]["learned"])
 
-    # Analyze current interaction
-    learned_items = enhance_language_learning_detection(response, family_role, session)
-    success_indicators = detect_success_indicators(user_input, response)
-    struggle_indicators = detect_struggle_indicators(user_input, response)
+    # Analyze current interaction - the caller's analysis when it has one
+    analysis = analysis or analyze_exchange(user_input, response)
+    success_indicators = detect_success_indicators(user_input, response, analysis)
+    struggle_indicators = detect_struggle_indicators(user_input, response, analysis)
 
     # Initialize learning path adjustments
     if "learning_path" not in session["context"]["learning"]:
@@ -2174,8 +2100,9 @@ def downgrade_level(current_level):
         return "beginner"
     return current_level
 
-def detect_success_indicators(user_input, response):
+def detect_success_indicators(user_input, response, analysis=None):
     """Detect indicators of learning success"""
+    user = (analysis or analyze_exchange(user_input, response)).user
     success = {
         "overall": 0.5,
         "vocabulary": 0.5,
@@ -2184,25 +2111,19 @@ def detect_success_indicators(user_input, response):
     }
 
     # Look for success phrases in user message
-    success_phrases = [
-        "entiendo", "entendí", "comprendo", "now i get it", "ahora entiendo",
-        "gracias", "спасибо", "thank you", "that helps", "that's clear"
-    ]
-
-    if any(phrase in user_input.lower() for phrase in success_phrases):
+    if user.has("success"):
         success["overall"] += 0.3
         success["comprehension"] += 0.4
 
     # Check for correct vocabulary usage
-    spanish_words_used = re.findall(r'\b[a-záéíóúñ]{3,}\b', user_input.lower())
-    if len(spanish_words_used) > 3:
+    if len(user.spanish_words) > 3:
         success["vocabulary"] += 0.3
 
     # Check for complex grammar usage
-    if "por" in user_input.lower() and "para" in user_input.lower():
+    if "por" in user.text_lower and "para" in user.text_lower:
         success["grammar"] += 0.2
 
-    if "ser" in user_input.lower() or "estar" in user_input.lower():
+    if "ser" in user.text_lower or "estar" in user.text_lower:
         success["grammar"] += 0.2
 
     # Normalize values to 0-1 range
@@ -2211,8 +2132,9 @@ def detect_success_indicators(user_input, response):
 
     return success
 
-def detect_struggle_indicators(user_input, response):
+def detect_struggle_indicators(user_input, response, analysis=None):
     """Detect indicators of learning struggles"""
+    user = (analysis or analyze_exchange(user_input, response)).user
     struggle = {
         "overall": 0.2,  # Start with low struggle assumption
         "vocabulary": 0.2,
@@ -2221,12 +2143,7 @@ def detect_struggle_indicators(user_input, response):
     }
 
     # Look for struggle phrases in user message
-    struggle_phrases = [
-        "no entiendo", "don't understand", "confused", "i don't get", "не понимаю",
-        "difficult", "difícil", "hard", "help", "ayuda", "помоги"
-    ]
-
-    if any(phrase in user_input.lower() for phrase in struggle_phrases):
+    if user.has("struggle"):
         struggle["overall"] += 0.4
         struggle["comprehension"] += 0.5
 
@@ -2239,12 +2156,10 @@ def detect_struggle_indicators(user_input, response):
         struggle["overall"] += 0.2
 
     # Specific struggle areas
-    vocab_struggle = ["what does", "que significa", "mean", "significado", "что значит"]
-    if any(phrase in user_input.lower() for phrase in vocab_struggle):
+    if user.has("vocabulary_struggle"):
         struggle["vocabulary"] += 0.6
 
-    grammar_struggle = ["conjugate", "conjugar", "tense", "tiempo", "form", "forma"]
-    if any(phrase in user_input.lower() for phrase in grammar_struggle):
+    if user.has("grammar_struggle"):
         struggle["grammar"] += 0.6
 
     # Normalize values to 0-1 range
@@ -2330,15 +2245,25 @@ def suggest_next_topics(session, adjustments):
     return topics[:3]
 
 # === TRANSLATION & AI HANDLERS ===
+# Models behind the two translation helpers - part of the translation cache key
+ES_EN_TRANSLATE_MODEL = "gpt-3.5-turbo"
+CONVO_TRANSLATE_MODEL = "claude-sonnet-4-20250514"
+
 def translate_to_es_en(text):
-    """Translate the input text to both Spanish and English"""
+    """Translate the input text to both Spanish and English (cached per normalized phrase)"""
+    return translation_cache.get_or_compute(
+        text, "auto", "es+en", ES_EN_TRANSLATE_MODEL,
+        lambda: _request_es_en_translation(text)
+    )
+
+def _request_es_en_translation(text):
     headers = {"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"}
     data = {
-        "model": "gpt-3.5-turbo",
+        "model": ES_EN_TRANSLATE_MODEL,
         "messages": [{"role": "user", "content": f"Translate this message into both Spanish and English:\n\n{text}"}]
     }
     try:
-        res = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=data, timeout=30)
+        res = http_post("openai", OPENAI_CHAT_URL, headers=headers, json=data, timeout=(10, 30))
         res_json = res.json()
         
         # Check for API errors
@@ -2360,8 +2285,84 @@ def translate_to_es_en(text):
     except Exception as e:
         print(f"Translation error: {e}")
         return None  # Return None, let caller handle gracefully
-def ask_claude_with_mcp(session, translated_input):
-    """Use Claude API with fallback to GPT-4, both formatted for bilingual response and video script."""
+
+# Prompt caching totals across all Claude tutor calls (input tokens by source)
+prompt_cache_stats = {
+    "requests": 0,
+    "cache_hits": 0,
+    "input_tokens": 0,
+    "cache_read_input_tokens": 0,
+    "cache_creation_input_tokens": 0,
+    "output_tokens": 0
+}
+prompt_cache_stats_lock = threading.Lock()
+
+def record_prompt_cache_usage(usage):
+    """Add a Messages API usage block to prompt_cache_stats"""
+    if not usage:
+        return
+    with prompt_cache_stats_lock:
+        prompt_cache_stats["requests"] += 1
+        for key in ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens", "output_tokens"):
+            prompt_cache_stats[key] += usage.get(key) or 0
+        if usage.get("cache_read_input_tokens"):
+            prompt_cache_stats["cache_hits"] += 1
+    print(f"🧊 Prompt cache: read={usage.get('cache_read_input_tokens') or 0} "
+          f"written={usage.get('cache_creation_input_tokens') or 0} "
+          f"uncached={usage.get('input_tokens') or 0}")
+
+def stream_claude_response(mcp_request, headers, on_text):
+    """
+    Call the Messages API with stream=true and hand each text delta to on_text
+    as it arrives. Returns (full_text, thinking_text, usage).
+    """
+    payload = dict(mcp_request, stream=True)
+    text_parts = []
+    thinking_parts = []
+    usage = {}
+
+    with http_post("anthropic", ANTHROPIC_MESSAGES_URL,
+                   headers=headers,
+                   json=payload,
+                   stream=True) as stream_res:
+        if stream_res.status_code != 200:
+            raise Exception(f"Claude stream failed with status {stream_res.status_code}: {stream_res.text}")
+
+        # SSE is always UTF-8; without a declared charset requests would guess
+        # ISO-8859-1 and garble accents and Cyrillic
+        stream_res.encoding = "utf-8"
+        for line in stream_res.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            event = json.loads(line[5:].strip())
+            event_type = event.get("type")
+
+            if event_type == "content_block_delta":
+                delta = event.get("delta", {})
+                if delta.get("type") == "text_delta":
+                    text_parts.append(delta.get("text", ""))
+                    on_text(text_parts[-1])
+                elif delta.get("type") == "thinking_delta":
+                    thinking_parts.append(delta.get("thinking", ""))
+            elif event_type == "message_start":
+                usage.update(event.get("message", {}).get("usage", {}))
+            elif event_type == "message_delta":
+                usage.update(event.get("usage", {}))
+            elif event_type == "error":
+                raise Exception(f"Claude stream error: {event.get('error')}")
+            elif event_type == "message_stop":
+                break
+
+    full_text = "".join(text_parts)
+    if not full_text.strip():
+        raise Exception("Claude stream returned no text")
+    return full_text, "".join(thinking_parts), usage
+
+def ask_claude_with_mcp(session, translated_input, on_text=None):
+    """
+    Use Claude API with fallback to GPT-4, both formatted for bilingual response and video script.
+    If on_text is given the reply is streamed and on_text receives each new piece of text.
+    """
 
     user_message = session["messages"][-1]["content"] if session["messages"] else ""
     should_use_extended = is_complex_language_topic(user_message)
@@ -2380,24 +2381,35 @@ def ask_claude_with_mcp(session, translated_input):
     }
 
     try:
-        res = requests.post("https://api.anthropic.com/v1/messages",
+        if on_text:
+            full_reply, thinking_process, usage = stream_claude_response(mcp_request, headers, on_text)
+        else:
+            # Not streamed: nothing arrives until the reply (and any extended
+            # thinking) is complete, so the streaming read timeout is too short
+            res = http_post("anthropic", ANTHROPIC_MESSAGES_URL,
                             headers=headers,
-                            json=mcp_request)
+                            json=mcp_request,
+                            timeout=ANTHROPIC_MESSAGE_TIMEOUT)
 
-        if res.status_code != 200:
-            raise Exception(f"Claude failed with status {res.status_code}: {res.text}")
+            if res.status_code != 200:
+                raise Exception(f"Claude failed with status {res.status_code}: {res.text}")
+
+            result = res.json()
+            thinking_process = result.get("thinking", "")
+            full_reply = result["content"][0]["text"]
+            usage = result.get("usage")
+
+        record_prompt_cache_usage(usage)
 
-        result = res.json()
-        thinking_process = ""
-        if "thinking" in result:
-            thinking_process = result["thinking"]
+        if thinking_process:
             session.setdefault("extended_thinking_history", []).append({
                 "query": user_message,
                 "thinking": thinking_process,
                 "timestamp": datetime.now().isoformat()
             })
+            # Only the most recent thinking traces are worth keeping per session
+            del session["extended_thinking_history"][:-MAX_THINKING_HISTORY]
 
-        full_reply = result["content"][0]["text"]
         short_text = extract_video_script(full_reply)
 
         return full_reply.strip(), short_text.strip(), thinking_process
@@ -2450,9 +2462,9 @@ NO emojis in the video script - they will be pronounced!
                 "Content-Type": "application/json"
             }
 
-            gpt_res = requests.post("https://api.openai.com/v1/chat/completions",
-                                    headers=gpt_headers,
-                                    json=gpt_payload)
+            gpt_res = http_post("openai", OPENAI_CHAT_URL,
+                                headers=gpt_headers,
+                                json=gpt_payload)
 
             print(f"GPT-4 fallback status: {gpt_res.status_code}")
             print(f"GPT-4 fallback raw: {gpt_res.text}")
@@ -2475,8 +2487,9 @@ def transcribe_voice(file_path):
     """Transcribe voice message to text"""
     try:
         with open(file_path, "rb") as f:
-            res = requests.post(
-                "https://api.openai.com/v1/audio/transcriptions",
+            res = http_post(
+                "openai",
+                OPENAI_TRANSCRIPTIONS_URL,
                 headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
                 files={"file": f},
                 data={"model": "whisper-1"}
@@ -2512,240 +2525,186 @@ def generate_video_with_audio(chat_id, text_content, max_duration=30):
     """Generate a video with audio that meets requirements (up to 30s, with voice)"""
     print(f"Generating proper video with text: {text_content[:50]}...")
 
-    # Create unique filenames to avoid conflicts
-    timestamp = int(time.time())
-    audio_file = f"video_audio_{timestamp}.mp3"
-    output_video = f"final_video_{timestamp}.mp4"
-    base_video = "espaluz_loop.mp4"
-
     try:
-        # 1. Create audio file with full text content
-        print("Generating audio for video...")
-        tts = gTTS(text=text_content, lang="es", slow=False)
-        tts.save(audio_file)
+        # Private workspace per job, removed on exit
+        with media_workspace("video") as ws:
+            audio_file = ws.path("video_audio.mp3")
+            output_video = ws.path("final_video.mp4")
 
-        if not os.path.exists(audio_file):
-            print(f"Failed to create audio file: {audio_file}")
-            return False
+            # 1. Create audio file with full text content
+            print("Generating audio for video...")
+            tts = gTTS(text=text_content, lang="es", slow=False)
+            tts.save(audio_file)
 
-        # 2. Get audio duration
-        audio_duration_cmd = [
-            "ffprobe", 
-            "-v", "error", 
-            "-show_entries", "format=duration", 
-            "-of", "default=noprint_wrappers=1:nokey=1", 
-            audio_file
-        ]
-
-        process = subprocess.run(audio_duration_cmd, capture_output=True, text=True)
-        if process.returncode != 0:
-            print(f"Error getting audio duration: {process.stderr}")
-            audio_duration = 5  # Default fallback
-        else:
-            try:
-                audio_duration = float(process.stdout.strip())
-                print(f"Audio duration: {audio_duration} seconds")
-            except:
-                print(f"Could not parse audio duration: {process.stdout}")
-                audio_duration = 5  # Default fallback
-
-        # 3. Calculate how many loops we need to match audio duration (up to max_duration)
-        actual_duration = min(audio_duration, max_duration)
-        base_video_info_cmd = [
-            "ffprobe", 
-            "-v", "error", 
-            "-show_entries", "format=duration", 
-            "-of", "default=noprint_wrappers=1:nokey=1", 
-            base_video
-        ]
-
-        process = subprocess.run(base_video_info_cmd, capture_output=True, text=True)
-        if process.returncode != 0 or not process.stdout.strip():
-            print(f"Error getting base video duration: {process.stderr}")
-            base_video_duration = 6  # Default assumption
-        else:
-            try:
-                base_video_duration = float(process.stdout.strip())
-            except:
-                base_video_duration = 6  # Default assumption
-
-        # Calculate loop count needed to cover the audio duration
-        loop_count = math.ceil(actual_duration / base_video_duration)
-        loop_count = max(1, min(loop_count, 5))  # Between 1 and 5 loops
-
-        print(f"Using {loop_count} loops of base video (each {base_video_duration}s) to cover {actual_duration}s audio")
-
-        # 4. Create a file with the loop instructions
-        loop_file = f"loop_{timestamp}.txt"
-        with open(loop_file, "w") as f:
-            for _ in range(loop_count):
-                f.write(f"file '{base_video}'\n")
-
-        # 5. Create looped video
-        loop_output = f"loop_{timestamp}.mp4"
-        loop_cmd = [
-            "ffmpeg", "-y",
-            "-f", "concat",
-            "-safe", "0",
-            "-i", loop_file,
-            "-c", "copy",
-            loop_output
-        ]
-
-        print(f"Creating looped video with command: {' '.join(loop_cmd)}")
-        process = subprocess.run(loop_cmd, capture_output=True, text=True)
-
-        if process.returncode != 0 or not os.path.exists(loop_output):
-            print(f"Error creating looped video: {process.stderr}")
-            # Try simpler approach - just use base video directly
-            loop_output = base_video
-
-        # 6. Combine video with audio
-        final_cmd = [
-            "ffmpeg", "-y",
-            "-i", loop_output,
-            "-i", audio_file,
-            "-map", "0:v:0",
-            "-map", "1:a:0",
-            "-c:v", "copy",
-            "-c:a", "aac",
-            "-shortest",
-            output_video
-        ]
-
-        print(f"Creating final video with command: {' '.join(final_cmd)}")
-        process = subprocess.run(final_cmd, capture_output=True, text=True)
-
-        if process.returncode != 0:
-            print(f"Error creating final video: {process.stderr}")
-            return False
+            if not os.path.exists(audio_file):
+                print(f"Failed to create audio file: {audio_file}")
+                return False
 
-        if not os.path.exists(output_video) or os.path.getsize(output_video) < 1000:
-            print(f"Output video file is too small or doesn't exist: {output_video}")
-            return False
+            # 2. Mux onto the precomputed loop - the avatar video is stream-copied
+            if not render_reply_video(audio_file, output_video, max_duration=max_duration):
+                print(f"Output video file is too small or doesn't exist: {output_video}")
+                return False
 
-        # 7. Send the video
-        with open(output_video, "rb") as video_file:
-            bot.send_video(chat_id, video_file)
+            # 3. Send the video
+            with open(output_video, "rb") as video_file:
+                bot.send_video(chat_id, video_file)
 
         print("Video sent successfully!")
-
-        # Clean up
-        try:
-            for file in [audio_file, loop_file, loop_output, output_video]:
-                if file != base_video and os.path.exists(file):
-                    os.remove(file)
-        except Exception as e:
-            print(f"Cleanup error: {e}")
-
         return True
 
     except Exception as e:
         print(f"Video generation error: {e}")
         return False
 
+# Sentence boundaries where an over-long paragraph is split
+VOICE_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
+def voice_chunk_units(para, max_chunk_size):
+    """Pieces of a paragraph no longer than max_chunk_size: itself, its sentences, or their words"""
+    if len(para) <= max_chunk_size:
+        return [para]
+    units = []
+    for sentence in VOICE_SENTENCE_END.split(para):
+        units.extend([sentence] if len(sentence) <= max_chunk_size else sentence.split())
+    return units
+
+def split_voice_chunks(full_text, max_chunk_size=VOICE_CHUNK_CHARS):
+    """
+    Split text by paragraphs into chunks of at most max_chunk_size characters.
+    Paragraphs longer than that - and text already flattened by
+    clean_text_for_speech, which has no paragraph breaks left - are split at
+    sentence ends, and sentences longer than that at whitespace. Only a single
+    word longer than max_chunk_size ends up in a larger chunk.
+    """
+    if len(full_text) <= max_chunk_size:
+        return [full_text]
+
+    # Split by paragraphs (or sentences, or words) and combine until we reach chunk size
+    chunks = []
+    current_chunk = ""
+
+    for para in full_text.split('\n\n'):
+        for i, unit in enumerate(voice_chunk_units(para, max_chunk_size)):
+            separator = "\n\n" if i == 0 else " "
+            if current_chunk and len(current_chunk) + len(separator) + len(unit) <= max_chunk_size:
+                current_chunk += separator + unit
+            else:
+                if current_chunk:
+                    chunks.append(current_chunk)
+                current_chunk = unit
+
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
 def create_full_voice_message(chat_id, full_text):
-    """Create a voice message with the complete text response"""
+    """Create a voice message with the complete text response; returns the (last) sent message"""
     print(f"Creating full voice message, text length: {len(full_text)} characters")
 
-    # Create a unique filename
-    timestamp = int(time.time())
-    voice_file = f"full_voice_{timestamp}.mp3"
-
     try:
-        # Split text into chunks to handle very long responses
-        max_chunk_size = 1500  # Characters per chunk
-        chunks = []
+        chunks = split_voice_chunks(full_text)
+        print(f"Split text into {len(chunks)} chunks")
 
-        if len(full_text) <= max_chunk_size:
-            chunks = [full_text]
-        else:
-            # Split by paragraphs and combine until we reach chunk size
-            paragraphs = full_text.split('\n\n')
-            current_chunk = ""
+        if NEURAL_TTS_AVAILABLE:
+            return send_chunked_neural_voice(chat_id, chunks)
 
-            for para in paragraphs:
-                if len(current_chunk) + len(para) + 2 <= max_chunk_size:
-                    if current_chunk:
-                        current_chunk += "\n\n" + para
-                    else:
-                        current_chunk = para
-                else:
-                    if current_chunk:
-                        chunks.append(current_chunk)
-                    current_chunk = para
+        # Chunks, concat list and output live in a private workspace removed on exit
+        with media_workspace("voice") as ws:
+            voice_file = ws.path("full_voice.mp3")
 
-            if current_chunk:
-                chunks.append(current_chunk)
+            # Process each chunk
+            chunk_files = []
+            for i, chunk in enumerate(chunks):
+                chunk_file = ws.path(f"chunk_{i}.mp3")
+                try:
+                    tts = gTTS(text=chunk, lang="es", slow=False)
+                    tts.save(chunk_file)
 
-        print(f"Split text into {len(chunks)} chunks")
+                    if os.path.exists(chunk_file) and os.path.getsize(chunk_file) > 100:
+                        chunk_files.append(chunk_file)
+                    else:
+                        print(f"Failed to create voice chunk {i}")
+                except Exception as e:
+                    print(f"Error generating voice chunk {i}: {e}")
+
+            # If we have multiple chunks, combine them
+            if len(chunk_files) > 1:
+                # Create a file list for ffmpeg
+                concat_file = ws.path("concat.txt")
+                with open(concat_file, "w") as f:
+                    for chunk_file in chunk_files:
+                        f.write(f"file '{chunk_file}'\n")
+
+                # Combine audio files
+                combine_cmd = [
+                    "ffmpeg", "-y",
+                    "-f", "concat",
+                    "-safe", "0",
+                    "-i", concat_file,
+                    "-c", "copy",
+                    voice_file
+                ]
 
-        # Process each chunk
-        chunk_files = []
-        for i, chunk in enumerate(chunks):
-            chunk_file = f"chunk_{timestamp}_{i}.mp3"
-            try:
-                tts = gTTS(text=chunk, lang="es", slow=False)
-                tts.save(chunk_file)
+                subprocess.run(combine_cmd, capture_output=True)
 
-                if os.path.exists(chunk_file) and os.path.getsize(chunk_file) > 100:
-                    chunk_files.append(chunk_file)
-                else:
-                    print(f"Failed to create voice chunk {i}")
-            except Exception as e:
-                print(f"Error generating voice chunk {i}: {e}")
-
-        # If we have multiple chunks, combine them
-        if len(chunk_files) > 1:
-            # Create a file list for ffmpeg
-            concat_file = f"concat_{timestamp}.txt"
-            with open(concat_file, "w") as f:
-                for chunk_file in chunk_files:
-                    f.write(f"file '{chunk_file}'\n")
-
-            # Combine audio files
-            combine_cmd = [
-                "ffmpeg", "-y",
-                "-f", "concat",
-                "-safe", "0",
-                "-i", concat_file,
-                "-c", "copy",
-                voice_file
-            ]
-
-            subprocess.run(combine_cmd, capture_output=True)
-
-            # Check if combined file exists
-            if not os.path.exists(voice_file) or os.path.getsize(voice_file) < 100:
-                print("Failed to combine audio chunks. Using first chunk.")
+                # Check if combined file exists
+                if not os.path.exists(voice_file) or os.path.getsize(voice_file) < 100:
+                    print("Failed to combine audio chunks. Using first chunk.")
+                    voice_file = chunk_files[0]
+            elif len(chunk_files) == 1:
+                # Just use the single chunk
                 voice_file = chunk_files[0]
-        elif len(chunk_files) == 1:
-            # Just use the single chunk
-            voice_file = chunk_files[0]
-        else:
-            print("No voice chunks were created successfully")
-            return False
+            else:
+                print("No voice chunks were created successfully")
+                return False
 
-        # Send the voice message
-        with open(voice_file, "rb") as voice:
-            bot.send_voice(chat_id, voice)
+            # Send the voice message
+            with open(voice_file, "rb") as voice:
+                message = bot.send_voice(chat_id, voice)
 
         print("Full voice message sent successfully")
-
-        # Clean up
-        try:
-            for file in chunk_files + [concat_file] if len(chunk_files) > 1 else chunk_files:
-                if os.path.exists(file):
-                    os.remove(file)
-        except Exception as e:
-            print(f"Voice cleanup error: {e}")
-
-        return True
+        return message
 
     except Exception as e:
         print(f"Full voice generation error: {e}")
         return False
 
+def send_chunked_neural_voice(chat_id, chunks, lang="es"):
+    """
+    Synthesize all chunks concurrently with neural TTS and send them joined in
+    order. With VOICE_SEND_FIRST_CHUNK_EARLY the first chunk goes out as its own
+    voice note as soon as it is ready and the rest follows as a second note.
+    Returns the last voice message sent.
+    """
+    started = time.time()
+    sent_first = []
+
+    def send_first(audio):
+        sent_first.append(bot.send_voice(chat_id, audio))
+        print(f"🎧 First voice chunk sent after {time.time() - started:.1f}s")
+
+    early = VOICE_SEND_FIRST_CHUNK_EARLY and len(chunks) > 1
+    parts = generate_voice_chunks_sync(chunks, lang=lang, style="tutor",
+                                       on_first_chunk=send_first if early else None)
+    if not any(parts):
+        print("No voice chunks were created successfully")
+        return False
+
+    message = sent_first[0] if sent_first else None
+    remaining = parts[1:] if sent_first else parts
+    if any(remaining):
+        voice = concat_ogg_bytes(remaining)
+        if voice is None:
+            print("Failed to combine audio chunks. Sending them one by one.")
+            for part in remaining:
+                if part:
+                    message = bot.send_voice(chat_id, part)
+        else:
+            message = bot.send_voice(chat_id, voice)
+
+    print(f"Full voice message sent successfully ({len(chunks)} chunks in {time.time() - started:.1f}s)")
+    return message
+
 def extract_video_script(full_response):
     """Extract the video script portion from Claude's response more reliably"""
     # Look for the video script section
@@ -2823,7 +2782,68 @@ def full_tts_for_voice(text, output_file):
 import re
 from gtts import gTTS
 
+VIDEO_SCRIPT_BLOCK = re.compile(r"\[VIDEO SCRIPT START\](.*?)\[VIDEO SCRIPT END\]", re.DOTALL)
+
+def send_avatar_video(chat_id, audio_path, output_video):
+    """Mux audio onto the precomputed avatar loop (video stream-copied) and send it; returns the sent message"""
+    as_video_note = VIDEO_REPLY_FORMAT == "video_note"
+
+    print("🎬 Muxing audio onto precomputed avatar loop...")
+    if not render_reply_video(audio_path, output_video, video_note=as_video_note):
+        return False
+
+    with open(output_video, "rb") as video_file:
+        if as_video_note:
+            message = bot.send_video_note(chat_id, video_file)
+        else:
+            message = bot.send_video(chat_id, video_file)
+        print("📤 Video sent successfully!")
+    return message
+
+def build_reply_render_plan(full_reply, short_reply=None):
+    """
+    Spoken segments of a reply: the video script and everything around it.
+    The video uses "script"; the voice note is "script" + "rest", so the
+    script is synthesized once for both. short_reply is the script already
+    extracted by ask_claude_with_mcp. Long segments are synthesized in
+    split_voice_chunks chunks, concurrently.
+    """
+    match = VIDEO_SCRIPT_BLOCK.search(full_reply)
+    if match:
+        script = clean_text_for_speech(short_reply or match.group(1).strip())
+        rest = clean_text_for_speech(VIDEO_SCRIPT_BLOCK.sub(" ", full_reply))
+    else:
+        script = ""
+        rest = clean_text_for_speech(full_reply)
+    return ReplyRenderPlan([("script", script), ("rest", rest)], lang="es", style="tutor",
+                           splitter=split_voice_chunks)
+
+def send_plan_video(chat_id, plan):
+    """Avatar video whose soundtrack is the plan's script segment; returns the sent message"""
+    if not plan.has("script"):
+        print("❌ No [VIDEO SCRIPT START] block found in Claude response.")
+        return False
+    soundtrack = plan.audio("script")
+    if not soundtrack:
+        return False
+    with media_workspace("video") as ws:
+        audio_path = ws.path("script.ogg")
+        with open(audio_path, "wb") as f:
+            f.write(soundtrack)
+        return send_avatar_video(chat_id, audio_path, ws.path("reply_video.mp4"))
+
+def send_plan_voice(chat_id, plan):
+    """Voice note opening with the (shared) script audio, followed by the rest; returns the sent message"""
+    voice = plan.combined(["script", "rest"])
+    if not voice:
+        print("❌ Voice message error: no audio rendered")
+        return False
+    message = bot.send_voice(chat_id, voice)
+    print("✅ Voice message sent successfully")
+    return message
+
 def bulletproof_video_generator(chat_id, full_reply_text):
+    """Avatar video of a reply's script without a render plan; returns the sent message"""
     print("🚀 ENTERED bulletproof_video_generator")
     try:
         match = re.search(r"\[VIDEO SCRIPT START\](.*?)\[VIDEO SCRIPT END\]", full_reply_text, re.DOTALL)
@@ -2837,60 +2857,30 @@ def bulletproof_video_generator(chat_id, full_reply_text):
         short_reply_clean = clean_text_for_speech(short_reply)
         print(f"📝 Cleaned text for video: '{short_reply_clean}'")
 
-        # Generate TTS with cleaned text
-        tts = gTTS(text=short_reply_clean, lang="es")
-        audio_path = "bp_audio.mp3"
-        tts.save(audio_path)
-        print(f"🔊 Audio saved: {audio_path}")
-
-        # === STEP 3: Merge with muted 30s avatar video
-        base_video = "looped_video.mp4"
-        output_video = "bp_video.mp4"
-
-        ffmpeg_command = [
-            "ffmpeg",
-            "-y",
-            "-i", base_video,
-            "-i", audio_path,
-            "-map", "0:v:0",  # take only video stream from base video
-            "-map", "1:a:0",  # take only audio stream from mp3
-            "-c:v", "libx264",
-            "-c:a", "aac",
-            "-shortest",
-            output_video
-        ]
-
-        print("🎬 Merging audio with looped video using FFmpeg...")
-        subprocess.run(ffmpeg_command, check=True)
-
-        # === STEP 4: Send video to Telegram
-        with open(output_video, "rb") as video_file:
-            bot.send_video(chat_id, video_file)
-            print("📤 Video sent successfully!")
-
-        # === STEP 5: Cleanup
-        os.remove(audio_path)
-        os.remove(output_video)
-        return True
+        # Private workspace per job - concurrent chats no longer share file names
+        with media_workspace("video") as ws:
+            # Generate TTS with cleaned text
+            tts = gTTS(text=short_reply_clean, lang="es")
+            audio_path = ws.path("bp_audio.mp3")
+            tts.save(audio_path)
+            print(f"🔊 Audio saved: {audio_path}")
+
+            # === STEP 3 + 4: Mux onto the avatar loop and send to Telegram
+            message = send_avatar_video(chat_id, audio_path, ws.path("bp_video.mp4"))
+
+        # === STEP 5: Cleanup - the workspace is removed on exit, success or not
+        return message
 
     except Exception as e:
         print(f"❌ Error in bulletproof_video_generator: {e}")
         return False
 
 def send_full_voice_message(chat_id, full_reply_text):
-    try:
-        # ENHANCEMENT: Clean the full text too
-        full_reply_clean = clean_text_for_speech(full_reply_text)
-        print(f"🎧 Generating voice with cleaned text, length: {len(full_reply_clean)}")
-        
-        tts = gTTS(text=full_reply_clean, lang="es")
-        tts.save("simple_voice.mp3")
-        with open("simple_voice.mp3", "rb") as f:
-            bot.send_voice(chat_id, f)
-        os.remove("simple_voice.mp3")
-        print("✅ Voice message sent successfully")
-    except Exception as e:
-        print(f"❌ Voice message error: {e}")
+    """Voice note of a whole reply, synthesized in chunks; returns the sent message"""
+    # ENHANCEMENT: Clean the full text too
+    full_reply_clean = clean_text_for_speech(full_reply_text)
+    print(f"🎧 Generating voice with cleaned text, length: {len(full_reply_clean)}")
+    return create_full_voice_message(chat_id, full_reply_clean)
 
 def extract_text_from_image(file_path):
     """Extract text from an image using OCR"""
@@ -2960,7 +2950,7 @@ def process_photo(photo_file):
             "max_tokens": 4000  # Increased for long texts
         }
 
-        response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
+        response = http_post("openai", OPENAI_CHAT_URL, headers=headers, json=payload, timeout=(10, 120))
         result = response.json()
 
         if "choices" in result and len(result["choices"]) > 0:
@@ -2977,26 +2967,237 @@ def process_photo(photo_file):
         return "❌ Error processing the image. Please try again."
 
 # === MAIN LOGIC ===
-def ultimate_multimedia_generator(chat_id, full_reply, short_reply):
-    """Generate both video and voice messages with proper error handling"""
+llm_executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+
+def send_translation_when_ready(chat_id, translation_future):
+    """Done-callback: post the translation as soon as it arrives"""
     try:
-        # First, attempt to generate and send the video
-        print("🎬 Starting video generation...")
+        translated = translation_future.result()
+        if translated:
+            bot.send_message(chat_id, f"📝 Traducción:\n{translated}")
+            print("Translation sent")
+        else:
+            print("Translation skipped - API error")
+    except Exception as e:
+        print(f"⚠️ Translation send failed: {e}")
+
+def translate_and_ask_claude(session, user_input, chat_id, on_text=None):
+    """
+    Start the translation on the LLM pool and request the tutor reply at the same time.
+    The translation message is sent whenever it finishes. Claude only gets the
+    [TRANSLATION] appendix when CLAUDE_WAITS_FOR_TRANSLATION is enabled.
+    """
+    translation_future = llm_executor.submit(translate_to_es_en, user_input)
+    translation_future.add_done_callback(lambda f: send_translation_when_ready(chat_id, f))
+
+    translated = translation_future.result() if CLAUDE_WAITS_FOR_TRANSLATION else None
+    return ask_claude_with_mcp(session, translated, on_text=on_text)
+
+class StreamingReply:
+    """
+    Telegram side of a streamed tutor reply: posts a placeholder, edits it with the
+    partial text at most every STREAM_EDIT_INTERVAL seconds, then finalizes it.
+    """
+
+    PREFIX = "🤖 Espaluz:\n"
+
+    def __init__(self, chat_id):
+        self.chat_id = chat_id
+        self.message_id = None
+        self.last_text = ""
+        self.next_edit_at = 0.0
+        # Text deltas received so far, joined only when an edit is due
+        self.parts = []
+        try:
+            placeholder = bot.send_message(chat_id, f"{self.PREFIX}✍️ ...")
+            self.message_id = placeholder.message_id
+        except Exception as e:
+            print(f"⚠️ Could not post streaming placeholder: {e}")
+
+    def _edit(self, text, reply_markup=None):
+        if text == self.last_text:
+            return
+        try:
+            bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id, reply_markup=reply_markup)
+            self.last_text = text
+        except Exception as e:
+            # Back off if Telegram tells us to slow down
+            retry_after = (getattr(e, "result_json", None) or {}).get("parameters", {}).get("retry_after")
+            if retry_after:
+                self.next_edit_at = time.monotonic() + retry_after
+            print(f"⚠️ Streaming edit failed: {e}")
+
+    def update(self, delta):
+        """on_text callback - called with each new piece of the reply"""
+        self.parts.append(delta)
+        if self.message_id is None or time.monotonic() < self.next_edit_at:
+            return
+        self.next_edit_at = time.monotonic() + STREAM_EDIT_INTERVAL
+        partial_reply = "".join(self.parts)
+        self.parts = [partial_reply]
+        # Hold back the video script block until the reply is complete
+        visible = partial_reply.split("[VIDEO SCRIPT", 1)[0]
+        visible = strip_markdown_formatting(visible).strip()
+        if visible:
+            self._edit(f"{self.PREFIX}{visible}"[:TELEGRAM_MESSAGE_LIMIT - 2] + " ▌")
+
+    def finalize(self, full_reply, reply_markup=None):
+        """
+        Replace the placeholder with the finished reply, overflowing into extra
+        messages; reply_markup goes on the last of them.
+        """
+        text = f"{self.PREFIX}{strip_markdown_formatting(full_reply)}"
+        chunks = [text[i:i + TELEGRAM_MESSAGE_LIMIT] for i in range(0, len(text), TELEGRAM_MESSAGE_LIMIT)]
+        markups = [None] * (len(chunks) - 1) + [reply_markup]
+        if self.message_id is None:
+            for chunk, markup in zip(chunks, markups):
+                bot.send_message(self.chat_id, chunk, reply_markup=markup)
+            return
+        self._edit(chunks[0], markups[0])
+        if self.last_text != chunks[0]:
+            # Final edit failed - make sure the user still gets the reply
+            bot.send_message(self.chat_id, chunks[0], reply_markup=markups[0])
+        for chunk, markup in zip(chunks[1:], markups[1:]):
+            bot.send_message(self.chat_id, chunk, reply_markup=markup)
+
+def request_and_send_reply(session, user_input, chat_id):
+    """
+    Get the tutor reply (streamed or in one piece) and post it to the chat.
+    With LAZY_MEDIA the reply message itself carries the media buttons.
+    """
+    if not STREAM_CLAUDE_RESPONSES:
+        full_reply, short_reply, thinking_process = translate_and_ask_claude(session, user_input, chat_id)
+        print(f"Received Claude response, length: {len(full_reply)}")
+        bot.send_message(chat_id, f"🤖 Espaluz:\n{strip_markdown_formatting(full_reply)}",
+                         reply_markup=offer_lazy_media(chat_id, full_reply, short_reply))
+        return full_reply, short_reply, thinking_process
+
+    reply_stream = StreamingReply(chat_id)
+    full_reply, short_reply, thinking_process = translate_and_ask_claude(
+        session, user_input, chat_id, on_text=reply_stream.update
+    )
+    print(f"Received Claude response, length: {len(full_reply)}")
+    reply_stream.finalize(full_reply, reply_markup=offer_lazy_media(chat_id, full_reply, short_reply))
+    return full_reply, short_reply, thinking_process
+
+def generate_reply_video(chat_id, full_reply, plan=None):
+    """Media job: avatar video for a reply"""
+    print("🎬 Starting video generation...")
+    if plan is not None:
+        video_success = send_plan_video(chat_id, plan)
+        print(f"🎛️ Render plan after video: {plan.report()}")
+    else:
         video_success = bulletproof_video_generator(chat_id, full_reply)
-        
-        # Always generate voice message after video attempt, regardless of video success
-        print("🎙️ Starting voice message generation...")
+    print(f"✅ Video generation complete - {'Success' if video_success else 'Failed'}")
+
+def generate_reply_voice(chat_id, full_reply, plan=None):
+    """Media job: full voice message for a reply"""
+    print("🎙️ Starting voice message generation...")
+    if plan is not None:
+        send_plan_voice(chat_id, plan)
+        print(f"🎛️ Render plan after voice: {plan.report()}")
+    else:
         send_full_voice_message(chat_id, full_reply)
-        
-        print(f"✅ Multimedia generation complete - Video: {'Success' if video_success else 'Failed'}, Voice: Sent")
-            
-    except Exception as e:
-        print(f"❌ Critical error in multimedia generation: {e}")
-        # Final fallback - just send a simple message
+
+def schedule_multimedia(chat_id, full_reply, short_reply):
+    """
+    Queue voice and video for a reply on the shared media pool. Voice goes
+    first; a newer reply in the same chat supersedes jobs that have not started.
+    Both jobs share one render plan, so the video script is synthesized once.
+    With LAZY_MEDIA nothing is rendered - request_and_send_reply already put
+    media buttons on the reply.
+    """
+    if LAZY_MEDIA:
+        return
+    plan = build_reply_render_plan(full_reply, short_reply) if NEURAL_TTS_AVAILABLE else None
+    voice_queued = media_pool.submit(chat_id, "voice", generate_reply_voice, chat_id, full_reply, plan,
+                                     priority=PRIORITY_VOICE)
+    video_queued = media_pool.submit(chat_id, "video", generate_reply_video, chat_id, full_reply, plan,
+                                     priority=PRIORITY_VIDEO)
+    if not (voice_queued or video_queued):
         try:
-            bot.send_message(chat_id, "❌ Lo siento, no pude generar contenido multimedia / Sorry, I couldn't generate multimedia content")
-        except:
-            print("💔 Failed to send error notification")
+            bot.send_message(chat_id, "⏳ Estoy muy ocupada ahora, solo envío texto / I'm very busy right now, sending text only")
+        except Exception:
+            print("💔 Failed to send busy notification")
+    print(f"📊 Media queue: {media_pool.stats()}")
+
+# === LAZY MEDIA - render voice/video only when a button is tapped ===
+def offer_lazy_media(chat_id, full_reply, short_reply):
+    """
+    Register a reply for on-demand media and return the "🎧 Listen" / "🎬 Video"
+    buttons to attach to the reply message (None without LAZY_MEDIA)
+    """
+    if not LAZY_MEDIA:
+        return None
+    plan = build_reply_render_plan(full_reply, short_reply) if NEURAL_TTS_AVAILABLE else None
+    reply_id = lazy_media_store.register(chat_id, full_reply, short_reply, plan)
+    markup = telebot.types.InlineKeyboardMarkup()
+    buttons = [telebot.types.InlineKeyboardButton("🎧 Listen", callback_data=media_callback_data("voice", reply_id))]
+    if VIDEO_SCRIPT_BLOCK.search(full_reply):
+        buttons.append(telebot.types.InlineKeyboardButton("🎬 Video", callback_data=media_callback_data("video", reply_id)))
+    markup.row(*buttons)
+    return markup
+
+def sent_media_file(message):
+    """(media type, file_id) of a sent voice/video/video_note message, for re-sending"""
+    for media_type in ("voice", "video", "video_note"):
+        media = getattr(message, media_type, None)
+        if media is not None:
+            return media_type, media.file_id
+    return None
+
+# Plan segments each medium is assembled from
+LAZY_PLAN_SEGMENTS = {"voice": ("script", "rest"), "video": ("script",)}
+
+def release_lazy_plan_audio(entry):
+    """Drop plan audio that no medium still without a file_id needs - Telegram has the rest"""
+    if entry.plan is None:
+        return
+    needed = {name for kind, names in LAZY_PLAN_SEGMENTS.items() if kind not in entry.file_ids
+              for name in names if entry.plan.has(name)}
+    if not needed:
+        entry.plan = None
+    else:
+        entry.plan.release([name for name in entry.plan.segments if name not in needed])
+
+def deliver_lazy_media(entry, kind):
+    """Media job for a tapped button: re-send the cached file or render it once"""
+    with entry.lock:
+        cached = entry.file_ids.get(kind)
+        if cached:
+            media_type, file_id = cached
+            getattr(bot, f"send_{media_type}")(entry.chat_id, file_id)
+            lazy_media_store.record("reused")
+            print(f"♻️ Re-sent cached {kind} for reply {entry.reply_id}")
+            return
+        if entry.plan is not None:
+            message = send_plan_voice(entry.chat_id, entry.plan) if kind == "voice" else send_plan_video(entry.chat_id, entry.plan)
+            print(f"🎛️ Render plan after {kind}: {entry.plan.report()}")
+        elif kind == "voice":
+            message = send_full_voice_message(entry.chat_id, entry.full_reply)
+        else:
+            message = bulletproof_video_generator(entry.chat_id, entry.full_reply)
+        media_file = sent_media_file(message) if message else None
+        if media_file:
+            entry.file_ids[kind] = media_file
+            release_lazy_plan_audio(entry)
+        if message:
+            lazy_media_store.record("rendered")
+
+@bot.callback_query_handler(func=lambda call: parse_media_callback(call.data) is not None)
+def handle_media_button(call):
+    kind, reply_id = parse_media_callback(call.data)
+    entry = lazy_media_store.get(reply_id)
+    if entry is None:
+        bot.answer_callback_query(call.id, "⌛ Esta respuesta ya no está disponible / This reply has expired")
+        return
+    cached = kind in entry.file_ids
+    bot.answer_callback_query(call.id, "" if cached else "⏳ Preparando... / Preparing...")
+    # Coalesce per reply: repeated taps on the same button collapse into one job
+    queued = media_pool.submit(entry.chat_id, f"{kind}:{reply_id}", deliver_lazy_media, entry, kind,
+                               priority=PRIORITY_VOICE if kind == "voice" else PRIORITY_VIDEO)
+    if not queued:
+        bot.send_message(entry.chat_id, "⏳ Estoy muy ocupada ahora, inténtalo de nuevo / I'm very busy right now, please try again")
 
 def process_message(user_input, chat_id, user_id, message_obj):
     """Process incoming message with ultimate multimedia generation"""
@@ -3011,24 +3212,12 @@ def process_message(user_input, chat_id, user_id, message_obj):
     session["context"]["conversation"]["message_count"] += 1
     session["context"]["conversation"]["last_interaction_time"] = datetime.now().isoformat()
 
-    # Get translation (skip if translation fails)
-    translated = translate_to_es_en(user_input)
-    if translated:
-        bot.send_message(chat_id, f"📝 Traducción:\n{translated}")
-        print("Translation sent")
-    else:
-        print("Translation skipped - API error")
-
     # Update message history
     session["messages"].append({"role": "user", "content": user_input})
 
-    # Get Claude response with MCP
-    print("Requesting Claude response...")
-    full_reply, short_reply, thinking_process = ask_claude_with_mcp(session, translated)
-    print(f"Received Claude response, length: {len(full_reply)}")
-
-    # Send the main response
-    bot.send_message(chat_id, f"🤖 Espaluz:\n{strip_markdown_formatting(full_reply)}")
+    # Translation and Claude response run concurrently; the reply streams into the chat
+    print("Requesting translation and Claude response...")
+    full_reply, short_reply, thinking_process = request_and_send_reply(session, user_input, chat_id)
     print("Main text response sent")
 
     # If extended thinking was used, send it as a separate message
@@ -3042,21 +3231,17 @@ def process_message(user_input, chat_id, user_id, message_obj):
     # Update session with Claude's response
     session["messages"].append({"role": "assistant", "content": full_reply})
 
-    # Launch multimedia generation in a thread
-    print("Starting multimedia generation thread...")
-    media_thread = threading.Thread(
-        target=ultimate_multimedia_generator,
-        args=(chat_id, full_reply, short_reply),
-        daemon=True
-    )
-    media_thread.start()
+    # Queue multimedia generation on the bounded media pool
+    print("Queueing multimedia generation...")
+    schedule_multimedia(chat_id, full_reply, short_reply)
 
     # Update learning data without waiting for multimedia to complete
     print("Updating learning data...")
     family_member = session["context"]["user"]["preferences"]["family_role"]
-    learned_items = enhance_language_learning_detection(full_reply, family_member, session)
+    analysis = analyze_exchange(user_input, full_reply)
+    learned_items = enhance_language_learning_detection(full_reply, family_member, session, analysis.reply)
     session = update_session_learning(session, learned_items)
-    session = adapt_learning_path(session, user_input, full_reply)
+    session = adapt_learning_path(session, user_input, full_reply, analysis)
     print("Learning data updated")
 
 # Only send progress if something was learned
@@ -3099,24 +3284,12 @@ def process_message_with_tracking(user_input, chat_id, user_id, message_obj):
     session["context"]["conversation"]["message_count"] += 1
     session["context"]["conversation"]["last_interaction_time"] = datetime.now().isoformat()
 
-    # Get translation (skip if translation fails)
-    translated = translate_to_es_en(user_input)
-    if translated:
-        bot.send_message(chat_id, f"📝 Traducción:\n{translated}")
-        print("Translation sent")
-    else:
-        print("Translation skipped - API error")
-
     # Update message history
     session["messages"].append({"role": "user", "content": user_input})
 
-    # Get Claude response with MCP
-    print("Requesting Claude response...")
-    full_reply, short_reply, thinking_process = ask_claude_with_mcp(session, translated)
-    print(f"Received Claude response, length: {len(full_reply)}")
-
-    # Send the main response
-    bot.send_message(chat_id, f"🤖 Espaluz:\n{strip_markdown_formatting(full_reply)}")
+    # Translation and Claude response run concurrently; the reply streams into the chat
+    print("Requesting translation and Claude response...")
+    full_reply, short_reply, thinking_process = request_and_send_reply(session, user_input, chat_id)
     print("Main text response sent")
 
     # If extended thinking was used, send it as a separate message
@@ -3137,27 +3310,20 @@ def process_message_with_tracking(user_input, chat_id, user_id, message_obj):
     except Exception as e:
         print(f"⚠️ Supabase tracking failed (non-critical): {e}")
     
-    # 💾 Save session to persistent storage after each conversation
-    try:
-        save_persistent_sessions()
-    except Exception as e:
-        print(f"⚠️ Session save failed (non-critical): {e}")
-
-    # Launch multimedia generation in a thread
-    print("Starting multimedia generation thread...")
-    media_thread = threading.Thread(
-        target=ultimate_multimedia_generator,
-        args=(chat_id, full_reply, short_reply),
-        daemon=True
-    )
-    media_thread.start()
+    # 💾 Save this user's session to persistent storage after each conversation
+    save_persistent_session(user_id)
+
+    # Queue multimedia generation on the bounded media pool
+    print("Queueing multimedia generation...")
+    schedule_multimedia(chat_id, full_reply, short_reply)
 
     # Update learning data
     print("Updating learning data...")
     family_member = session["context"]["user"]["preferences"]["family_role"]
-    learned_items = enhance_language_learning_detection(full_reply, family_member, session)
+    analysis = analyze_exchange(user_input, full_reply)
+    learned_items = enhance_language_learning_detection(full_reply, family_member, session, analysis.reply)
     session = update_session_learning(session, learned_items)
-    session = adapt_learning_path(session, user_input, full_reply)
+    session = adapt_learning_path(session, user_input, full_reply, analysis)
     print("Learning data updated")
 
     # Enhanced progress tracking
@@ -3342,14 +3508,16 @@ def handle_connect(message):
         print("📤 Sending connect payload:", payload)
         # Supabase key check removed - using PostgreSQL
 
-        response = requests.post(
-            "https://euyidvolwqmzijkfrplh.supabase.co/functions/v1/connect-bot",
+        response = http_post(
+            "supabase",
+            f"{SUPABASE_FUNCTIONS_URL}/connect-bot",
             json=payload,
             headers={
                 "Authorization": f"Bearer {os.environ.get('SUPABASE_ANON_KEY')}",
                 "Content-Type": "application/json"
             },
-            timeout=5
+            timeout=5,
+            idempotent=False
         )
 
         if response.status_code == 200:
@@ -3726,24 +3894,6 @@ def handle_menu(message):
 # END OF NEW ENHANCED COMMANDS
 # =============================================================================
 
-def transcribe_audio(audio_path: str) -> str:
-    """Transcribe audio file using OpenAI Whisper (SDK v1.0+)"""
-    try:
-        from openai import OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-        with open(audio_path, "rb") as f:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=f,
-                response_format="text"
-            )
-        return transcript
-
-    except Exception as e:
-        print(f"❌ Transcription error: {e}")
-        return None
-
 @bot.message_handler(commands=["link"])
 def handle_link(message):
     link_msg = f"""📩 Link Your Subscription
@@ -3831,31 +3981,16 @@ def handle_convo(message):
 
 def handle_conversation_voice(message):
     """Fast voice translation for conversation mode"""
-    import anthropic
-    from gtts import gTTS
-    import subprocess
-    import os
-    
     user_id = str(message.from_user.id)
     chat_id = message.chat.id
     
     try:
-        # 1. Download and convert voice
+        # 1. Download voice (kept in memory - Whisper takes the OGG as-is)
         file_info = bot.get_file(message.voice.file_id)
         voice_file = bot.download_file(file_info.file_path)
         
-        temp_ogg = f"convo_{message.message_id}.ogg"
-        temp_mp3 = f"convo_{message.message_id}.mp3"
-        temp_output = f"convo_out_{message.message_id}.ogg"
-        
-        with open(temp_ogg, "wb") as f:
-            f.write(voice_file)
-        
-        subprocess.run(["ffmpeg", "-y", "-i", temp_ogg, temp_mp3], 
-                      capture_output=True, check=True)
-        
         # 2. Transcribe with Whisper
-        transcription = transcribe_audio(temp_mp3)
+        transcription = transcribe_voice_bytes(voice_file)
         if not transcription:
             bot.reply_to(message, "❌ Couldn't hear that. Try again?")
             return
@@ -3866,7 +4001,7 @@ def handle_conversation_voice(message):
         translate_to = get_opposite_language(detected_lang, target_lang)
         
         # 4. Quick translate with Claude
-        client = anthropic.Anthropic(api_key=os.environ.get("CLAUDE_API_KEY"))
+        client = anthropic_client()
         prompt = get_quick_translate_prompt(transcription, detected_lang, translate_to)
         
         response = client.messages.create(
@@ -3879,46 +4014,19 @@ def handle_conversation_voice(message):
         
         # 5. Generate voice response
         tts_lang = "es" if translate_to == "es" else "en"
-        # Use Neural TTS for beautiful voice
-        if NEURAL_TTS_AVAILABLE:
-            try:
-                neural_path = generate_voice_sync(translation, lang=tts_lang, style="conversation", message_id=message.message_id)
-                if neural_path:
-                    import shutil
-                    shutil.copy(neural_path, temp_mp3)
-                    if neural_path != temp_mp3:
-                        os.remove(neural_path)
-                else:
-                    raise Exception("Neural TTS returned None")
-            except Exception as e:
-                print(f"Neural TTS failed: {e}, using gTTS")
-                tts = gTTS(text=translation, lang=tts_lang, slow=False)
-                tts.save(temp_mp3)
-        else:
-            tts = gTTS(text=translation, lang=tts_lang, slow=False)
-            tts.save(temp_mp3)
-        
-        # Convert to OGG for Telegram voice note
-        subprocess.run([
-            "ffmpeg", "-y", "-i", temp_mp3,
-            "-c:a", "libopus", "-b:a", "64k",
-            temp_output
-        ], capture_output=True, check=True)
+        # Neural voice note as OGG/Opus bytes (cached for repeated phrases),
+        # gTTS piped through ffmpeg in memory as the fallback
+        voice_note = generate_voice_note_bytes(translation, tts_lang, style="conversation")
         
         # 6. Send voice note + text
         lang_flag = "🇪🇸" if translate_to == "es" else "🇬🇧"
         bot.send_message(chat_id, f"🎤 *{transcription}*\n{lang_flag} {translation}", parse_mode="Markdown")
         
-        with open(temp_output, "rb") as voice:
-            bot.send_voice(chat_id, voice)
+        if voice_note:
+            bot.send_voice(chat_id, voice_note)
         
         # Track usage
         conversation_mode.increment_count(user_id)
-        
-        # Cleanup
-        for f in [temp_ogg, temp_mp3, temp_output]:
-            if os.path.exists(f):
-                os.remove(f)
                 
     except Exception as e:
         print(f"Conversation mode error: {e}")
@@ -4161,35 +4269,14 @@ def handle_email_link(message):
 # Track which users are in conversation mode
 conversation_mode_users = {}
 
-def detect_language(text):
-    """Detect language of input text (simple heuristic + can use Claude for accuracy)"""
-    # Russian characters
-    if any('\u0400' <= char <= '\u04FF' for char in text):
-        return 'ru'
-    
-    # Spanish-specific patterns
-    spanish_markers = ['¿', '¡', 'ñ', 'á', 'é', 'í', 'ó', 'ú']
-    spanish_words = ['el', 'la', 'los', 'las', 'un', 'una', 'que', 'de', 'en', 'es', 'por', 'para', 'como', 'pero', 'más', 'este', 'esto', 'esta', 'ese', 'eso', 'esa', 'yo', 'tú', 'él', 'ella', 'nosotros', 'ustedes', 'ellos', 'hola', 'gracias', 'buenos', 'buenas']
-    
-    text_lower = text.lower()
-    spanish_score = sum(1 for marker in spanish_markers if marker in text)
-    spanish_score += sum(1 for word in spanish_words if f' {word} ' in f' {text_lower} ' or text_lower.startswith(f'{word} ') or text_lower.endswith(f' {word}'))
-    
-    # English patterns
-    english_words = ['the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'shall', 'can', 'need', 'dare', 'ought', 'used', 'to', 'of', 'in', 'for', 'on', 'with', 'at', 'by', 'from', 'as', 'into', 'through', 'during', 'before', 'after', 'above', 'below', 'between', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 'very', 'just', 'hello', 'hi', 'thanks', 'thank', 'please', 'yes', 'no', 'okay', 'ok']
-    
-    english_score = sum(1 for word in english_words if f' {word} ' in f' {text_lower} ' or text_lower.startswith(f'{word} ') or text_lower.endswith(f' {word}'))
-    
-    if spanish_score > english_score:
-        return 'es'
-    elif english_score > spanish_score:
-        return 'en'
-    else:
-        # Default to English if unclear
-        return 'en'
-
 def quick_translate_for_convo(text, source_lang, target_lang):
-    """Fast translation for conversation mode - minimal latency"""
+    """Fast translation for conversation mode - repeated phrases come from the cache"""
+    return translation_cache.get_or_compute(
+        text, source_lang, target_lang, CONVO_TRANSLATE_MODEL,
+        lambda: _request_convo_translation(text, source_lang, target_lang)
+    )
+
+def _request_convo_translation(text, source_lang, target_lang):
     try:
         # Use Claude for accurate translation
         prompt = f"""Translate the following text from {source_lang} to {target_lang}.
@@ -4199,15 +4286,16 @@ Text: {text}
 
 Translation:"""
         
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
+        response = http_post(
+            "anthropic",
+            ANTHROPIC_MESSAGES_URL,
             headers={
                 "Content-Type": "application/json",
                 "x-api-key": CLAUDE_API_KEY,
                 "anthropic-version": "2023-06-01"
             },
             json={
-                "model": "claude-sonnet-4-20250514",
+                "model": CONVO_TRANSLATE_MODEL,
                 "max_tokens": 500,
                 "messages": [{"role": "user", "content": prompt}]
             },
@@ -4225,18 +4313,16 @@ Translation:"""
         print(f"Quick translate error: {e}")
         return None
 
-def generate_voice_note(text, lang='es'):
-    """Generate a voice note file for Telegram"""
-    try:
-        # Use gTTS for voice generation
-        tts = gTTS(text=text, lang=lang, slow=False)
-        timestamp = int(time.time() * 1000)
-        filename = f"convo_voice_{timestamp}.mp3"
-        tts.save(filename)
-        return filename
-    except Exception as e:
-        print(f"Voice generation error: {e}")
+def generate_voice_note_bytes(text, lang='es', style="conversation"):
+    """
+    OGG/Opus voice note bytes for bot.send_voice - no files touched. Neural
+    voice when possible; generate_voice_bytes_sync falls back to
+    espaluz_neural_tts.gtts_ogg_bytes itself.
+    """
+    if not NEURAL_TTS_AVAILABLE:
+        print("Voice generation error: espaluz_neural_tts is not available")
         return None
+    return generate_voice_bytes_sync(text, lang=lang, style=style)
 
 @bot.message_handler(commands=["convo"])
 def handle_convo_toggle(message):
@@ -4331,11 +4417,11 @@ def process_conversation_mode_voice(message, transcription):
         target_lang = conversation_mode_users.get(user_id, {}).get('target_lang', 'es')
         
         # Detect source language
-        source_lang = detect_language(transcription)
-        source_name = {'en': 'English', 'es': 'Spanish', 'ru': 'Russian'}.get(source_lang, 'Unknown')
+        source_lang, confidence = identify_language(transcription)
+        source_name = {'en': 'English', 'es': 'Spanish', 'ru': 'Russian', 'pt': 'Portuguese'}.get(source_lang, 'Unknown')
         target_name = {'en': 'English', 'es': 'Spanish'}.get(target_lang, 'Spanish')
         
-        print(f"🎙️ CONVO MODE: {source_name} → {target_name}")
+        print(f"🎙️ CONVO MODE: {source_name} ({confidence:.0%}) → {target_name}")
         
         # If source and target are the same, flip target
         if source_lang == target_lang:
@@ -4356,12 +4442,10 @@ def process_conversation_mode_voice(message, transcription):
         bot.send_message(chat_id, f"📝 {translation}")
         
         # Generate and send voice note
-        voice_file = generate_voice_note(translation, target_lang)
+        voice_note = generate_voice_note_bytes(translation, target_lang)
         
-        if voice_file and os.path.exists(voice_file):
-            with open(voice_file, 'rb') as audio:
-                bot.send_voice(chat_id, audio)
-            os.remove(voice_file)
+        if voice_note:
+            bot.send_voice(chat_id, voice_note)
             print(f"✅ CONVO MODE: Voice sent successfully")
         else:
             print(f"⚠️ CONVO MODE: Could not generate voice")
@@ -4410,15 +4494,8 @@ def handle_voice(message):
         file_info = bot.get_file(message.voice.file_id)
         voice_file = bot.download_file(file_info.file_path)
 
-        temp_ogg_path = f"input_{message.message_id}.ogg"
-        temp_mp3_path = f"input_{message.message_id}.mp3"
-
-        with open(temp_ogg_path, "wb") as f:
-            f.write(voice_file)
-
-        subprocess.run(["ffmpeg", "-i", temp_ogg_path, temp_mp3_path], check=True)
-
-        transcription = transcribe_audio(temp_mp3_path)
+        # Uploaded straight from memory - nothing is written to the working directory
+        transcription = transcribe_voice_bytes(voice_file)
 
         if not transcription:
             bot.reply_to(message, "❌ No pude transcribir este mensaje de voz. / I couldn't transcribe this voice message.")
@@ -4430,9 +4507,6 @@ def handle_voice(message):
         if is_in_conversation_mode(user_id):
             print(f"🎙️ User {user_id} is in CONVERSATION MODE")
             process_conversation_mode_voice(message, transcription)
-            # Clean up
-            os.remove(temp_ogg_path)
-            os.remove(temp_mp3_path)
             return
         
         # === NORMAL TUTOR MODE ===
@@ -4440,9 +4514,6 @@ def handle_voice(message):
 
         process_message_with_tracking(transcription, message.chat.id, str(message.from_user.id), message)
 
-        os.remove(temp_ogg_path)
-        os.remove(temp_mp3_path)
-
     except Exception as e:
         print(f"❌ Error processing voice message: {e}")
         bot.reply_to(message, "❌ Hubo un error al procesar tu mensaje de voz.")
@@ -5012,12 +5083,12 @@ if __name__ == "__main__":
                 
                 # Force delete
                 delete_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/deleteWebhook?drop_pending_updates=true"
-                delete_response = requests.get(delete_url)
+                delete_response = http_get("telegram", delete_url)
                 print(f"Webhook deletion API response: {delete_response.json()}")
                 
                 # Verify webhook is gone
                 info_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getWebhookInfo"
-                info_response = requests.get(info_url)
+                info_response = http_get("telegram", info_url)
                 webhook_info = info_response.json()
                 print(f"Webhook info: {webhook_info}")
                 
@@ -5025,7 +5096,7 @@ if __name__ == "__main__":
                 time.sleep(5)
                 
                 # Check again to really make sure
-                info_response = requests.get(info_url)
+                info_response = http_get("telegram", info_url)
                 webhook_info = info_response.json()
                 print(f"Webhook verification after waiting: {webhook_info}")
                 
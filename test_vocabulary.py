@@ -0,0 +1,63 @@
+import copy
+import pickle
+
+import pytest
+
+from espaluz_vocabulary import ProgressList
+
+
+def test_deepcopy_keeps_items_and_index():
+    original = ProgressList(["a", "b"])
+    clone = copy.deepcopy(original)
+    assert clone == ["a", "b"]
+    assert "a" in clone and "c" not in clone
+    clone.append("c")
+    assert "c" not in original
+
+
+def test_copy_keeps_items_and_index():
+    clone = copy.copy(ProgressList(["a", "b"]))
+    assert clone == ["a", "b"]
+    assert "b" in clone
+    clone.remove("b")
+    assert "b" not in clone
+
+
+def test_pickle_round_trip():
+    restored = pickle.loads(pickle.dumps(ProgressList(["mañana", "hola"])))
+    assert isinstance(restored, ProgressList)
+    assert restored == ["mañana", "hola"]
+    assert "hola" in restored
+    restored.append("hola")
+    assert restored == ["mañana", "hola"]
+
+
+def test_setitem_rejects_duplicate():
+    items = ProgressList(["a", "b"])
+    with pytest.raises(ValueError):
+        items[0] = "b"
+    assert items == ["a", "b"]
+    items[0] = "a"
+    items[1] = "c"
+    assert items == ["a", "c"]
+    assert "c" in items and "b" not in items
+
+
+def test_slice_assignment_rejects_duplicates():
+    items = ProgressList(["a", "b", "c"])
+    with pytest.raises(ValueError):
+        items[0:1] = ["c"]
+    with pytest.raises(ValueError):
+        items[0:1] = ["x", "x"]
+    assert items == ["a", "b", "c"]
+    items[0:2] = ["b", "x"]
+    assert items == ["b", "x", "c"]
+    assert "a" not in items and "x" in items
+
+
+def test_inplace_repeat_keeps_items_unique():
+    items = ProgressList(["a", "b"])
+    items *= 2
+    assert items == ["a", "b"]
+    items *= 0
+    assert items == [] and "a" not in items